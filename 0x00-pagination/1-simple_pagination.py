@@ -4,7 +4,10 @@ Module for pagination helper functionality.
 """
 import csv
 import math
-from typing import Tuple, List
+from itertools import islice
+from typing import Any, Dict, Iterator, Tuple, List
+from fast_csv import load_rows
+from row_index import RowIndex
 
 
 def index_range(page: int, page_size: int) -> Tuple[int, int]:
@@ -27,26 +30,63 @@ class Server:
     """Server class to paginate a database of popular baby names."""
 
     DATA_FILE = "Popular_Baby_Names.csv"
+    # Names of the columns in filters and sort orders
+    COLUMNS = ("year", "gender", "ethnicity", "name", "count", "rank")
 
-    def __init__(self):
+    def __init__(self, lazy: bool = False):
+        """
+        Args:
+            lazy (bool): Serve pages from a row-offset index over the
+                memory-mapped file instead of loading the whole CSV.
+        """
         self.__dataset = None
+        self.__index = None
+        self.__columns = None
+        self.__lazy = lazy
 
     def dataset(self) -> List[List]:
         """Returns a cached dataset, loading it from a CSV file if needed."""
         if self.__dataset is None:
-            with open(self.DATA_FILE) as f:
-                reader = csv.reader(f)
-                dataset = [row for row in reader]
-            self.__dataset = dataset[1:]  # Skip header row
+            self.__dataset = load_rows(self.DATA_FILE)  # Without header
         return self.__dataset
 
-    def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
+    def index(self) -> RowIndex:
+        """Returns the row-offset index, loading or building it if needed."""
+        if self.__index is None:
+            self.__index = RowIndex(self.DATA_FILE)
+        return self.__index
+
+    def columns(self):
+        """Returns the columnar dataset of filtered and sorted pages,
+        loading it if needed. Only these pages need NumPy.
+
+        Returns:
+            ColumnarDataset: The dataset, one typed array per column.
+        """
+        if self.__columns is None:
+            from columnar import ColumnarDataset
+            self.__columns = ColumnarDataset(self.DATA_FILE, self.COLUMNS)
+        return self.__columns
+
+    def row_count(self, filters: Dict[str, Any] = None) -> int:
+        """Returns the number of records matching filters, or of all."""
+        if filters:
+            return self.columns().count(filters)
+        if self.__lazy:
+            return len(self.index())
+        return len(self.dataset())
+
+    def get_page(self, page: int = 1, page_size: int = 10,
+                 filters: Dict[str, Any] = None, sort=None) -> List[List]:
         """
         Retrieves a specific page of data.
 
         Args:
             page (int): Page number, default is 1.
             page_size (int): Number of items per page, default is 10.
+            filters (Dict[str, Any]): Conditions on the columns, e.g.
+                {"year": 2016, "count__ge": 100}, see ColumnarDataset.
+            sort (str or Sequence[str]): Columns to sort by, e.g. "-count".
 
         Returns:
             List[List]: The list of records on the requested page.
@@ -55,5 +95,55 @@ class Server:
         assert page > 0 and page_size > 0, "Arguments must be positive."
 
         begin, stop = index_range(page, page_size)
+        if filters or sort:
+            return self.columns().page(begin, stop, filters, sort)
+        if self.__lazy:
+            return self.index().rows(begin, stop)
         data = self.dataset()
         return data[begin:stop] if begin < len(data) else []
+
+    def iter_rows(self, start: int = 0) -> Iterator[List]:
+        """
+        Stream the records from a position on, with bounded memory.
+
+        Args:
+            start (int): Position of the first record, e.g. a saved cursor.
+
+        Yields:
+            List: One record at a time.
+        """
+        assert isinstance(start, int) and start >= 0, "Start must be >= 0."
+        if self.__lazy:
+            yield from self.index().iter_rows(start)
+        elif self.__dataset is not None:
+            rows = self.__dataset  # Indexed, not skipped through
+            for position in range(start, len(rows)):
+                yield rows[position]
+        else:
+            with open(self.DATA_FILE) as f:
+                reader = csv.reader(f)
+                next(reader, None)  # Skip header row
+                yield from islice(reader, start, None)
+
+    def iter_pages(self, page_size: int = 10,
+                   page: int = 1) -> Iterator[List[List]]:
+        """
+        Stream consecutive pages in one sequential pass over the data,
+        instead of one get_page() call, and one slice, per page.
+
+        Args:
+            page_size (int): Number of items per page, default is 10.
+            page (int): Page to resume from, default is 1.
+
+        Yields:
+            List[List]: The records of each page, the last one may be short.
+        """
+        assert isinstance(page, int) and isinstance(page_size, int), "Arg int"
+        assert page > 0 and page_size > 0, "Arguments must be positive."
+
+        rows = self.iter_rows(index_range(page, page_size)[0])
+        while True:
+            records = list(islice(rows, page_size))
+            if not records:
+                return
+            yield records
@@ -4,7 +4,11 @@ Module for pagination helper functionality.
 """
 import csv
 import math
-from typing import Tuple, List
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, Tuple, List
+from fast_csv import load_rows
+from reloader import Reloader, Snapshot, StaleSnapshot
+from row_index import RowIndex
 
 
 def index_range(page: int, page_size: int) -> Tuple[int, int]:
@@ -27,9 +31,75 @@ class Server:
     """Server class to paginate a database of popular baby names."""
 
     DATA_FILE = "Popular_Baby_Names.csv"
+    # Names of the columns in filters and sort orders
+    COLUMNS = ("year", "gender", "ethnicity", "name", "count", "rank")
 
-    def __init__(self):
-        self.__dataset = None
+    def __init__(self, lazy: bool = False, reload_interval: float = None):
+        """
+        Args:
+            lazy (bool): Serve pages from a row-offset index over the
+                memory-mapped file instead of loading the whole CSV.
+            reload_interval (float): Seconds between two checks of the
+                CSV, reparsed in the background whenever it changes.
+                None, the default, loads it once.
+        """
+        self.__lazy = lazy
+        self.__reloader = Reloader(self.DATA_FILE, self.__load,
+                                   reload_interval)
+
+    def __build(self, name: str, path: str) -> Any:
+        """Builds one part of a snapshot from the CSV at path."""
+        if name == "dataset":
+            return load_rows(path)  # Without the header row
+        if name == "index":
+            return RowIndex(path)
+        # Only filtered and sorted pages need NumPy
+        from columnar import ColumnarDataset
+        return ColumnarDataset(path, self.COLUMNS)
+
+    def __load(self, path: str) -> Dict[str, Any]:
+        """Parses one version of the CSV into the parts already in use:
+        the rows or the row index, and the columns once filtered on.
+
+        Returns:
+            Dict[str, Any]: The parts by name.
+        """
+        names = ["index" if self.__lazy else "dataset"]
+        current = self.__reloader.current
+        if current is not None:
+            names += [name for name in current.data if name not in names]
+        return {name: self.__build(name, path) for name in names}
+
+    def __part(self, snapshot: Snapshot, name: str) -> Any:
+        """Returns a part of a snapshot, building it on first use.
+
+        Raises:
+            StaleSnapshot: If the CSV changed since the snapshot, which
+                can then no longer gain parts.
+        """
+        return self.__reloader.part(snapshot, name,
+                                    lambda path: self.__build(name, path))
+
+    def __current(self, work: Callable[[Snapshot], Any]) -> Any:
+        """Runs work on the current snapshot. If the CSV changed before a
+        part that work needs was built, the CSV is reloaded and work runs
+        again on the new version."""
+        try:
+            return work(self.snapshot())
+        except StaleSnapshot:
+            self.reload()
+            return work(self.snapshot())
+
+    def snapshot(self) -> Snapshot:
+        """Returns the current version of the data, loading it if needed.
+        A request reads a single snapshot, even if a reload swaps in a
+        newer one meanwhile.
+        """
+        return self.__reloader.snapshot()
+
+    def reload(self) -> bool:
+        """Reparses the CSV now if it changed, True if it did."""
+        return self.__reloader.check()
 
     def dataset(self) -> List[List]:
         """Loads and caches the dataset from a CSV file if not already loaded.
@@ -37,51 +107,205 @@ class Server:
         Returns:
             List[List]: The cached dataset.
         """
-        if self.__dataset is None:
-            with open(self.DATA_FILE) as f:
-                reader = csv.reader(f)
-                dataset = [row for row in reader]
-            self.__dataset = dataset[1:]  # Skip header row
-        return self.__dataset
+        return self.__current(lambda snapshot:
+                              self.__part(snapshot, "dataset"))
 
-    def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
+    def index(self) -> RowIndex:
+        """Returns the row-offset index, loading or building it if needed."""
+        return self.__current(lambda snapshot:
+                              self.__part(snapshot, "index"))
+
+    def columns(self):
+        """Returns the columnar dataset of filtered and sorted pages,
+        loading it if needed. Only these pages need NumPy.
+
+        Returns:
+            ColumnarDataset: The dataset, one typed array per column.
+        """
+        return self.__current(lambda snapshot:
+                              self.__part(snapshot, "columns"))
+
+    def row_count(self, filters: Dict[str, Any] = None,
+                  snapshot: Snapshot = None) -> int:
+        """Returns the number of records matching filters, or of all,
+        in snapshot or the current version of the data."""
+        if snapshot is None:
+            return self.__current(lambda snapshot:
+                                  self.row_count(filters, snapshot))
+        if filters:
+            return self.__part(snapshot, "columns").count(filters)
+        if self.__lazy:
+            return len(self.__part(snapshot, "index"))
+        return len(self.__part(snapshot, "dataset"))
+
+    def get_rows(self, begin: int, stop: int,
+                 filters: Dict[str, Any] = None, sort=None,
+                 snapshot: Snapshot = None) -> List[List]:
+        """
+        Retrieve the records between two positions, e.g. a slice of a
+        page too large to build at once.
+
+        Args:
+            begin (int): Position of the first record.
+            stop (int): Position after the last record.
+            filters (Dict[str, Any]): Conditions on the columns, or None.
+            sort (str or Sequence[str]): Columns to sort by, or None.
+            snapshot (Snapshot): Version of the data, the current if None.
+
+        Returns:
+            List[List]: The records, fewer at the end of the data.
+
+        Raises:
+            StaleSnapshot: As get_page().
+        """
+        if snapshot is None:
+            return self.__current(lambda snapshot: self.get_rows(
+                begin, stop, filters, sort, snapshot))
+        if filters or sort:
+            return self.__part(snapshot, "columns").page(begin, stop,
+                                                         filters, sort)
+        if self.__lazy:
+            return self.__part(snapshot, "index").rows(begin, stop)
+        data = self.__part(snapshot, "dataset")
+        return data[begin:stop] if begin < len(data) else []
+
+    def get_page(self, page: int = 1, page_size: int = 10,
+                 filters: Dict[str, Any] = None, sort=None,
+                 snapshot: Snapshot = None) -> List[List]:
         """
         Retrieve a specific page of data.
 
         Args:
             page (int): Page number, default is 1.
             page_size (int): Number of items per page, default is 10.
+            filters (Dict[str, Any]): Conditions on the columns, e.g.
+                {"year": 2016, "count__ge": 100}, see ColumnarDataset.
+            sort (str or Sequence[str]): Columns to sort by, e.g. "-count".
+            snapshot (Snapshot): Version of the data, the current if None.
 
         Returns:
             List[List]: Records on the requested page.
+
+        Raises:
+            StaleSnapshot: If the page needs a part of snapshot not built
+                before the CSV changed.
         """
         assert isinstance(page, int) and isinstance(page_size, int), "Argsint"
         assert page > 0 and page_size > 0, "Arguments must be positive."
 
         begin, stop = index_range(page, page_size)
-        data = self.dataset()
-        return data[begin:stop] if begin < len(data) else []
+        return self.get_rows(begin, stop, filters, sort, snapshot)
 
-    def get_hyper(self, page: int = 1, page_size: int = 10) -> dict:
+    def get_hyper_info(self, page: int = 1, page_size: int = 10,
+                       filters: Dict[str, Any] = None, sort=None,
+                       snapshot: Snapshot = None) -> dict:
         """
-        Retrieve pagination information and records for a specific page.
+        Retrieve the pagination information of a page, without building
+        its records.
 
         Args:
             page (int): Page number, default is 1.
             page_size (int): Number of items per page, default is 10.
+            filters (Dict[str, Any]): Conditions on the columns, or None.
+            sort (str or Sequence[str]): Columns to sort by, or None.
+            snapshot (Snapshot): Version of the data, the current if None.
 
         Returns:
-            dict: Dictionary with pagination details and records.
+            dict: The fields of get_hyper() but data, page_size being the
+                number of records on the page.
+
+        Raises:
+            StaleSnapshot: As get_page().
         """
-        data = self.get_page(page, page_size)
+        assert isinstance(page, int) and isinstance(page_size, int), "Argsint"
+        assert page > 0 and page_size > 0, "Arguments must be positive."
+
+        if snapshot is None:
+            return self.__current(lambda snapshot: self.get_hyper_info(
+                page, page_size, filters, sort, snapshot))
         begin, stop = index_range(page, page_size)
-        pages_count = math.ceil(len(self.__dataset) / page_size)
-        info_dict = {
-            'page_size': len(data),
+        count = self.row_count(filters, snapshot)
+        return {
+            'page_size': max(min(stop, count) - begin, 0),
             'page': page,
-            'data': data,
-            'next_page': page + 1 if stop < len(self.__dataset) else None,
+            'next_page': page + 1 if stop < count else None,
             'prev_page': page - 1 if begin > 0 else None,
-            'total_pages': pages_count
+            'total_pages': math.ceil(count / page_size),
+            'version': snapshot.version
         }
+
+    def get_hyper(self, page: int = 1, page_size: int = 10,
+                  filters: Dict[str, Any] = None, sort=None,
+                  snapshot: Snapshot = None) -> dict:
+        """
+        Retrieve pagination information and records for a specific page.
+
+        Args:
+            page (int): Page number, default is 1.
+            page_size (int): Number of items per page, default is 10.
+            filters (Dict[str, Any]): Conditions on the columns, or None.
+            sort (str or Sequence[str]): Columns to sort by, or None.
+            snapshot (Snapshot): Version of the data, the current if None.
+
+        Returns:
+            dict: Dictionary with pagination details and records, and the
+                version of the data they come from.
+
+        Raises:
+            StaleSnapshot: As get_page().
+        """
+        if snapshot is None:
+            return self.__current(lambda snapshot: self.get_hyper(
+                page, page_size, filters, sort, snapshot))
+        data = self.get_page(page, page_size, filters, sort, snapshot)
+        info_dict = {'page_size': len(data), 'page': page, 'data': data}
+        info_dict.update(self.get_hyper_info(page, page_size, filters, sort,
+                                             snapshot))
         return info_dict
+
+    def iter_rows(self, start: int = 0) -> Iterator[List]:
+        """
+        Stream the records from a position on, with bounded memory.
+
+        Args:
+            start (int): Position of the first record, e.g. a saved cursor.
+
+        Yields:
+            List: One record at a time.
+        """
+        assert isinstance(start, int) and start >= 0, "Start must be >= 0."
+        snapshot = self.__reloader.current
+        if self.__lazy:
+            yield from self.index().iter_rows(start)
+        elif snapshot is not None:
+            rows = self.__part(snapshot, "dataset")  # Indexed, not skipped
+            for position in range(start, len(rows)):
+                yield rows[position]
+        else:
+            with open(self.DATA_FILE) as f:
+                reader = csv.reader(f)
+                next(reader, None)  # Skip header row
+                yield from islice(reader, start, None)
+
+    def iter_pages(self, page_size: int = 10,
+                   page: int = 1) -> Iterator[List[List]]:
+        """
+        Stream consecutive pages in one sequential pass over the data,
+        instead of one get_page() call, and one slice, per page.
+
+        Args:
+            page_size (int): Number of items per page, default is 10.
+            page (int): Page to resume from, default is 1.
+
+        Yields:
+            List[List]: The records of each page, the last one may be short.
+        """
+        assert isinstance(page, int) and isinstance(page_size, int), "Arg int"
+        assert page > 0 and page_size > 0, "Arguments must be positive."
+
+        rows = self.iter_rows(index_range(page, page_size)[0])
+        while True:
+            records = list(islice(rows, page_size))
+            if not records:
+                return
+            yield records
@@ -3,9 +3,42 @@
 Deletion-resilient hypermedia pagination module.
 """
 
-import csv
 import math
-from typing import List, Dict
+import threading
+from typing import Any, List, Dict
+from cursor import CursorCodec
+from fast_csv import load_rows
+from live_index import LiveIndex
+from reloader import Reloader, Snapshot
+
+
+class IndexedDataset(dict):
+    """Rows by position, telling the live index about deleted keys."""
+
+    def __init__(self, rows: Dict[int, List], live: LiveIndex,
+                 lock: threading.RLock):
+        """
+        Args:
+            rows (Dict[int, List]): Live rows by position.
+            live (LiveIndex): Index to keep in sync with deletions.
+            lock (threading.RLock): Lock of the server guarding both.
+        """
+        super().__init__(rows)
+        self.live = live
+        self.lock = lock
+
+    def __delitem__(self, position: int):
+        """Deletes a row, from the live index too."""
+        with self.lock:
+            super().__delitem__(position)
+            self.live.delete(position)
+
+    def pop(self, position: int, *default):
+        """Deletes and returns a row, removing it from the live index."""
+        with self.lock:
+            if position in self:
+                self.live.delete(position)
+            return super().pop(position, *default)
 
 
 class Server:
@@ -13,9 +46,50 @@ class Server:
 
     DATA_FILE = "Popular_Baby_Names.csv"
 
-    def __init__(self):
-        self.__dataset = None
-        self.__indexed_dataset = None
+    def __init__(self, secret: bytes = None, reload_interval: float = None):
+        """
+        Args:
+            secret (bytes): Key signing the cursors of get_cursor_page(),
+                random if None, which voids the cursors on restart.
+            reload_interval (float): Seconds between two checks of the
+                CSV, reparsed in the background whenever it changes.
+                Rows deleted or inserted since the last load are lost
+                then. None, the default, loads it once.
+        """
+        self.__cursors = CursorCodec(secret)
+        # Guards the indexed dataset build and every insert or delete
+        self.__lock = threading.RLock()
+        self.__reloader = Reloader(self.DATA_FILE, self.__load,
+                                   reload_interval)
+
+    def read_dataset(self, path: str) -> List[List]:
+        """Parses the records of a CSV file, without its header row."""
+        return load_rows(path)
+
+    def __load(self, path: str) -> Dict[str, Any]:
+        """Parses one version of the CSV with its live index, the indexed
+        dataset follows on first use, from these parts only.
+
+        Returns:
+            Dict[str, Any]: The parts of the snapshot by name.
+        """
+        dataset = self.read_dataset(path)
+        return {"dataset": dataset, "live": LiveIndex(len(dataset))}
+
+    def snapshot(self) -> Snapshot:
+        """Returns the current version of the data, loading it if needed.
+        A request reads a single snapshot, even if a reload swaps in a
+        newer one meanwhile.
+        """
+        return self.__reloader.snapshot()
+
+    def reload(self) -> bool:
+        """Reparses the CSV now if it changed, True if it did."""
+        return self.__reloader.check()
+
+    def __live(self, snapshot: Snapshot) -> LiveIndex:
+        """Returns the live index of a snapshot."""
+        return snapshot.data["live"]
 
     def dataset(self) -> List[List]:
         """Loads and caches the dataset from a CSV file if not already loaded.
@@ -23,12 +97,7 @@ class Server:
         Returns:
             List[List]: The cached dataset.
         """
-        if self.__dataset is None:
-            with open(self.DATA_FILE) as f:
-                reader = csv.reader(f)
-                dataset = [row for row in reader]
-            self.__dataset = dataset[1:]  # Skip header row
-        return self.__dataset
+        return self.snapshot().data["dataset"]
 
     def indexed_dataset(self) -> Dict[int, List]:
         """Creates and caches an indexed version of the dataset, for
@@ -37,11 +106,79 @@ class Server:
         Returns:
             Dict[int, List]: Dataset indexed by position, up to 1000 records.
         """
-        if self.__indexed_dataset is None:
-            dataset = self.dataset()
-            self.__indexed_dataset = {i: dataset[i] for i in range(
-                len(dataset))}
-        return self.__indexed_dataset
+        snapshot = self.snapshot()
+        parts = snapshot.data
+        if "indexed" not in parts:
+            with self.__lock:
+                if "indexed" not in parts:
+                    dataset = parts["dataset"]
+                    live = self.__live(snapshot)
+                    parts["indexed"] = IndexedDataset(
+                        {i: dataset[i] for i in range(len(dataset))
+                         if i in live}, live, self.__lock)
+        return parts["indexed"]
+
+    @property
+    def __indexed_dataset(self) -> Dict[int, List]:
+        """The indexed dataset of the current snapshot, under the name of
+        the attribute it used to be: deleting from it deletes the row."""
+        return self.indexed_dataset()
+
+    def live_index(self) -> LiveIndex:
+        """Creates and caches the index of the rows not deleted.
+
+        Returns:
+            LiveIndex: Rank and select over the live row positions.
+        """
+        return self.__live(self.snapshot())
+
+    def delete(self, index: int) -> bool:
+        """
+        Deletes the row at a position, the other rows keep theirs.
+
+        Args:
+            index (int): Position of the row.
+
+        Returns:
+            bool: True if the row existed.
+        """
+        snapshot = self.snapshot()
+        with self.__lock:
+            indexed = snapshot.data.get("indexed")
+            if indexed is not None and index in indexed:
+                del indexed[index]
+                return True
+            return self.__live(snapshot).delete(index)
+
+    def insert(self, index: int, row: List) -> bool:
+        """
+        Puts a row back at a deleted position, or appends it when index
+        is the position after the last row. The row is stored before its
+        position turns live, so readers never find a live position
+        without its row.
+
+        Args:
+            index (int): Position of the row.
+            row (List): The record.
+
+        Returns:
+            bool: False if the position is taken or out of range.
+        """
+        snapshot = self.snapshot()
+        with self.__lock:
+            dataset = snapshot.data["dataset"]
+            live = self.__live(snapshot)
+            if index in live or not 0 <= index <= live.size:
+                return False
+            if index == len(dataset):
+                dataset.append(row)
+            else:
+                dataset[index] = row
+            indexed = snapshot.data.get("indexed")
+            if indexed is not None:
+                dict.__setitem__(indexed, index, row)
+            live.insert(index)
+        return True
 
     def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
         """
@@ -55,23 +192,68 @@ class Server:
         Returns:
             Dict: Dictionary containing pagination details and data.
         """
-        data = self.indexed_dataset()
-        assert index >= 0 and index <= max(data.keys()), "Index out of range."
-
-        page_index = {}
-        count = index
+        snapshot = self.snapshot()
+        live = self.__live(snapshot)
+        assert index >= 0 and len(live) and \
+            index <= live.select(len(live) - 1), "Index out of range."
 
-        # Collect the items for the requested page size
-        while len(page_index) < page_size and count < len(self.dataset()):
-            if count in data:
-                page_index[count] = data[count]
-            count += 1
-
-        page = list(page_index.values())
-        page_log = page_index.keys()
+        # O(log n + page_size) however many rows were deleted
+        positions = live.page(index, page_size)
+        dataset = snapshot.data["dataset"]
+        page = [dataset[position] for position in positions]
         return {
             'index': index,
-            'next_index': max(page_log) + 1,
+            'next_index': positions[-1] + 1,
             'page_size': len(page),
             'data': page
         }
+
+    def get_cursor_page(self, cursor: str = None,
+                        page_size: int = 10) -> Dict:
+        """
+        Provides a page after or before the rows seen so far, keyed by
+        row position rather than by page number. Rows inserted or
+        deleted elsewhere never shift a page, and any page costs
+        O(log n + page_size) to find.
+
+        Args:
+            cursor (str): next_cursor or prev_cursor of a previous page,
+                None for the first page.
+            page_size (int): Number of items per page, default is 10.
+
+        Returns:
+            Dict: The page, with cursors to the next and previous pages,
+                None when there are no rows that way.
+
+        Raises:
+            ValueError: If the cursor was not made by this server, or for
+                a version of the data since reloaded.
+        """
+        assert isinstance(page_size, int) and page_size > 0, \
+            "Page size must be a positive int."
+        snapshot = self.snapshot()
+        live = self.__live(snapshot)
+        seek = self.__cursors.decode(cursor) if cursor else {"after": -1}
+        if cursor and seek.get("version") != snapshot.version:
+            raise ValueError("Cursor of an older version of the data.")
+        if "before" in seek:
+            positions = live.page_before(seek["before"], page_size)
+            start = end = seek["before"]
+        else:
+            positions = live.page(seek["after"] + 1, page_size)
+            start = end = seek["after"] + 1
+        if positions:
+            start, end = positions[0], positions[-1] + 1
+
+        dataset = snapshot.data["dataset"]
+        version = snapshot.version
+        encode = self.__cursors.encode
+        return {
+            'page_size': len(positions),
+            'data': [dataset[position] for position in positions],
+            'next_cursor': encode({"after": end - 1, "version": version})
+            if live.rank(end) < len(live) else None,
+            'prev_cursor': encode({"before": start, "version": version})
+            if live.rank(start) > 0 else None,
+            'version': version,
+        }
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Asyncio HTTP front end serving the pagination servers as JSON.
+
+Run from the directory holding Popular_Baby_Names.csv, for example:
+    ./async_server.py --port 8080
+    curl 'localhost:8080/get_hyper?page=3&page_size=20&year=2016&sort=-count'
+    curl 'localhost:8080/get_hyper_index?index=10&page_size=5'
+"""
+import argparse
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from reloader import Snapshot, StaleSnapshot
+
+HyperServer = __import__('2-hypermedia_pagination').Server
+index_range = __import__('2-hypermedia_pagination').index_range
+DelServer = __import__('3-hypermedia_del_pagination').Server
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error"}
+
+log = logging.getLogger(__name__)
+
+
+def encode(obj: Any) -> bytes:
+    """Compact JSON bytes of obj."""
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """
+    Split a query string in the arguments of the server calls.
+
+    Returns:
+        Dict[str, Any]: page, page_size and index as ints, sort, and the
+            other keys as filters, "__in" values split on commas.
+    """
+    args, filters = {}, {}
+    for name, value in parse_qsl(query):
+        if name in ("page", "page_size", "index"):
+            args[name] = int(value)
+        elif name == "sort":
+            args["sort"] = tuple(value.split(","))
+        elif name.endswith("__in"):
+            filters[name] = value.split(",")
+        else:
+            filters[name] = value
+    if filters:
+        args["filters"] = filters
+    return args
+
+
+class PaginationService:
+    """JSON endpoints over the pagination servers.
+
+    Server calls run in a thread pool, so parsing the CSV or building an
+    index never stalls the event loop. Responses of get_page and
+    get_hyper are kept in a shared LRU cache keyed by the request and
+    the version of the data, and concurrent requests for a page that is
+    not cached wait for one computation. Pages of more than STREAM_ROWS
+    rows are streamed with chunked encoding instead, CHUNK_ROWS rows
+    built at a time, so a large page is never held in memory whole.
+    get_hyper_index is never cached, rows may be deleted at any time.
+    """
+
+    STREAM_ROWS = 1000
+    CHUNK_ROWS = 500
+
+    def __init__(self, pages: HyperServer = None, indexed: DelServer = None,
+                 cache_size: int = 1024, workers: int = None):
+        """
+        Args:
+            pages (HyperServer): Serves get_page and get_hyper.
+            indexed (DelServer): Serves get_hyper_index.
+            cache_size (int): Number of responses kept.
+            workers (int): Threads of the pool, the executor default if
+                None.
+        """
+        self.pages = pages if pages is not None else HyperServer()
+        self.indexed = indexed if indexed is not None else DelServer()
+        self.cache = OrderedDict()  # Request key -> JSON body, LRU first
+        self.cache_size = cache_size
+        self.pending = {}  # Request key -> future of its body
+        self.pool = ThreadPoolExecutor(workers)
+        self.hits = self.misses = 0
+
+    async def run(self, func, *args) -> Any:
+        """Run a blocking call in the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, func, *args)
+
+    async def warm_up(self):
+        """Load the data of both servers before the first request."""
+        await asyncio.gather(self.run(self.pages.snapshot),
+                             self.run(self.indexed.live_index))
+
+    async def start(self, host: str = "127.0.0.1",
+                    port: int = 8080) -> asyncio.AbstractServer:
+        """Load the data, then accept connections."""
+        await self.warm_up()
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def cached(self, key: Tuple, compute) -> bytes:
+        """
+        Body of a response from the cache, computing it on a miss.
+        Concurrent misses on one key share a single computation.
+        """
+        body = self.cache.get(key)
+        if body is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return body
+        future = self.pending.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = self.pending[key] = asyncio.ensure_future(
+            self.run(lambda: encode(compute())))
+        try:
+            body = await asyncio.shield(future)
+        finally:
+            del self.pending[key]
+        self.cache[key] = body
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return body
+
+    async def dispatch(self, path: str, query: str):
+        """
+        Answer one request.
+
+        Returns:
+            (status, body): body is bytes, or (fields, chunks) to stream.
+        """
+        args = parse_query(query)
+        if path == "/get_hyper_index":
+            return 200, encode(await self.run(
+                lambda: self.indexed.get_hyper_index(**args)))
+        if path not in ("/get_page", "/get_hyper"):
+            return 404, encode({"error": "Unknown endpoint."})
+
+        answer = self.streamed if args.get("page_size", 10) > \
+            self.STREAM_ROWS else self.paged
+        try:
+            return 200, await answer(path, args, self.pages.snapshot())
+        except StaleSnapshot:
+            # The CSV changed before this page's columns were built
+            await self.run(self.pages.reload)
+            return 200, await answer(path, args, self.pages.snapshot())
+
+    async def paged(self, path: str, args: Dict[str, Any],
+                    snapshot: Snapshot) -> bytes:
+        """
+        Body of a get_page or get_hyper response, computed from snapshot
+        and cached under its version.
+
+        Raises:
+            StaleSnapshot: If the page needs a part of snapshot that can
+                no longer be built.
+        """
+        key = (path, tuple(sorted(map(repr, args.items()))),
+               snapshot.version)
+        method = self.pages.get_page if path == "/get_page" else \
+            self.pages.get_hyper
+        return await self.cached(key, lambda: method(**args,
+                                                     snapshot=snapshot))
+
+    async def streamed(self, path: str, args: Dict[str, Any],
+                       snapshot: Snapshot) -> Tuple[dict, AsyncIterator]:
+        """
+        Fields and row chunks of a get_page or get_hyper response too
+        large to build at once, computed from snapshot. The first chunk
+        is built here, so every part of snapshot the page needs exists
+        before the response starts.
+
+        Returns:
+            (fields, chunks): fields is None for get_page, chunks yields
+                lists of at most CHUNK_ROWS rows.
+
+        Raises:
+            StaleSnapshot: As paged().
+        """
+        info = await self.run(lambda: self.pages.get_hyper_info(
+            **args, snapshot=snapshot))
+        begin = index_range(args.get("page", 1), args["page_size"])[0]
+        stop = begin + info["page_size"]
+        filters, sort = args.get("filters"), args.get("sort")
+
+        def rows(start: int) -> List[List]:
+            """The rows of the chunk starting at start."""
+            return self.pages.get_rows(
+                start, min(start + self.CHUNK_ROWS, stop), filters, sort,
+                snapshot)
+
+        first = await self.run(rows, begin)
+
+        async def chunks():
+            """Build the chunks one at a time, in the thread pool."""
+            yield first
+            for start in range(begin + self.CHUNK_ROWS, stop,
+                               self.CHUNK_ROWS):
+                yield await self.run(rows, start)
+
+        return (None if path == "/get_page" else info), chunks()
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int,
+                      body, keep_alive: bool):
+        """Write a response, streaming the rows of a (fields, chunks)
+        body."""
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+        if isinstance(body, bytes):
+            writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n"
+                         .encode() + body)
+            await writer.drain()
+            return
+
+        # A (fields, chunks) body is sent as its JSON, the rows a chunk
+        # at a time, a bare list of rows when fields is None
+        fields, chunks = body
+        if fields is None:
+            opening, closing = b"[", b"]"
+        else:
+            opening = encode(fields)[:-1] + (b',"data":[' if fields
+                                             else b'"data":[')
+            closing = b"]}"
+        writer.write(f"{head}Transfer-Encoding: chunked\r\n\r\n".encode())
+        pieces, first = [opening], True
+        async for rows in chunks:
+            if not rows:
+                continue
+            if not first:
+                pieces.append(b",")
+            pieces.append(encode(rows)[1:-1])
+            self.write_chunk(writer, b"".join(pieces))
+            pieces, first = [], False
+            await writer.drain()
+        pieces.append(closing)
+        self.write_chunk(writer, b"".join(pieces))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def write_chunk(writer: asyncio.StreamWriter, data: bytes):
+        """Write one chunk of a chunked response."""
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """Serve the requests of one connection, keep-alive included."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length:
+                    await reader.readexactly(length)
+                keep_alive = version == "HTTP/1.1" and \
+                    headers.get("connection", "").lower() != "close"
+
+                if method != "GET":
+                    status, body = 405, encode({"error": "GET only."})
+                else:
+                    url = urlsplit(target)
+                    try:
+                        status, body = await self.dispatch(url.path,
+                                                           url.query)
+                    except (AssertionError, TypeError, ValueError) as error:
+                        status, body = 400, encode({"error": str(error)})
+                    except Exception:
+                        log.exception("%s %s failed", method, target)
+                        status, body = 500, encode(
+                            {"error": "Internal server error."})
+                await self.respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Client went away or sent garbage
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    """Start the service and serve until interrupted."""
+    service = PaginationService(
+        HyperServer(lazy=args.lazy, reload_interval=args.reload_interval),
+        DelServer(reload_interval=args.reload_interval),
+        args.cache_size, args.workers)
+    server = await service.start(args.host, args.port)
+    print(f"Serving on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Parse the command line and run the service."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--lazy", action="store_true",
+                        help="serve pages from the row-offset index")
+    parser.add_argument("--reload-interval", type=float)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
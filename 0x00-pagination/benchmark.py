@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Micro benchmarks for the pagination servers of this package.
+
+Run from this directory, for example:
+    ./benchmark.py del_index
+    ./benchmark.py del_index --rows 100000 --deleted 0.9
+    ./benchmark.py load --rows 1000000 --workers 4
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from itertools import islice
+
+from fast_csv import load_rows
+
+DelServer = __import__('3-hypermedia_del_pagination').Server
+
+
+class SyntheticServer(DelServer):
+    """Deletion-resilient server over generated rows instead of the CSV."""
+
+    DATA_FILE = os.devnull  # Only stamped, see read_dataset()
+
+    def __init__(self, rows):
+        """Initialize the server with `rows` generated records."""
+        super().__init__()
+        self.rows = rows
+
+    def read_dataset(self, path):
+        """Generated records, the CSV is never read."""
+        return [[str(2011 + i % 6), "FEMALE", "HISPANIC", f"N{i}",
+                 str(i % 300), str(i % 100)] for i in range(self.rows)]
+
+
+def legacy_hyper_index(server, index=None, page_size=10):
+    """get_hyper_index as it was before the live index, for comparison."""
+    data = server.indexed_dataset()
+    assert index >= 0 and index <= max(data.keys()), "Index out of range."
+
+    page_index = {}
+    count = index
+    while len(page_index) < page_size and count < len(server.dataset()):
+        if count in data:
+            page_index[count] = data[count]
+        count += 1
+
+    page = list(page_index.values())
+    return {
+        'index': index,
+        'next_index': max(page_index.keys()) + 1,
+        'page_size': len(page),
+        'data': page
+    }
+
+
+def deleted_positions(pattern, rows, share, seed=0):
+    """
+    Positions to delete.
+    Args:
+        pattern - "random" positions, or one "block" from the start
+        rows - number of rows
+        share - fraction of the rows to delete
+    """
+    count = int(rows * share)
+    if pattern == "block":
+        return range(count)
+    return random.Random(seed).sample(range(rows), count)
+
+
+def time_pages(lookup, server, starts, page_size):
+    """Average microseconds of lookup(server, start, page_size)."""
+    begin = time.perf_counter()
+    for start in starts:
+        lookup(server, start, page_size)
+    return (time.perf_counter() - begin) / len(starts) * 1e6
+
+
+def bench_del_index(args):
+    """Page lookups after deletions: dict walk against the live index."""
+    print(f"{args.rows:,} rows, {args.deleted:.0%} deleted")
+    print(f"{'pattern':<8} {'lookup':<11} {'pages':>7} {'us/page':>10}")
+    for pattern in args.patterns:
+        server = SyntheticServer(args.rows)
+        server.indexed_dataset()  # Deletions go through the dict too
+        for position in deleted_positions(pattern, args.rows, args.deleted):
+            server.delete(position)
+        last = server.live_index().select(len(server.live_index()) - 1)
+        rng = random.Random(1)
+        starts = [rng.randrange(last + 1) for _ in range(args.pages)]
+        for name, lookup, count in (
+                ("dict walk", legacy_hyper_index, args.legacy_pages),
+                ("live index", DelServer.get_hyper_index, args.pages)):
+            cost = time_pages(lookup, server, starts[:count], args.page_size)
+            print(f"{pattern:<8} {name:<11} {count:>7} {cost:>10.1f}")
+        assert legacy_hyper_index(server, starts[0], args.page_size) == \
+            server.get_hyper_index(starts[0], args.page_size)
+
+
+ETHNICITIES = ("ASIAN AND PACIFIC ISLANDER", "BLACK NON HISPANIC",
+               "HISPANIC", "WHITE NON HISPANIC")
+
+
+def write_names_csv(path, rows, seed=0):
+    """Write a CSV shaped like Popular_Baby_Names.csv with `rows` rows."""
+    rng = random.Random(seed)
+    names = [f"Name{i}" for i in range(2000)]
+    with open(path, "w", newline="") as f:
+        f.write("Year of Birth,Gender,Ethnicity,Child's First Name,"
+                "Count,Rank\n")
+        for start in range(0, rows, 100000):
+            f.write("".join(
+                f"{rng.randrange(2011, 2017)},"
+                f"{rng.choice(('FEMALE', 'MALE'))},"
+                f"{rng.choice(ETHNICITIES)},{rng.choice(names)},"
+                f"{rng.randrange(10, 300)},{rng.randrange(1, 100)}\n"
+                for _ in range(min(100000, rows - start))))
+
+
+def legacy_load(path):
+    """Server.dataset() as it was before fast_csv, for comparison."""
+    with open(path) as f:
+        reader = csv.reader(f)
+        dataset = [row for row in reader]
+    return dataset[1:]
+
+
+def peak_rss():
+    """Peak resident memory of this process in MB."""
+    try:
+        # VmHWM starts over at exec, ru_maxrss keeps the parent's peak
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_load(queue, path, options):
+    """
+    Load path in this process and put (seconds, rows, MB) in queue,
+    MB being how far loading raised the peak resident memory.
+    Args:
+        options - keyword arguments of load_rows, None for legacy_load
+    """
+    before = peak_rss()
+    start = time.perf_counter()
+    rows = legacy_load(path) if options is None else \
+        load_rows(path, **options)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, len(rows), peak_rss() - before))
+
+
+def bench_load(args):
+    """Loading the CSV: csv.reader rows against fast_csv.load_rows."""
+    loaders = [("csv.reader", None), ("fast_csv", {}),
+               ("fast_csv numeric", {"numeric": True}),
+               (f"fast_csv {args.workers} workers",
+                {"workers": args.workers})]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "names.csv")
+        if not os.path.exists(path):
+            write_names_csv(path, args.rows)
+        # Same rows as csv.reader, on a prefix of the file
+        sample = os.path.join(tmp, "sample.csv")
+        with open(path) as f, open(sample, "w") as out:
+            out.writelines(islice(f, 100001))
+        expected = legacy_load(sample)
+        for _, options in loaders[1:]:
+            if options and options.get("numeric"):
+                continue
+            assert load_rows(sample, **(options or {})) == expected
+
+        size = os.path.getsize(path)
+        print(f"{path}: {size / 2 ** 20:,.0f} MB")
+        print(f"{'loader':<22} {'rows':>11} {'seconds':>8} "
+              f"{'rows/sec':>11} {'peak RSS MB':>12}")
+        # One fresh process per loader, so each peak is its own
+        context = multiprocessing.get_context("spawn")
+        for name, options in loaders:
+            queue = context.Queue()
+            process = context.Process(target=measure_load,
+                                      args=(queue, path, options))
+            process.start()
+            elapsed, rows, memory = queue.get()
+            process.join()
+            print(f"{name:<22} {rows:>11,} {elapsed:>8.2f} "
+                  f"{rows / elapsed:>11,.0f} {memory:>12,.0f}")
+
+
+def main():
+    """Parse the command line and run the selected benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    del_index = commands.add_parser("del_index", help=bench_del_index.__doc__)
+    del_index.add_argument("--rows", type=int, default=10 ** 6)
+    del_index.add_argument("--deleted", type=float, default=0.5)
+    del_index.add_argument("--patterns", nargs="+",
+                           choices=["random", "block"],
+                           default=["random", "block"])
+    del_index.add_argument("--page-size", type=int, default=10)
+    del_index.add_argument("--pages", type=int, default=10000)
+    del_index.add_argument("--legacy-pages", type=int, default=50)
+    del_index.set_defaults(run=bench_del_index)
+
+    load = commands.add_parser("load", help=bench_load.__doc__)
+    load.add_argument("--rows", type=int, default=10 ** 7,
+                      help="rows of the generated file")
+    load.add_argument("--path", help="CSV file to load, generated with "
+                      "--rows rows if missing, a temporary one if unset")
+    load.add_argument("--workers", type=int, default=os.cpu_count())
+    load.set_defaults(run=bench_load)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
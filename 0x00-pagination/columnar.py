@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Module for a columnar, NumPy-backed dataset with filtered and sorted views.
+"""
+import csv
+import operator
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+Filters = Dict[str, Any]
+Sort = Union[str, Sequence[str]]
+
+
+class ColumnarDataset:
+    """A CSV file loaded once into one typed array per column.
+
+    Integer columns are int64 arrays. Other columns are dictionary
+    encoded: the sorted distinct values plus an array of small integer
+    codes, so comparing or sorting codes is comparing or sorting values.
+
+    Filters map "column" or "column__op" to a value, op being one of
+    eq (the default), ne, lt, le, gt, ge or in (with a collection), and
+    compile to vectorized boolean masks. A sort is a column name or a
+    sequence of them, "-" marking a descending one. Sort permutations
+    and the positions of recent views are cached, so paging through a
+    view costs time proportional to the page size.
+    """
+
+    OPS = {
+        "eq": operator.eq, "ne": operator.ne,
+        "lt": operator.lt, "le": operator.le,
+        "gt": operator.gt, "ge": operator.ge,
+    }
+    MAX_VIEWS = 32
+
+    def __init__(self, path: str, names: Sequence[str] = None):
+        """
+        Load the CSV file.
+
+        Args:
+            path (str): Path of the CSV file, with a header row.
+            names (Sequence[str]): Column names to use instead of the
+                header, e.g. short names for the filters.
+        """
+        with open(path) as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            values = list(zip(*reader))
+        self.names = list(names or header)
+        self.size = len(values[0]) if values else 0
+        self.columns = {}  # Name -> int64 values or codes
+        self.categories = {}  # Name -> sorted distinct values
+        self.codes = {}  # Name -> {value: code}
+        for name, column in zip(self.names, values or [()] * len(header)):
+            try:
+                self.columns[name] = np.array([int(v) for v in column],
+                                              dtype=np.int64)
+            except ValueError:
+                categories, codes = np.unique(np.array(column),
+                                              return_inverse=True)
+                self.columns[name] = codes.astype(
+                    np.min_scalar_type(len(categories)))
+                self.categories[name] = categories
+                self.codes[name] = {v: i for i, v in
+                                    enumerate(categories.tolist())}
+        self.orders = {}  # Sort key -> permutation of the positions
+        self.views = OrderedDict()  # (filters, sort) -> positions, LRU
+        self.views_lock = threading.Lock()  # Pages are served by threads
+
+    def __len__(self) -> int:
+        """Number of rows."""
+        return self.size
+
+    def _column(self, name: str) -> np.ndarray:
+        """The array of a column, raising ValueError for unknown names."""
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise ValueError(f"Unknown column {name!r}") from None
+
+    def _compare(self, name: str, op: str, value: Any) -> np.ndarray:
+        """Boolean mask of one filter condition."""
+        column = self._column(name)
+        if op not in self.OPS and op != "in":
+            raise ValueError(f"Unknown filter operator {op!r}")
+        if name not in self.categories:
+            if op == "in":
+                return np.isin(column, [int(v) for v in value])
+            return self.OPS[op](column, int(value))
+
+        codes, categories = self.codes[name], self.categories[name]
+        if op == "in":
+            return np.isin(column, [codes[v] for v in value if v in codes])
+        if op in ("eq", "ne"):
+            code = codes.get(value, -1)
+            return self.OPS[op](column, code)
+        # Codes follow the order of the values, compare with a bound
+        side = "left" if op in ("lt", "ge") else "right"
+        bound = int(np.searchsorted(categories, value, side))
+        return column < bound if op in ("lt", "le") else column >= bound
+
+    def mask(self, filters: Filters) -> np.ndarray:
+        """
+        Compile filters to a boolean mask over the rows.
+
+        Args:
+            filters (Filters): Conditions that must all hold.
+
+        Returns:
+            np.ndarray: True for the rows matching every condition.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for spec, value in filters.items():
+            name, _, op = spec.partition("__")
+            mask &= self._compare(name, op or "eq", value)
+        return mask
+
+    def order(self, sort: Tuple[str, ...]) -> np.ndarray:
+        """
+        Permutation of the positions sorting the rows, cached per sort.
+        Ties keep the file order.
+
+        Args:
+            sort (Tuple[str, ...]): Column names, "-" for descending.
+
+        Returns:
+            np.ndarray: Positions in sorted order.
+        """
+        order = self.orders.get(sort)
+        if order is None:
+            keys = []
+            for spec in reversed(sort):  # lexsort takes the primary last
+                column = self._column(spec.lstrip("-"))
+                if spec.startswith("-"):
+                    column = -column.astype(np.int64)
+                keys.append(column)
+            order = self.orders[sort] = np.lexsort(keys)
+        return order
+
+    @staticmethod
+    def _key(filters: Filters, sort: Sort) -> Tuple:
+        """Hashable key of a view."""
+        if isinstance(sort, str):
+            sort = (sort,)
+        conditions = tuple(sorted(
+            (spec, frozenset(value) if spec.endswith("__in") else value)
+            for spec, value in (filters or {}).items()))
+        return conditions, tuple(sort or ())
+
+    def view(self, filters: Filters = None, sort: Sort = None) -> np.ndarray:
+        """
+        Positions of the rows matching filters, in sort order.
+
+        Args:
+            filters (Filters): Conditions the rows must match, or None.
+            sort (Sort): Sort order, or None for the file order.
+
+        Returns:
+            np.ndarray: The positions, cached for later pages.
+        """
+        key = self._key(filters, sort)
+        with self.views_lock:
+            view = self.views.get(key)
+            if view is not None:
+                self.views.move_to_end(key)
+                return view
+
+        conditions, sort = key
+        order = self.order(sort) if sort else None
+        if not conditions:
+            view = order if order is not None else np.arange(self.size)
+        else:
+            mask = self.mask(dict(conditions))
+            view = np.flatnonzero(mask) if order is None else \
+                order[mask[order]]
+        with self.views_lock:
+            self.views[key] = view
+            if len(self.views) > self.MAX_VIEWS:
+                self.views.popitem(last=False)
+        return view
+
+    def rows(self, positions: np.ndarray) -> List[List]:
+        """
+        Build the rows at some positions, as lists of strings like
+        csv.reader gives.
+        """
+        columns = []
+        for name in self.names:
+            values = self.columns[name][positions]
+            if name in self.categories:
+                columns.append(self.categories[name][values].tolist())
+            else:
+                columns.append([str(v) for v in values.tolist()])
+        return [list(row) for row in zip(*columns)]
+
+    def page(self, begin: int, stop: int, filters: Filters = None,
+             sort: Sort = None) -> List[List]:
+        """
+        Rows between two positions of a view.
+
+        Args:
+            begin (int): Position of the first row in the view.
+            stop (int): Position after the last row in the view.
+            filters (Filters): Conditions the rows must match, or None.
+            sort (Sort): Sort order, or None for the file order.
+
+        Returns:
+            List[List]: The rows, fewer at the end of the view.
+        """
+        return self.rows(self.view(filters, sort)[begin:stop])
+
+    def count(self, filters: Filters = None) -> int:
+        """Number of rows matching filters."""
+        return len(self.view(filters))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Module for loading a large CSV file into rows quickly and compactly.
+"""
+import csv
+import gc
+import io
+import locale
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterator, List, Tuple
+
+CHUNK_SIZE = 1 << 22  # Bytes parsed at a time
+# Columns with more distinct values than this share of their first
+# chunk, e.g. names or ids, are not interned
+MAX_DISTINCT_SHARE = 0.5
+
+
+def _records(f, chunk_size: int) -> Iterator[bytes]:
+    """
+    Split a binary file in chunks of whole records: a chunk ends at a
+    line end outside of quotes, so no quoted field is cut in two.
+
+    Yields:
+        bytes: About chunk_size bytes, the last chunk may be shorter.
+    """
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        chunk += f.readline()
+        quotes = chunk.count(b'"')
+        while quotes % 2:
+            line = f.readline()
+            if not line:
+                break
+            chunk += line
+            quotes += line.count(b'"')
+        yield chunk
+
+
+def _decode(chunk: bytes, encoding: str) -> str:
+    """Text of a chunk, newlines translated like open() does."""
+    text = chunk.decode(encoding)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if not text.endswith("\n"):
+        text += "\n"
+    return text
+
+
+def _split(text: str, width: int) -> List[List[str]]:
+    """
+    Fields of a chunk, column by column.
+
+    Plain chunks, without quotes and with width fields on every line,
+    are split with two bulk string operations. The others go through
+    csv.reader, and are returned as rows if some line has another
+    width, e.g. a blank line.
+
+    Returns:
+        List[List[str]]: The columns, or None and the rows.
+    """
+    if '"' not in text and "\0" not in text and "\n\n" not in text \
+            and not text.startswith("\n"):
+        # A NUL field after every line: the lines all have width fields
+        # if and only if the NULs are every width + 1 fields
+        fields = text.replace("\n", ",\0,").split(",")
+        fields.pop()  # After the last line end
+        lines = len(fields) // (width + 1)
+        if len(fields) == lines * (width + 1) and \
+                fields[width::width + 1].count("\0") == lines:
+            return [fields[j::width + 1] for j in range(width)], None
+    rows = list(csv.reader(io.StringIO(text)))
+    if any(len(row) != width for row in rows):
+        return None, rows
+    return [list(column) for column in zip(*rows)], None
+
+
+def _encode_range(path: str, start: int, stop: int, width: int,
+                  encoding: str) -> Tuple:
+    """
+    Parse the bytes start .. stop of a file in a worker process, each
+    column dictionary encoded so little has to be sent back: its
+    distinct values and an array of their codes.
+
+    Returns:
+        Tuple: The (values, codes) of every column, (None, values) for
+            columns with many distinct values, or None and the rows.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = _decode(f.read(stop - start), encoding)
+    columns, rows = _split(text, width)
+    if columns is None:
+        return None, rows
+    encoded = []
+    for column in columns:
+        values = list(dict.fromkeys(column))
+        if len(values) > MAX_DISTINCT_SHARE * len(column):
+            encoded.append((None, column))
+            continue
+        codes = {value: code for code, value in enumerate(values)}
+        encoded.append((values, array("I", map(codes.__getitem__,
+                                               column))))
+    return encoded, None
+
+
+def load_rows(path: str, skip_header: bool = True, numeric: bool = False,
+              workers: int = None, chunk_size: int = CHUNK_SIZE,
+              encoding: str = None) -> List[List]:
+    """
+    Load the rows of a CSV file, as csv.reader would read them.
+
+    The file is read a chunk at a time and plain chunks are split with
+    bulk string operations instead of field by field. The values of a
+    column with few distinct values, e.g. a year, a gender or an
+    ethnicity, are interned: all equal values are one str object.
+    The garbage collector is paused meanwhile, the rows hold no cycles
+    and would otherwise trigger a full collection every few thousand.
+
+    Args:
+        path (str): Path of the CSV file.
+        skip_header (bool): Leave the first row out.
+        numeric (bool): Turn the columns whose values are all integers
+            into ints, e.g. "2016" into 2016, over the whole file: a
+            column is either all ints or all strs.
+        workers (int): Processes parsing chunks in parallel, None or 1
+            to parse them all in this process.
+        chunk_size (int): Bytes per chunk.
+        encoding (str): Encoding of the file, open()'s default if None.
+
+    Returns:
+        List[List]: The rows. Rows of chunks holding lines of another
+            width than the header are kept as csv.reader returns them.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            header = _header(f, encoding)
+            if header is None:
+                return []
+            width = len(header)
+            if workers is not None and workers > 1:
+                chunks = _parse_parallel(f, path, width, workers,
+                                         chunk_size, encoding)
+            else:
+                chunks = (_split(_decode(chunk, encoding), width)
+                          for chunk in _records(f, chunk_size))
+            rows = _assemble(chunks, width, numeric)
+    finally:
+        if enabled:
+            gc.enable()
+    if not skip_header:
+        rows.insert(0, header)
+    return rows
+
+
+def _header(f, encoding: str) -> List[str]:
+    """Read and parse the header row, None if the file is empty."""
+    line = f.readline()
+    while line.count(b'"') % 2:
+        more = f.readline()
+        if not more:
+            break
+        line += more
+    if not line:
+        return None
+    return next(csv.reader(io.StringIO(_decode(line, encoding))), [])
+
+
+def _parse_parallel(f, path: str, width: int, workers: int,
+                    chunk_size: int, encoding: str) -> Iterator[Tuple]:
+    """
+    Parse the chunks of an open file across a process pool.
+
+    Yields:
+        Tuple: The columns of each chunk, in file order, or None and
+            the rows.
+    """
+    starts, stops = [], []
+    start = f.tell()
+    for chunk in _records(f, chunk_size):
+        starts.append(start)
+        start += len(chunk)
+        stops.append(start)
+    with ProcessPoolExecutor(workers) as pool:
+        for encoded, rows in pool.map(_encode_range, repeat(path), starts,
+                                      stops, repeat(width),
+                                      repeat(encoding)):
+            if encoded is None:
+                yield None, rows
+                continue
+            yield [column if values is None else (values, column)
+                   for values, column in encoded], None
+
+
+def _assemble(chunks: Iterator[Tuple], width: int,
+              numeric: bool) -> List[List]:
+    """
+    Intern the columns of every chunk and zip them into rows.
+
+    Args:
+        chunks (Iterator[Tuple]): (columns, None) or (None, rows) per
+            chunk, a column being a list of values or a (distinct
+            values, codes) pair.
+        width (int): Number of columns.
+        numeric (bool): Turn all-integer columns into ints.
+
+    Returns:
+        List[List]: The rows.
+    """
+    canons = [{} for _ in range(width)]  # Column -> {value: value}
+    parts = []  # Columns or rows of each chunk, kept if numeric
+    rows = []
+    first = True
+    for columns, chunk_rows in chunks:
+        if columns is None:
+            parts.append((None, chunk_rows))
+            if not numeric:
+                rows.extend(chunk_rows)
+            continue
+        for j, column in enumerate(columns):
+            canon = canons[j]
+            if isinstance(column, tuple):
+                values, codes = column
+                if canon is not None:
+                    values = list(map(canon.setdefault, values, values))
+                columns[j] = list(map(values.__getitem__, codes))
+            elif canon is not None:
+                columns[j] = list(map(canon.setdefault, column, column))
+                if first and len(canon) > MAX_DISTINCT_SHARE * len(column):
+                    canons[j] = None
+        first = False
+        if numeric:
+            parts.append((columns, None))
+        else:
+            rows.extend(map(list, zip(*columns)))
+    if not numeric:
+        return rows
+
+    for j in range(width):
+        _to_ints(parts, j, canons[j])
+    for columns, chunk_rows in parts:
+        rows.extend(map(list, zip(*columns)) if columns is not None
+                    else chunk_rows)
+    return rows
+
+
+def _to_ints(parts: List[Tuple], j: int, canon: dict):
+    """
+    Turn column j of every chunk into ints if all its values are, rows
+    of chunks kept as csv.reader returns them included, so a column is
+    of one type throughout. An interned column is converted once per
+    distinct value.
+    """
+    chunks = [columns for columns, _ in parts if columns is not None]
+    ragged = [row for columns, rows in parts if columns is None
+              for row in rows if len(row) > j]
+    try:
+        if canon is not None:
+            ints = {value: int(value) for value in canon}
+            converted = [list(map(ints.__getitem__, columns[j]))
+                         for columns in chunks]
+        else:
+            converted = [list(map(int, columns[j])) for columns in chunks]
+        values = [int(row[j]) for row in ragged]
+    except ValueError:
+        return
+    for columns, column in zip(chunks, converted):
+        columns[j] = column
+    for row, value in zip(ragged, values):
+        row[j] = value
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Module for a Fenwick tree over the live row positions of a dataset.
+"""
+from typing import List
+
+
+class LiveIndex:
+    """Rank and select over the positions of a dataset that still exist.
+
+    A bytearray flags every position as live or deleted, and a Fenwick
+    (binary indexed) tree counts the live positions, so deleting or
+    restoring a position, counting the live positions before it (rank)
+    and finding the k-th live position (select) all take O(log n).
+    A page selects its first position once, then walks the flags to the
+    next live ones with bytearray.find: O(log n + page_size), plus a
+    scan in C over the deleted positions in between.
+    """
+
+    def __init__(self, size: int):
+        """
+        Index positions 0 .. size - 1, all of them live.
+
+        Args:
+            size (int): Number of positions.
+        """
+        self.flags = bytearray(b"\x01") * size
+        self.live = size
+        self.tree = [0] * (size + 1)  # 1-based Fenwick tree
+        for i in range(1, size + 1):
+            # Build in O(n): every node pushes its count to its parent
+            self.tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= size:
+                self.tree[parent] += self.tree[i]
+        self.top = 1 << size.bit_length() if size else 0
+
+    def __len__(self) -> int:
+        """Number of live positions."""
+        return self.live
+
+    def __contains__(self, position: int) -> bool:
+        """Whether position exists and was not deleted."""
+        return 0 <= position < self.size and self.flags[position] == 1
+
+    @property
+    def size(self) -> int:
+        """Number of positions, live or deleted."""
+        return len(self.flags)
+
+    def _add(self, position: int, delta: int):
+        """Add delta to the count of position."""
+        tree, size = self.tree, len(self.flags)
+        i = position + 1
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def delete(self, position: int) -> bool:
+        """
+        Mark a position as deleted.
+
+        Returns:
+            bool: True if the position was live.
+        """
+        if position not in self:
+            return False
+        self.flags[position] = 0
+        self.live -= 1
+        self._add(position, -1)
+        return True
+
+    def insert(self, position: int) -> bool:
+        """
+        Mark a deleted position as live again, or append the position
+        right after the last one.
+
+        Returns:
+            bool: True if the position was not live.
+        """
+        if position == self.size:
+            self._append()
+            return True
+        if not 0 <= position < self.size or self.flags[position]:
+            return False
+        self.flags[position] = 1
+        self.live += 1
+        self._add(position, 1)
+        return True
+
+    def _append(self):
+        """Add one live position after the last one."""
+        i = self.size + 1
+        # The new node counts the range (i - lowbit(i), i]
+        lowest = i - (i & -i)
+        self.tree.append(self.rank(i - 1) - self.rank(lowest) + 1)
+        self.flags.append(1)
+        self.live += 1
+        if i >= self.top:
+            self.top = 1 << i.bit_length()
+
+    def rank(self, position: int) -> int:
+        """Number of live positions before position."""
+        tree = self.tree
+        count = 0
+        i = min(position, self.size)
+        while i > 0:
+            count += tree[i]
+            i -= i & -i
+        return count
+
+    def select(self, k: int) -> int:
+        """
+        Position of the k-th live position, counting from 0.
+
+        Returns:
+            int: The position, or None if fewer than k + 1 are live.
+        """
+        if not 0 <= k < self.live:
+            return None
+        tree, size = self.tree, len(self.flags)
+        i, step = 0, self.top
+        while step:
+            j = i + step
+            if j <= size and tree[j] <= k:
+                i = j
+                k -= tree[j]
+            step >>= 1
+        return i
+
+    def _walk(self, first: int, count: int) -> List[int]:
+        """The count live positions from the first-th on, in order."""
+        if count <= 0:
+            return []
+        position = self.select(first)
+        positions = [position]
+        find = self.flags.find
+        for _ in range(count - 1):
+            position = find(1, position + 1)
+            positions.append(position)
+        return positions
+
+    def page(self, position: int, page_size: int) -> List[int]:
+        """
+        The first page_size live positions at or after position, found
+        in O(log n + page_size) whatever was deleted.
+
+        Args:
+            position (int): First position to consider.
+            page_size (int): Number of positions wanted.
+
+        Returns:
+            List[int]: The positions, fewer at the end of the dataset.
+        """
+        first = self.rank(position)
+        return self._walk(first, min(page_size, self.live - first))
+
+    def page_before(self, position: int, page_size: int) -> List[int]:
+        """
+        The last page_size live positions before position, in order.
+
+        Args:
+            position (int): First position not to consider.
+            page_size (int): Number of positions wanted.
+
+        Returns:
+            List[int]: The positions, fewer at the start of the dataset.
+        """
+        stop = self.rank(position)
+        first = max(stop - page_size, 0)
+        return self._walk(first, stop - first)
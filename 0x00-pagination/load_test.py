@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Load test of the asyncio pagination service.
+
+Start ./async_server.py first, then run for example:
+    ./load_test.py
+    ./load_test.py --path /get_page --concurrency 1 8 64 --requests 5000
+    ./load_test.py --path /get_hyper_index --pages 100000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Read one response, plain or chunked, and return its status."""
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding":
+            chunked = "chunked" in value.lower()
+    if not chunked:
+        await reader.readexactly(length)
+        return status
+    while True:
+        size = int(await reader.readline(), 16)
+        await reader.readexactly(size + 2)  # The chunk and its CRLF
+        if not size:
+            return status
+
+
+async def client(args, targets, latencies, errors):
+    """Send requests on one keep-alive connection until targets run out."""
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        while targets:
+            target = targets.pop()
+            request = (f"GET {target} HTTP/1.1\r\n"
+                       f"Host: {args.host}\r\n\r\n").encode()
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def make_targets(args, count, seed=0):
+    """Request targets on pages drawn at random, hot pages first."""
+    rng = random.Random(seed)
+    name = "index" if args.path == "/get_hyper_index" else "page"
+    first = 0 if name == "index" else 1
+    # Zipf-like popularity: low pages are requested the most
+    pages = [first + int(args.pages ** rng.random()) - 1
+             for _ in range(count)]
+    return [f"{args.path}?{name}={max(page, first)}"
+            f"&page_size={args.page_size}" for page in pages]
+
+
+async def run_level(args, concurrency):
+    """Run one concurrency level, returning its latencies and errors."""
+    targets = make_targets(args, args.requests, seed=concurrency)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, targets, latencies, errors)
+                           for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+async def main_async(args):
+    """Run every concurrency level and print a line per level."""
+    print(f"{'clients':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>7}")
+    for concurrency in args.concurrency:
+        elapsed, latencies, errors = await run_level(args, concurrency)
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{concurrency:>8} {len(latencies) / elapsed:>10,.0f} "
+              f"{cuts[49] * 1e3:>8.2f} {cuts[98] * 1e3:>8.2f} "
+              f"{len(errors):>7}")
+
+
+def main():
+    """Parse the command line and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--path", default="/get_hyper",
+                        choices=["/get_page", "/get_hyper",
+                                 "/get_hyper_index"])
+    parser.add_argument("--pages", type=int, default=1000,
+                        help="number of distinct pages requested")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 4, 16, 64, 256])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Module for reloading a data file in the background, snapshot by snapshot.
+"""
+import os
+import threading
+from typing import Any, Callable, NamedTuple, Tuple
+
+
+class Snapshot(NamedTuple):
+    """One parsed version of a data file.
+
+    Attributes:
+        version (int): 1 for the first load, one more for every reload.
+        stamp (Tuple[int, int, int]): Size, mtime_ns and inode of the
+            file parsed.
+        data (Any): What the load function built from the file, a dict
+            of parts when some are built later, see Reloader.part().
+    """
+    version: int
+    stamp: Tuple[int, int, int]
+    data: Any
+
+
+class StaleSnapshot(ValueError):
+    """The file changed since a snapshot, whose missing parts can no
+    longer be built from it."""
+
+
+class Reloader:
+    """Keeps the latest snapshot of a file, reparsing it when it changes.
+
+    Readers take the current snapshot once per request and use only that
+    one, so a reload never blocks them: the new version is parsed on the
+    watcher thread, then swapped in with a single reference assignment.
+    Requests in flight finish on the snapshot they started with.
+    Writers should replace the file atomically (write a copy, then
+    os.replace it), or a reload may parse a half written file.
+    """
+
+    def __init__(self, path: str, load: Callable[[str], Any],
+                 interval: float = None):
+        """
+        Args:
+            path (str): Path of the data file.
+            load (Callable[[str], Any]): Parses the file at a path.
+            interval (float): Seconds between two checks of the file in
+                the background, None to never reload.
+        """
+        self.path = path
+        self.load = load
+        self.current = None
+        self.lock = threading.Lock()  # One load at a time
+        # Lazy parts are built under a lock of their own, so a reload
+        # parsing the file never holds up a request needing one
+        self.part_locks = {}  # (version, name) -> lock, while building
+        self._part_guard = threading.Lock()  # Guards part_locks
+        self._watcher = None
+        if interval is not None:
+            self.start(interval)
+
+    def _stamp(self) -> Tuple[int, int, int]:
+        """Size, mtime and inode of the file, which change when it is
+        rewritten or replaced."""
+        stat = os.stat(self.path)
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def _build(self, version: int) -> Snapshot:
+        """Parse the file, stamped before parsing so no change is missed."""
+        stamp = self._stamp()
+        return Snapshot(version, stamp, self.load(self.path))
+
+    def snapshot(self) -> Snapshot:
+        """Returns the current snapshot, loading the file on first use."""
+        current = self.current
+        if current is None:
+            with self.lock:
+                if self.current is None:
+                    self.current = self._build(1)
+                current = self.current
+        return current
+
+    def part(self, snapshot: Snapshot, name: str,
+             build: Callable[[str], Any]) -> Any:
+        """
+        Returns a part of a snapshot, building it from the file on first
+        use, as long as the file is still the one the snapshot parsed:
+        a snapshot never mixes two versions of the file. Builds of the
+        same part wait for each other, not for a reload.
+
+        Args:
+            snapshot (Snapshot): Snapshot whose data is a dict of parts.
+            name (str): Name of the part.
+            build (Callable[[str], Any]): Builds the part from the file.
+
+        Raises:
+            StaleSnapshot: If the file changed since the snapshot.
+        """
+        parts = snapshot.data
+        part = parts.get(name)
+        if part is not None:
+            return part
+        key = (snapshot.version, name)
+        with self._part_guard:
+            lock = self.part_locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                part = parts.get(name)
+                if part is None:
+                    if self._stamp() != snapshot.stamp:
+                        raise StaleSnapshot(f"{self.path} changed since "
+                                            f"version {snapshot.version}.")
+                    part = build(self.path)
+                    if self._stamp() != snapshot.stamp:
+                        raise StaleSnapshot(f"{self.path} changed while "
+                                            f"building {name}.")
+                    parts[name] = part
+        finally:
+            with self._part_guard:
+                self.part_locks.pop(key, None)
+        return part
+
+    def check(self) -> bool:
+        """
+        Reload the file if it changed since the current snapshot.
+
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        current = self.current
+        if current is None or self._stamp() == current.stamp:
+            return False
+        with self.lock:
+            current = self.current
+            if self._stamp() == current.stamp:
+                return False
+            self.current = self._build(current.version + 1)
+        return True
+
+    def start(self, interval: float = 1.0):
+        """
+        Check the file every interval seconds from a daemon thread.
+
+        Args:
+            interval (float): Seconds between two checks.
+        """
+        self.stop()
+        stop = threading.Event()
+
+        def watch():
+            """Reload until stopped, keeping the old snapshot on errors."""
+            while not stop.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    # A missing or half written file: serve the current
+                    # snapshot and try again at the next check
+                    continue
+
+        self._watcher = stop
+        threading.Thread(target=watch, name="dataset-reloader",
+                         daemon=True).start()
+
+    def stop(self):
+        """Stop the background checks, if running."""
+        if self._watcher is not None:
+            self._watcher.set()
+            self._watcher = None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Module for a lazy, memory-mapped row index over a CSV file.
+"""
+import csv
+import io
+import mmap
+import os
+import struct
+from array import array
+from itertools import islice
+from typing import Iterator, List
+
+
+class RowIndex:
+    """Byte offsets of the rows of a CSV file, served from a mapping.
+
+    The file is scanned once to record where every row starts, in an
+    array('Q') that is cached to a sidecar file next to the CSV. Pages
+    are then read by slicing the memory-mapped file and parsing only the
+    requested rows, so memory use does not grow with the rows served.
+    """
+
+    SIDECAR = ".idx"
+    HEADER = struct.Struct("<QQ")  # Size and mtime_ns of the indexed CSV
+
+    def __init__(self, path: str, skip_header: bool = True):
+        """
+        Load the index from its sidecar, or build it if missing or stale.
+
+        Args:
+            path (str): Path of the CSV file.
+            skip_header (bool): Whether the first row is a header.
+        """
+        self.path = path
+        self.sidecar_path = path + self.SIDECAR
+        self.skip_header = skip_header
+        self.file = open(path, "rb")
+        stat = os.fstat(self.file.fileno())
+        self.stamp = (stat.st_size, stat.st_mtime_ns)
+        self.offsets = self._load() or self._build()
+        self.map = None
+        if stat.st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        """Number of rows, the header excluded."""
+        return len(self.offsets) - 1
+
+    def _load(self) -> array:
+        """
+        Read the offsets from the sidecar file.
+
+        Returns:
+            array: The offsets, or None if the sidecar is missing or was
+            written for another version of the CSV.
+        """
+        try:
+            with open(self.sidecar_path, "rb") as f:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size or \
+                        self.HEADER.unpack(header) != self.stamp:
+                    return None
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+        except FileNotFoundError:
+            return None
+        return offsets if offsets else None
+
+    def _build(self) -> array:
+        """
+        Scan the CSV for row boundaries and write the sidecar file.
+        A newline inside a quoted field does not end a row.
+
+        Returns:
+            array: Offset of the start of every row, then the file size.
+        """
+        offsets = array("Q")
+        offset = quotes = 0
+        self.file.seek(0)
+        for line in self.file:
+            if not quotes & 1:
+                offsets.append(offset)
+            quotes += line.count(b'"')
+            offset += len(line)
+        offsets.append(offset)
+        if self.skip_header and len(offsets) > 1:
+            del offsets[0]
+
+        tmp_path = self.sidecar_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.HEADER.pack(*self.stamp))
+            offsets.tofile(f)
+        os.replace(tmp_path, self.sidecar_path)
+        return offsets
+
+    def rows(self, begin: int, stop: int) -> List[List]:
+        """
+        Parse the rows between two positions.
+
+        Args:
+            begin (int): Position of the first row.
+            stop (int): Position after the last row.
+
+        Returns:
+            List[List]: The rows, fewer if the file ends before stop.
+        """
+        stop = min(stop, len(self))
+        if begin >= stop:
+            return []
+        chunk = self.map[self.offsets[begin]:self.offsets[stop]]
+        return list(csv.reader(io.StringIO(chunk.decode(), newline="")))
+
+    def iter_rows(self, begin: int = 0) -> Iterator[List]:
+        """
+        Stream the rows from a position on, in one sequential read.
+
+        Args:
+            begin (int): Position of the first row.
+
+        Yields:
+            List: One row at a time, up to the last indexed row.
+        """
+        if begin >= len(self):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[begin])
+            text = io.TextIOWrapper(f, newline="")
+            yield from islice(csv.reader(text), len(self) - begin)
+
+    def close(self):
+        """Release the mapping and the file."""
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
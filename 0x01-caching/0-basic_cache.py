@@ -12,17 +12,22 @@ class BasicCache(BaseCaching):
     This caching system has no limit on the number of items it can store.
     """
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """
         Add an item in the cache.
         If key or item is None, do nothing.
+        The item expires after ttl seconds, or the default ttl if None.
         """
         if key is not None and item is not None:
-            self.cache_data[key] = item
+            if key in self.cache_data:
+                self._remove(key)
+            self._store(key, item, self._size_of(item), ttl)
 
     def get(self, key):
         """
         Get an item by key from the cache.
         Return None if key is None or if key doesn't exist in cache.
         """
-        return self.cache_data.get(key, None)
+        if not self._lookup(key):
+            return None
+        return self.cache_data[key]
@@ -3,42 +3,43 @@
 Module to implement FIFO Caching
 """
 from base_caching import BaseCaching
+from collections import OrderedDict
 
 
 class FIFOCache(BaseCaching):
     """
     FIFOCache is a caching system that uses a First-In-First-Out
     (FIFO) algorithm.
-    It inherits from BaseCaching and has a maximum size defined by MAX_ITEMS.
+    It inherits from BaseCaching and is bounded by max_items and,
+    optionally, max_bytes.
     """
+    PLAIN_PUT = True
 
-    def __init__(self):
-        """Initialize the cache with parent init and a list to track order."""
-        super().__init__()
-        self.order = []  # List to track the insertion order of keys
+    def __init__(self, *args, **kwargs):
+        """Initialize the cache using OrderedDict to keep insertion order."""
+        super().__init__(*args, **kwargs)
+        self.cache_data = OrderedDict()  # OrderedDict to track insertion order
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """
         Add an item in the cache following FIFO replacement policy.
         Args:
             key - the key of the data to be added
             item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
         """
         if key is not None and item is not None:
+            size = self._size_of(item)
             # If key already exists, remove it to update order
             if key in self.cache_data:
-                self.order.remove(key)
+                self._remove(key)
 
-            # Add key to the order list
-            self.order.append(key)
-            self.cache_data[key] = item
+            # FIFO - remove the oldest items until the new one fits
+            if not self._make_room(size):
+                return
 
-            # Check if we exceed MAX_ITEMS, and apply FIFO removal if necessary
-            if len(self.cache_data) > BaseCaching.MAX_ITEMS:
-                # FIFO - remove the oldest item
-                first_key = self.order.pop(0)
-                del self.cache_data[first_key]
-                print(f"DISCARD: {first_key}")
+            # Add the item at the end of the insertion order
+            self._store(key, item, size, ttl)
 
     def get(self, key):
         """
@@ -48,4 +49,10 @@ class FIFOCache(BaseCaching):
         Returns:
             Value of the item if found, None if key is None or doesn't exist.
         """
-        return self.cache_data.get(key, None)
+        if not self._lookup(key):
+            return None
+        return self.cache_data[key]
+
+    def _victim(self):
+        """Oldest inserted key."""
+        return next(iter(self.cache_data))
@@ -2,44 +2,56 @@
 """
 Module implements LFU (Least Frequently Used) Cache Logic
 """
-from base_caching import BaseCaching
+from base_caching import TOMBSTONE, BaseCaching
+from slab import Slab
 
 
 class LFUCache(BaseCaching):
-    """This class defines LFUCache inheriting from BaseCaching"""
+    """This class defines LFUCache inheriting from BaseCaching
 
-    def __init__(self):
+    Keys are grouped in frequency buckets (frequency -> list of keys).
+    Each bucket keeps its keys in access order, so the least recently
+    used key of the lowest frequency is always at the front of the
+    ``min_freq`` bucket and get, put and evict are all O(1).
+    The buckets are linked lists in a Slab, which holds a key and its
+    frequency in one slot instead of a dict entry and an OrderedDict node.
+    That saves memory at the cost of throughput: 157 instead of 229 bytes
+    per entry at 100k entries, but the zipf trace replays at 338k instead
+    of 493k ops/sec, see ./benchmark.py traces --policies LFU 'LFU old'.
+    """
+
+    def __init__(self, *args, **kwargs):
         """Class Constructor"""
-        super().__init__()
-        self.freq_map = {}  # Map to track frequency of each key
-        self.lfu_order = []  # List to track the order of keys by frequency
-        self.min_freq = 0  # Track the minimum frequency
+        super().__init__(*args, **kwargs)
+        self.slab = Slab()  # Bucket lists, the tag of a key is its frequency
+        self.slots = {}  # Key -> its slot in the slab
+        self.buckets = {}  # Frequency -> sentinel of its keys (LRU first)
+        self.min_freq = 0  # Lowest frequency in use, 0 until the first put
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """
         This method allows adding a key-value pair to the cache.
         Args:
             key - the key of the data to be added
             item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
         """
         if key is None or item is None:
             return
 
+        size = self._size_of(item)
+        freq = 0
         if key in self.cache_data:
-            # Update existing item
-            self.cache_data[key] = item
-            self._update_frequency(key)
-            return
+            # Updating an item counts as one more use of it
+            freq = self.slab.tags[self.slots[key]]
+            self._remove(key)
 
-        # If cache is full, evict least frequently used item
-        if len(self.cache_data) >= BaseCaching.MAX_ITEMS:
-            self._evict()
+        # Evict least frequently used items until the new one fits
+        if not self._make_room(size):
+            return
 
-        # Add new item to cache
-        self.cache_data[key] = item
-        self.freq_map[key] = 1
-        self.lfu_order.append(key)
-        self.min_freq = 1  # Reset min frequency to 1
+        self._store(key, item, size, ttl)
+        self._link(key, freq + 1)
 
     def get(self, key):
         """
@@ -49,35 +61,128 @@ class LFUCache(BaseCaching):
         Returns:
             Value of the item if found, None if key is None or doesn't exist.
         """
-        if key is None or key not in self.cache_data:
+        if not self._lookup(key):
             return None
 
         # Update the frequency of the key
         self._update_frequency(key)
         return self.cache_data[key]
 
+    def put_many(self, mapping, ttl=None):
+        """
+        Add several items in one pass, an update counting one more use.
+        The evictions are the same as with one put per item.
+        Args:
+            mapping - dict of the keys and items to be added
+            ttl - seconds the items stay valid, the default ttl if None
+        """
+        if not self._batch_ready(ttl):
+            super().put_many(mapping, ttl)
+            return
+        data, slots, tags = self.cache_data, self.slots, self.slab.tags
+        remove, make_room, link = self._remove, self._make_room, self._link
+        max_items = self.max_items
+        tombstones = self.tombstones
+        inserts = 0
+        for key, item in mapping.items():
+            if key is None or item is None:
+                continue
+            freq = 0
+            if key in data:
+                freq = tags[slots[key]]
+                remove(key)
+            elif len(data) >= max_items:
+                make_room(0)
+            data[key] = item
+            if item is TOMBSTONE:
+                tombstones[key] = None
+            link(key, freq + 1)
+            inserts += 1
+        self.inserts += inserts
+
+    def _bucket(self, freq):
+        """Sentinel of the list of keys used freq times, created if new."""
+        head = self.buckets.get(freq)
+        if head is None:
+            head = self.buckets[freq] = self.slab.new_list()
+        return head
+
+    def _unlink(self, slot, freq):
+        """
+        Take a slot out of its bucket, dropping the bucket if empty.
+        Returns:
+            True if the bucket was dropped
+        """
+        slab = self.slab
+        slab.unlink(slot)
+        head = self.buckets[freq]
+        if not slab.empty(head):
+            return False
+        del self.buckets[freq]
+        slab.release(head)
+        return True
+
+    def _link(self, key, freq):
+        """Place the key at the most recent end of the freq bucket."""
+        slot = self.slab.alloc(key, freq)
+        self.slots[key] = slot
+        self.slab.append(self._bucket(freq), slot)
+        if not self.min_freq or freq < self.min_freq:
+            self.min_freq = freq
+
     def _update_frequency(self, key):
-        """Update the frequency of the given key."""
-        freq = self.freq_map[key]
-        self.freq_map[key] += 1
-        new_freq = self.freq_map[key]
-
-        # Update LFU order
-        self.lfu_order.remove(key)
-        self.lfu_order.append(key)
-
-        # If was the only key with the minimum frequency, increment min_freq
-        if (freq == self.min_freq and
-                not any(f == freq for f in self.freq_map.values())):
-            self.min_freq += 1
-
-    def _evict(self):
-        """Evict the least frequently used item from the cache."""
-        lfu_keys = [k for k, v in self.freq_map.items() if v == self.min_freq]
-
-        # If there are multiple keys with the same frequency, evict the LRU
-        key_to_evict = lfu_keys[0]  # Pick the first key to evict
-        self.cache_data.pop(key_to_evict)
-        self.freq_map.pop(key_to_evict)
-        self.lfu_order.remove(key_to_evict)
-        print(f"DISCARD: {key_to_evict}")
+        """Move the given key from its bucket to the next frequency."""
+        # The hot path of every hit, so the slab lists are edited inline
+        slab, buckets = self.slab, self.buckets
+        prev, next_, tags = slab.prev, slab.next, slab.tags
+        slot = self.slots[key]
+        freq = tags[slot]
+        before, after = prev[slot], next_[slot]
+        if before == after:
+            # The key was alone in its bucket, which goes away
+            head = buckets.pop(freq)
+            slab.release(head)
+            # If was the only key with the minimum frequency, the key we
+            # just moved is now alone at the new minimum
+            if freq == self.min_freq:
+                self.min_freq += 1
+        else:
+            next_[before] = after
+            prev[after] = before
+        freq += 1
+        tags[slot] = freq
+        head = buckets.get(freq)
+        if head is None:
+            head = buckets[freq] = slab.new_list()
+        last = prev[head]
+        prev[slot] = last
+        next_[slot] = head
+        next_[last] = slot
+        prev[head] = slot
+
+    _hit = _update_frequency  # A hit is one more use
+
+    def _victim(self):
+        """Least recently used key among the least frequently used."""
+        if self.min_freq not in self.buckets:
+            # Only after a removal emptied the lowest bucket, in which
+            # case min_freq is still below every frequency in use
+            self.min_freq = min(self.buckets)
+        return self.slab.first(self.buckets[self.min_freq])
+
+    def _remove(self, key):
+        """Drop a key from the cache and from its frequency bucket."""
+        super()._remove(key)
+        slot = self.slots.pop(key)
+        self._unlink(slot, self.slab.tags[slot])
+        self.slab.release(slot)
+
+    def _snapshot(self):
+        """Keys with their frequency, lowest frequency and LRU first."""
+        return [(key, freq) for freq in sorted(self.buckets)
+                for key in self.slab.iter(self.buckets[freq])]
+
+    def _restore(self, key, item, size, ttl, freq):
+        """Store an item of a snapshot with its frequency."""
+        self._store(key, item, size, ttl)
+        self._link(key, freq)
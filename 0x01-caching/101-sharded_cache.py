@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Module implements a thread-safe cache made of lock-striped shards
+"""
+import sys
+import threading
+from base_caching import BaseCaching
+
+LRUCache = __import__('3-lru_cache').LRUCache
+
+
+def _split(total, parts):
+    """Split total into parts summing to it, the first ones larger."""
+    share, remainder = divmod(total, parts)
+    return [share + (index < remainder) for index in range(parts)]
+
+
+class ShardedCache(BaseCaching):
+    """
+    ShardedCache spreads keys over several segments by hash.
+    Each segment is an independent cache running the chosen eviction
+    policy behind its own lock, so threads working on different keys
+    rarely wait on each other.
+    The capacity is split between the segments so that they add up to
+    exactly max_items and max_bytes, the first segments taking the
+    remainder.
+    """
+    THREAD_SAFE = True
+
+    def __init__(self, policy=LRUCache, shards=16, max_items=None,
+                 max_bytes=None, sizeof=sys.getsizeof, ttl=None,
+                 on_evict=None, tiers=None):
+        """
+        Initialize the segments.
+        Args:
+            policy - BaseCaching subclass used for every segment
+            shards - number of independently locked segments, at most
+                     max_items
+            max_items - total number of items, MAX_ITEMS by default
+            max_bytes - optional total budget for the size of the items
+            sizeof - callable returning the approximate size of an item
+            ttl - default time to live of the items in seconds, or None
+            on_evict - optional callable(key, item) run on every eviction,
+                       under the lock of the segment
+            tiers - optional second tier of every segment, one each, e.g.
+                    disk_tier.DiskTier instances in separate directories
+        """
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.policy = policy
+        self.max_items = self.MAX_ITEMS if max_items is None else max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.on_evict = on_evict
+        shards = max(1, min(shards, self.max_items))
+        if tiers is None:
+            tiers = [None] * shards
+        elif len(tiers) != shards:
+            raise ValueError(f"tiers must hold one tier per shard ({shards})")
+        self.tier = None  # Each segment has its own
+        items = _split(self.max_items, shards)
+        budgets = [None] * shards if max_bytes is None else \
+            _split(max_bytes, shards)
+        self.shards = [policy(shard_items, shard_bytes, sizeof, ttl,
+                              on_evict, tier)
+                       for shard_items, shard_bytes, tier in
+                       zip(items, budgets, tiers)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+        self._reaper = None
+
+    @property
+    def cache_data(self):
+        """Snapshot of the items held by every segment."""
+        data = {}
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                data.update(shard.cache_data)
+        return data
+
+    def stats(self):
+        """Counters summed over every segment."""
+        totals = {}
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                snapshot = shard.stats()
+            for name, value in snapshot.items():
+                totals[name] = totals.get(name, 0) + value
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_ratio'] = totals['hits'] / lookups if lookups else 0.0
+        return totals
+
+    def print_cache(self):
+        """Print the items of every segment."""
+        data = self.cache_data
+        print("Current cache:")
+        for key in sorted(data.keys()):
+            print("{}: {}".format(key, data.get(key)))
+
+    def _slot(self, key):
+        """Index of the segment responsible for the given key."""
+        return hash(key) % len(self.shards)
+
+    def put(self, key, item, ttl=None):
+        """
+        Add an item in the segment that owns the key.
+        Args:
+            key - the key of the data to be added
+            item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if key is None or item is None:
+            return
+        slot = self._slot(key)
+        with self.locks[slot]:
+            self.shards[slot].put(key, item, ttl)
+
+    def get(self, key):
+        """
+        Retrieve an item from the segment that owns the key.
+        Args:
+            key - key to the data to be retrieved
+        Returns:
+            Value of the item if found, None if key is None or doesn't exist.
+        """
+        if key is None:
+            return None
+        slot = self._slot(key)
+        with self.locks[slot]:
+            return self.shards[slot].get(key)
+
+    def _group(self, keys):
+        """Split keys by segment, keeping their order within a segment."""
+        groups = {}
+        for key in keys:
+            if key is not None:
+                groups.setdefault(self._slot(key), []).append(key)
+        return groups
+
+    def get_many(self, keys):
+        """
+        Retrieve several items, taking each segment lock once.
+        Args:
+            keys - keys to the data to be retrieved
+        Returns:
+            Dict of the keys found with their items.
+        """
+        found = {}
+        for slot, group in self._group(keys).items():
+            with self.locks[slot]:
+                found.update(self.shards[slot].get_many(group))
+        return found
+
+    def put_many(self, mapping, ttl=None):
+        """
+        Add several items, taking each segment lock once.
+        Segments evict independently, so the evictions are the same as
+        with one put per item.
+        """
+        for slot, group in self._group(mapping).items():
+            with self.locks[slot]:
+                self.shards[slot].put_many(
+                    {key: mapping[key] for key in group}, ttl)
+
+    def delete(self, key):
+        """
+        Remove an item from the segment that owns the key.
+        Returns:
+            True if the key was in the cache
+        """
+        if key is None:
+            return False
+        slot = self._slot(key)
+        with self.locks[slot]:
+            return self.shards[slot].delete(key)
+
+    def delete_many(self, keys):
+        """
+        Remove several items, taking each segment lock once.
+        Returns:
+            Number of keys that were in the cache
+        """
+        removed = 0
+        for slot, group in self._group(keys).items():
+            with self.locks[slot]:
+                removed += self.shards[slot].delete_many(group)
+        return removed
+
+    def reap(self, budget=None):
+        """
+        Remove expired items, holding one segment lock at a time.
+        Args:
+            budget - longest time in seconds to spend in each segment
+        Returns:
+            True if some segment still holds expired items
+        """
+        more = False
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                more = shard.reap(budget) or more
+        return more
+
+    def checkpoint(self):
+        """
+        Write the items and policy metadata of every segment to its tier.
+        """
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                shard.checkpoint()
+
+    def warm_up(self):
+        """
+        Reload the last checkpoint of every segment from its tier.
+        Returns:
+            Number of items restored
+        """
+        restored = 0
+        for shard, lock in zip(self.shards, self.locks):
+            with lock:
+                restored += shard.warm_up()
+        return restored
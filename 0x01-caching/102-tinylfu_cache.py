@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Module implements a scan resistant W-TinyLFU Cache
+"""
+from base_caching import BaseCaching
+from collections import OrderedDict
+
+MASK64 = (1 << 64) - 1
+SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F,
+         0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+HALVE = bytes(count >> 1 for count in range(256))
+
+
+class CountMinSketch():
+    """
+    Approximate frequency counter with 4-bit style saturating counters.
+    Every counter is halved once `sample_size` increments were recorded,
+    so old popularity fades away.
+    """
+    MAX_COUNT = 15
+
+    def __init__(self, capacity):
+        """
+        Size the sketch for a cache of the given capacity.
+        Args:
+            capacity - number of items the cache can hold
+        """
+        bits = max(4, (capacity - 1).bit_length() + 1)
+        self.width = 1 << bits
+        self.shift = 64 - bits
+        self.table = bytearray(len(SEEDS) * self.width)
+        self.sample_size = 10 * max(capacity, 1)
+        self.additions = 0
+
+    def increment(self, key):
+        """Record one more use of the key."""
+        h, table, shift, width = hash(key), self.table, self.shift, self.width
+        offset = 0
+        for seed in SEEDS:
+            index = offset + (((h * seed) & MASK64) >> shift)
+            if table[index] < self.MAX_COUNT:
+                table[index] += 1
+            offset += width
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = self.table.translate(HALVE)
+            self.additions //= 2
+
+    def estimate(self, key):
+        """Approximate number of recent uses of the key."""
+        h, table, shift, width = hash(key), self.table, self.shift, self.width
+        return min(table[row * width + (((h * seed) & MASK64) >> shift)]
+                   for row, seed in enumerate(SEEDS))
+
+
+class TinyLFUCache(BaseCaching):
+    """
+    TinyLFUCache follows the W-TinyLFU design, counting uses on get:
+      - new items enter a small LRU admission window (1% of capacity)
+      - items leaving the window compete with the victim of the main
+        segmented LRU, and only the one with the higher estimated
+        frequency stays, so one-hit wonders never flush the main cache
+      - the main cache is split in a probation and a protected segment
+        (80% of it), items are promoted to protected on a second hit
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the window, the main segments and the sketch."""
+        super().__init__(*args, **kwargs)
+        self.window_cap = max(1, self.max_items // 100)
+        main_cap = max(0, self.max_items - self.window_cap)
+        self.protected_cap = main_cap * 8 // 10
+        self.window = OrderedDict()  # Admission window, LRU first
+        self.probation = OrderedDict()  # Main cache, LRU first
+        self.protected = OrderedDict()  # Main cache, hit twice, LRU first
+        self.sketch = CountMinSketch(self.max_items)
+
+    def put(self, key, item, ttl=None):
+        """
+        Add an item in the cache, through the admission window.
+        Args:
+            key - the key of the data to be added
+            item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if key is None or item is None:
+            return
+
+        size = self._size_of(item)
+        segment = None
+        if key in self.cache_data:
+            segment = self._segment(key)
+            self._remove(key)
+
+        if not self._make_room(size):
+            return
+
+        self._store(key, item, size, ttl)
+        if segment is None or segment is self.window:
+            self.window[key] = None
+            self._shrink_window()
+        else:
+            # An update counts as a hit on the main cache
+            self.protected[key] = None
+            self._shrink_protected()
+
+    def get(self, key):
+        """
+        Retrieve an item from the cache by key.
+        Args:
+            key - key to the data to be retrieved
+        Returns:
+            Value of the item if found, None if key is None or doesn't exist.
+        """
+        if key is None:
+            return None
+        self.sketch.increment(key)
+        if not self._lookup(key):
+            return None
+        self._hit(key)
+        return self.cache_data[key]
+
+    def get_many(self, keys):
+        """
+        Retrieve several items in one pass, counting a use of every key.
+        Args:
+            keys - keys to the data to be retrieved
+        Returns:
+            Dict of the keys found with their items.
+        """
+        if not self._plain_lookups():
+            return super().get_many(keys)
+        keys = [key for key in keys if key is not None]
+        increment = self.sketch.increment
+        for key in keys:
+            increment(key)
+        return super().get_many(keys)
+
+    def _hit(self, key):
+        """A hit refreshes a key, promoting it on its second main hit."""
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            del self.probation[key]
+            self.protected[key] = None
+            self._shrink_protected()
+        else:
+            self.protected.move_to_end(key)
+
+    def _segment(self, key):
+        """The OrderedDict currently holding the key."""
+        if key in self.window:
+            return self.window
+        if key in self.probation:
+            return self.probation
+        return self.protected
+
+    def _shrink_window(self):
+        """Move the window overflow to probation, there is room for it."""
+        while len(self.window) > self.window_cap:
+            candidate, _ = self.window.popitem(last=False)
+            self.probation[candidate] = None
+
+    def _shrink_protected(self):
+        """Demote the protected overflow back to probation."""
+        while len(self.protected) > self.protected_cap:
+            demoted, _ = self.protected.popitem(last=False)
+            self.probation[demoted] = None
+
+    def _victim(self):
+        """
+        Pick between the window candidate and the main cache victim.
+        The candidate is moved to probation when it wins admission.
+        """
+        if self.probation:
+            victim = next(iter(self.probation))
+        elif self.protected:
+            victim = next(iter(self.protected))
+        else:
+            return next(iter(self.window))
+
+        if not self.window or len(self.window) < self.window_cap:
+            return victim
+        candidate = next(iter(self.window))
+        if self.sketch.estimate(candidate) <= self.sketch.estimate(victim):
+            return candidate
+        del self.window[candidate]
+        self.probation[candidate] = None
+        return victim
+
+    def _remove(self, key):
+        """Drop a key from the cache and from its segment."""
+        super()._remove(key)
+        del self._segment(key)[key]
+
+    def _snapshot(self):
+        """Keys with the name of their segment, oldest first."""
+        return [(key, name) for name in ('window', 'probation', 'protected')
+                for key in getattr(self, name)]
+
+    def _restore(self, key, item, size, ttl, name):
+        """Store an item of a snapshot back in its segment."""
+        self._store(key, item, size, ttl)
+        getattr(self, name)[key] = None
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Module implements ARC (Adaptive Replacement Cache) Logic
+"""
+from base_caching import BaseCaching
+from collections import OrderedDict
+
+
+class ARCCache(BaseCaching):
+    """
+    ARCCache balances recency and frequency on its own:
+      - t1 holds items seen once recently, t2 items seen at least twice
+      - b1 and b2 remember the keys lately evicted from t1 and t2
+      - a miss that hits the ghost list b1 (b2) means t1 (t2) was too
+        small, so the target size p of t1 grows (shrinks)
+    Every list is an OrderedDict, LRU first, so all operations are O(1).
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the resident and ghost lists."""
+        super().__init__(*args, **kwargs)
+        self.t1 = OrderedDict()  # Resident, seen once
+        self.t2 = OrderedDict()  # Resident, seen at least twice
+        self.b1 = OrderedDict()  # Ghost keys evicted from t1
+        self.b2 = OrderedDict()  # Ghost keys evicted from t2
+        self.p = 0  # Target size of t1
+        self._from_b2 = False  # Whether the item being added hit b2
+        self._t1_full = False  # Whether t1 alone fills the cache, no b1
+
+    def put(self, key, item, ttl=None):
+        """
+        Add an item in the cache following the ARC policy.
+        Args:
+            key - the key of the data to be added
+            item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if key is None or item is None:
+            return
+
+        size = self._size_of(item)
+        capacity = self.max_items
+        target = self.t2
+        self._from_b2 = False
+        self._t1_full = False
+        if key in self.cache_data:
+            # Updating an item counts as a hit
+            self._remove(key)
+        elif key in self.b1:
+            self.p = min(capacity,
+                         self.p + max(len(self.b2) // len(self.b1), 1))
+            del self.b1[key]
+        elif key in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            del self.b2[key]
+            self._from_b2 = True
+        else:
+            target = self.t1
+            if len(self.t1) + len(self.b1) >= capacity:
+                if self.b1:
+                    self.b1.popitem(last=False)
+                else:
+                    # The LRU of t1 is dropped without leaving a ghost
+                    self._t1_full = True
+            elif (len(self.t1) + len(self.t2) + len(self.b1) +
+                  len(self.b2)) >= 2 * capacity and self.b2:
+                self.b2.popitem(last=False)
+
+        if not self._make_room(size):
+            return
+
+        self._store(key, item, size, ttl)
+        target[key] = None
+
+    def get(self, key):
+        """
+        Retrieve an item from the cache by key.
+        Args:
+            key - key to the data to be retrieved
+        Returns:
+            Value of the item if found, None if key is None or doesn't exist.
+        """
+        if not self._lookup(key):
+            return None
+        self._hit(key)
+        return self.cache_data[key]
+
+    def _hit(self, key):
+        """A hit moves the key to the most recently used end of t2."""
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = None
+        else:
+            self.t2.move_to_end(key)
+
+    def _victim(self):
+        """LRU key of t1 if it is above its target size, else of t2."""
+        if self.t1 and (not self.t2 or len(self.t1) > self.p or
+                        (self._from_b2 and len(self.t1) == self.p)):
+            return next(iter(self.t1))
+        return next(iter(self.t2))
+
+    def _evict(self):
+        """Evict the victim and remember its key in a ghost list."""
+        key = self._victim()
+        if key in self.t1:
+            if self._t1_full:
+                super()._evict()
+                return
+            ghost = self.b1
+        else:
+            ghost = self.b2
+        super()._evict()
+        ghost[key] = None
+        while len(self.b1) + len(self.b2) > self.max_items:
+            longest = self.b1 if len(self.b1) > len(self.b2) else self.b2
+            longest.popitem(last=False)
+
+    def _remove(self, key):
+        """Drop a key from the cache and from its resident list."""
+        super()._remove(key)
+        if key in self.t1:
+            del self.t1[key]
+        else:
+            del self.t2[key]
+
+    def _snapshot(self):
+        """Keys with the name of their resident list, oldest first."""
+        return [(key, name) for name in ('t1', 't2')
+                for key in getattr(self, name)]
+
+    def _restore(self, key, item, size, ttl, name):
+        """Store an item of a snapshot back in its resident list."""
+        self._store(key, item, size, ttl)
+        getattr(self, name)[key] = None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Module implements 2Q (Two Queue) Cache Logic
+"""
+from base_caching import BaseCaching
+from collections import OrderedDict
+
+
+class TwoQueueCache(BaseCaching):
+    """
+    TwoQueueCache follows the full 2Q algorithm:
+      - new items enter a1in, a FIFO holding about 25% of the capacity
+      - keys evicted from a1in are remembered in the ghost FIFO a1out
+      - a key seen again while in a1out is admitted to am, the main LRU
+    Items used only once never reach am, so scans cannot flush it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the queues."""
+        super().__init__(*args, **kwargs)
+        self.kin = max(1, self.max_items // 4)
+        self.kout = max(1, self.max_items // 2)
+        self.a1in = OrderedDict()  # Resident FIFO of new items
+        self.a1out = OrderedDict()  # Ghost FIFO of keys evicted from a1in
+        self.am = OrderedDict()  # Resident LRU of items seen again
+
+    def put(self, key, item, ttl=None):
+        """
+        Add an item in the cache following the 2Q policy.
+        Args:
+            key - the key of the data to be added
+            item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if key is None or item is None:
+            return
+
+        size = self._size_of(item)
+        target = self.a1in
+        if key in self.cache_data:
+            if key in self.am:
+                target = self.am
+            self._remove(key)
+        elif key in self.a1out:
+            del self.a1out[key]
+            target = self.am
+
+        if not self._make_room(size):
+            return
+
+        self._store(key, item, size, ttl)
+        target[key] = None
+
+    def get(self, key):
+        """
+        Retrieve an item from the cache by key.
+        Args:
+            key - key to the data to be retrieved
+        Returns:
+            Value of the item if found, None if key is None or doesn't exist.
+        """
+        if not self._lookup(key):
+            return None
+        self._hit(key)
+        return self.cache_data[key]
+
+    def _hit(self, key):
+        """A hit refreshes a key of am, hits in a1in keep the FIFO order."""
+        if key in self.am:
+            self.am.move_to_end(key)
+
+    def _victim(self):
+        """Head of a1in when it is over its share, else LRU key of am."""
+        if self.a1in and (len(self.a1in) > self.kin or not self.am):
+            return next(iter(self.a1in))
+        return next(iter(self.am))
+
+    def _evict(self):
+        """Evict the victim, remembering keys that leave a1in."""
+        key = self._victim()
+        ghost = key in self.a1in
+        super()._evict()
+        if ghost:
+            self.a1out[key] = None
+            if len(self.a1out) > self.kout:
+                self.a1out.popitem(last=False)
+
+    def _remove(self, key):
+        """Drop a key from the cache and from its queue."""
+        super()._remove(key)
+        if key in self.a1in:
+            del self.a1in[key]
+        else:
+            del self.am[key]
+
+    def _snapshot(self):
+        """Keys with the name of their queue, oldest first."""
+        return [(key, name) for name in ('a1in', 'am')
+                for key in getattr(self, name)]
+
+    def _restore(self, key, item, size, ttl, name):
+        """Store an item of a snapshot back in its queue."""
+        self._store(key, item, size, ttl)
+        getattr(self, name)[key] = None
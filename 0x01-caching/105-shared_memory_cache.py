@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Module implements a cache shared by processes through shared memory
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from base_caching import TOMBSTONE, BaseCaching
+
+EMPTY, FULL = 0, 1
+
+
+def _open_untracked(name, create=False, size=0):
+    """
+    Open a named segment kept out of the resource tracker: it would
+    unlink the segment when this process exits, under the feet of the
+    others, or complain about one unlinked by another process.
+    Only this segment is untracked, the tracker is left as it is.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    shm = shared_memory.SharedMemory(name, create, size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedMemoryCache(BaseCaching):
+    """
+    SharedMemoryCache keeps its items in a multiprocessing.shared_memory
+    segment, so every process attached to the segment, e.g. every
+    gunicorn worker, reads and fills one cache instead of its own.
+
+    Keys and items are pickled: a get returns a copy of the item, and
+    keys are told apart by their pickle. The segment is split in stripes
+    chosen by a hash of the key. A stripe holds an open-addressing hash
+    table with linear probing and a slab of fixed-size slots, one per
+    item, so the segment never fragments. Items whose pickled key and
+    value do not fit in a slot are not cached.
+    A full stripe evicts with CLOCK, an approximation of LRU: a hit sets
+    the reference bit of the item, and the hand sweeping the table
+    clears set bits and evicts the first item found with a clear one.
+    Every stripe is guarded by its own lock, a byte-range lock on a lock
+    file plus a thread lock, so workers only wait on each other when
+    their keys share a stripe.
+
+    The counters of stats() are those of this process, items and bytes
+    those of the whole segment.
+    """
+    THREAD_SAFE = True
+    MAGIC = b'SHMCACH1'
+    HEADER = struct.Struct('<8sIIII')  # Magic, stripes, buckets, slots, size
+    HEADER_SIZE = 64
+    # Clock hand, first free slot, items, slots ever used, bytes of items
+    STRIPE = struct.Struct('<IiIIQ')
+    STRIPE_SIZE = 32
+    BUCKET = struct.Struct('<BBxxIQd')  # State, ref, slot, hash, expires
+    ENTRY = struct.Struct('<II')  # Key length, value length, in a slot
+    SLOT_SIZE = 1024
+    STRIPES = 16
+
+    def __init__(self, max_items=None, slot_size=None, ttl=None,
+                 on_evict=None, name=None, stripes=None):
+        """
+        Create the segment, or attach to the one already named so.
+        Args:
+            max_items - total number of items, MAX_ITEMS by default
+            slot_size - bytes of a slot, SLOT_SIZE by default, holding
+                        the pickled key and value of one item
+            ttl - default time to live of the items in seconds, or None
+            on_evict - optional callable(key, item) run on every eviction
+            name - name of the segment shared by the processes, whose
+                   last user calls unlink(), e.g. from a gunicorn on_exit
+                   hook. If None, a private segment for the processes
+                   forked after this one, unlinked when this one exits.
+            stripes - number of independently locked stripes
+        The size arguments of an attached cache come from the segment.
+        """
+        self.max_items = self.MAX_ITEMS if max_items is None else max_items
+        self.max_bytes = None
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.negative_hits = 0
+        self.expiry = {}  # Deadlines live in the buckets of the segment
+        self.tier = None  # No second tier, checkpoint() and warm_up() raise
+        self.tier_hits = 0
+        self.tombstones = {}  # TOMBSTONE items are told apart when read
+        self._reaper = None
+        self._reap_at = (0, 0)  # Stripe and bucket the next reap resumes at
+        stripes = self.STRIPES if stripes is None else stripes
+        slot_size = self.SLOT_SIZE if slot_size is None else slot_size
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        if slot_size <= self.ENTRY.size:
+            raise ValueError("slot_size too small")
+        slots = max(-(-self.max_items // stripes), 1)
+        buckets = 1 << (slots * 4 // 3).bit_length()  # Load under 3/4
+        size = self._segment_size(stripes, buckets, slots, slot_size)
+        try:
+            if name is None:
+                self.shm = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                self.shm = _open_untracked(name, True, size)
+            self._format(stripes, buckets, slots, slot_size)
+        except FileExistsError:
+            self.shm = self._attach(name)
+        self.tracked = name is None
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self._read_header()
+        self.max_items = self.stripes * self.slots
+        self.lock_path = os.path.join(tempfile.gettempdir(),
+                                      self.name.lstrip('/') + '.lock')
+        self.lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT,
+                               0o600)
+        self.thread_locks = [threading.Lock() for _ in range(self.stripes)]
+
+    @classmethod
+    def _segment_size(cls, stripes, buckets, slots, slot_size):
+        """Bytes of a segment of that shape."""
+        return cls.HEADER_SIZE + stripes * (
+            cls.STRIPE_SIZE + buckets * cls.BUCKET.size + slots * slot_size)
+
+    @staticmethod
+    def _attach(name):
+        """Map an existing segment, waiting until it is formatted."""
+        shm = _open_untracked(name)
+        while bytes(shm.buf[:8]) != SharedMemoryCache.MAGIC:
+            time.sleep(0.001)  # The creator is still formatting it
+        return shm
+
+    def _format(self, stripes, buckets, slots, slot_size):
+        """Write the stripe headers, the rest of a new segment is zeros."""
+        buf = self.shm.buf
+        stripe_bytes = (self.STRIPE_SIZE + buckets * self.BUCKET.size +
+                        slots * slot_size)
+        for stripe in range(stripes):
+            base = self.HEADER_SIZE + stripe * stripe_bytes
+            self.STRIPE.pack_into(buf, base, 0, -1, 0, 0, 0)
+        # Magic last, attaching processes wait for it
+        self.HEADER.pack_into(buf, 0, self.MAGIC, stripes, buckets, slots,
+                              slot_size)
+
+    def _read_header(self):
+        """Read the shape of the segment."""
+        _, self.stripes, self.buckets, self.slots, self.slot_size = \
+            self.HEADER.unpack_from(self.buf, 0)
+        self.mask = self.buckets - 1
+        self.stripe_bytes = (self.STRIPE_SIZE +
+                             self.buckets * self.BUCKET.size +
+                             self.slots * self.slot_size)
+
+    def close(self):
+        """Detach from the segment, which stays for the other processes."""
+        self.buf = None
+        self.shm.close()
+        os.close(self.lock_fd)
+
+    def unlink(self):
+        """Destroy the segment, once no process needs it any more."""
+        if not self.tracked and sys.version_info < (3, 13):
+            # unlink() unregisters the segment, so the tracker must know it
+            resource_tracker.register(self.shm._name, "shared_memory")
+        self.shm.unlink()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.lock_path)
+
+    @contextlib.contextmanager
+    def _locked(self, stripe):
+        """Hold the lock of a stripe against threads and processes."""
+        with self.thread_locks[stripe]:
+            fcntl.lockf(self.lock_fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.lock_fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _hash(self, key_bytes):
+        """
+        Stable hash of a pickled key, the same in every process.
+        Returns:
+            (stripe, hash)
+        """
+        digest = hashlib.blake2b(key_bytes, digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        return value % self.stripes, value
+
+    def _base(self, stripe):
+        """Offset of a stripe in the segment."""
+        return self.HEADER_SIZE + stripe * self.stripe_bytes
+
+    def _bucket(self, base, index):
+        """Offset of a bucket of the stripe at base."""
+        return base + self.STRIPE_SIZE + index * self.BUCKET.size
+
+    def _slot(self, base, slot):
+        """Offset of a slot of the stripe at base."""
+        return (base + self.STRIPE_SIZE + self.buckets * self.BUCKET.size +
+                slot * self.slot_size)
+
+    def _home(self, value):
+        """Bucket a hash is probed from."""
+        return (value // self.stripes) & self.mask
+
+    def _probe(self, base, value, key_bytes):
+        """
+        Look a key up in the table of a stripe.
+        Returns:
+            (bucket of the key or -1, first empty bucket on its path)
+        """
+        buf, unpack = self.buf, self.BUCKET.unpack_from
+        index = self._home(value)
+        while True:
+            state, _, slot, stored, _ = unpack(buf, self._bucket(base, index))
+            if state == EMPTY:
+                return -1, index
+            if stored == value:
+                offset = self._slot(base, slot)
+                key_len = self.ENTRY.unpack_from(buf, offset)[0]
+                start = offset + self.ENTRY.size
+                if buf[start:start + key_len] == key_bytes:
+                    return index, index
+            index = (index + 1) & self.mask
+
+    def _read(self, base, slot, key=True):
+        """Pickled key and value held by a slot."""
+        offset = self._slot(base, slot)
+        key_len, value_len = self.ENTRY.unpack_from(self.buf, offset)
+        start = offset + self.ENTRY.size
+        return (bytes(self.buf[start:start + key_len]) if key else None,
+                bytes(self.buf[start + key_len:start + key_len + value_len]))
+
+    def _remove(self, base, index):
+        """
+        Empty a bucket and free its slot, shifting back the buckets
+        probed after it so no lookup stops early at the hole.
+        """
+        buf, bucket = self.buf, self.BUCKET
+        slot = bucket.unpack_from(buf, self._bucket(base, index))[2]
+        offset = self._slot(base, slot)
+        key_len, value_len = self.ENTRY.unpack_from(buf, offset)
+        hand, free, count, fresh, used = self.STRIPE.unpack_from(buf, base)
+        struct.pack_into('<i', buf, offset, free)
+        self.STRIPE.pack_into(buf, base, hand, slot, count - 1, fresh,
+                              used - key_len - value_len)
+
+        hole = index
+        while True:
+            index = (index + 1) & self.mask
+            entry = bucket.unpack_from(buf, self._bucket(base, index))
+            if entry[0] == EMPTY:
+                break
+            home = self._home(entry[3])
+            if (index - home) & self.mask >= (index - hole) & self.mask:
+                bucket.pack_into(buf, self._bucket(base, hole), *entry)
+                hole = index
+        bucket.pack_into(buf, self._bucket(base, hole), EMPTY, 0, 0, 0, 0.0)
+
+    def _evict_one(self, base, now):
+        """Free one slot of a full stripe, expired items first met."""
+        buf, unpack = self.buf, self.BUCKET.unpack_from
+        hand = self.STRIPE.unpack_from(buf, base)[0]
+        while True:
+            offset = self._bucket(base, hand)
+            state, ref, slot, _, expires = unpack(buf, offset)
+            if state == FULL:
+                if expires and expires <= now:
+                    self.expirations += 1
+                    break
+                if not ref:
+                    self.evictions += 1
+                    if self.on_evict is not None:
+                        key_bytes, value = self._read(base, slot)
+                        self.on_evict(pickle.loads(key_bytes),
+                                      pickle.loads(value))
+                    break
+                buf[offset + 1] = 0  # Second chance
+            hand = (hand + 1) & self.mask
+        struct.pack_into('<I', buf, base, (hand + 1) & self.mask)
+        self._remove(base, hand)
+
+    def put(self, key, item, ttl=None):
+        """
+        Add an item in the shared segment.
+        Args:
+            key - the key of the data to be added, picklable
+            item - the value of the data to be added, picklable
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if key is None or item is None:
+            return
+        key_bytes = pickle.dumps(key)
+        value = pickle.dumps(item)
+        size = len(key_bytes) + len(value)
+        if ttl is None:
+            ttl = self.ttl
+        now = time.time()
+        expires = 0.0 if ttl is None else now + ttl
+        stripe, hashed = self._hash(key_bytes)
+        base = self._base(stripe)
+        buf = self.buf
+        with self._locked(stripe):
+            index, _ = self._probe(base, hashed, key_bytes)
+            if index >= 0:
+                self._remove(base, index)
+            if self.ENTRY.size + size > self.slot_size:
+                return  # Too large for a slot, like an item over max_bytes
+            if self.STRIPE.unpack_from(buf, base)[2] >= self.slots:
+                self._evict_one(base, now)
+            _, index = self._probe(base, hashed, key_bytes)
+            hand, slot, count, fresh, used = self.STRIPE.unpack_from(buf,
+                                                                     base)
+            if slot < 0:
+                slot, fresh = fresh, fresh + 1  # Never used so far
+                free = -1
+            else:
+                free = struct.unpack_from('<i', buf, self._slot(base,
+                                                                slot))[0]
+            offset = self._slot(base, slot)
+            self.ENTRY.pack_into(buf, offset, len(key_bytes), len(value))
+            start = offset + self.ENTRY.size
+            buf[start:start + size] = key_bytes + value
+            # A new item starts referenced, so it survives one sweep
+            self.BUCKET.pack_into(buf, self._bucket(base, index), FULL, 1,
+                                  slot, hashed, expires)
+            self.STRIPE.pack_into(buf, base, hand, free, count + 1, fresh,
+                                  used + size)
+        self.inserts += 1
+
+    def _find(self, base, hashed, key_bytes, now):
+        """
+        Pickled value of a key in a locked stripe, marking it referenced.
+        Returns:
+            The pickled value, None if the key is absent or expired
+        """
+        index, _ = self._probe(base, hashed, key_bytes)
+        if index < 0:
+            return None
+        offset = self._bucket(base, index)
+        _, _, slot, _, expires = self.BUCKET.unpack_from(self.buf, offset)
+        if expires and expires <= now:
+            self._remove(base, index)
+            self.expirations += 1
+            return None
+        self.buf[offset + 1] = 1  # Referenced
+        return self._read(base, slot, key=False)[1]
+
+    def _loads(self, value):
+        """Unpickle a found value, counting hits and negative hits."""
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        item = pickle.loads(value)
+        if item is TOMBSTONE:
+            self.negative_hits += 1
+        return item
+
+    def get(self, key):
+        """
+        Retrieve a copy of an item from the shared segment.
+        Args:
+            key - key to the data to be retrieved
+        Returns:
+            Value of the item if found, None if key is None or doesn't exist.
+        """
+        if key is None:
+            self.misses += 1
+            return None
+        key_bytes = pickle.dumps(key)
+        stripe, hashed = self._hash(key_bytes)
+        with self._locked(stripe):
+            value = self._find(self._base(stripe), hashed, key_bytes,
+                               time.time())
+        return self._loads(value)
+
+    def get_many(self, keys):
+        """
+        Retrieve copies of several items, taking each stripe lock once.
+        Args:
+            keys - keys to the data to be retrieved
+        Returns:
+            Dict of the keys found with their items.
+        """
+        groups = {}
+        for key in keys:
+            if key is None:
+                self.misses += 1
+                continue
+            key_bytes = pickle.dumps(key)
+            stripe, hashed = self._hash(key_bytes)
+            groups.setdefault(stripe, []).append((key, hashed, key_bytes))
+        found = {}
+        now = time.time()
+        for stripe, group in groups.items():
+            base = self._base(stripe)
+            with self._locked(stripe):
+                values = [(key, self._find(base, hashed, key_bytes, now))
+                          for key, hashed, key_bytes in group]
+            for key, value in values:
+                item = self._loads(value)
+                if item is not None:
+                    found[key] = item
+        return found
+
+    def delete(self, key):
+        """
+        Remove an item from the shared segment.
+        Returns:
+            True if the key was in the cache
+        """
+        if key is None:
+            return False
+        key_bytes = pickle.dumps(key)
+        stripe, hashed = self._hash(key_bytes)
+        base = self._base(stripe)
+        with self._locked(stripe):
+            index, _ = self._probe(base, hashed, key_bytes)
+            if index < 0:
+                return False
+            self._remove(base, index)
+        return True
+
+    def delete_many(self, keys):
+        """
+        Remove several items from the shared segment.
+        Returns:
+            Number of keys that were in the cache
+        """
+        return sum(self.delete(key) for key in keys)
+
+    @property
+    def cache_data(self):
+        """Snapshot of the live items, taken one stripe at a time."""
+        found = {}
+        now = time.time()
+        for stripe in range(self.stripes):
+            base = self._base(stripe)
+            with self._locked(stripe):
+                entries = []
+                for index in range(self.buckets):
+                    state, _, slot, _, expires = self.BUCKET.unpack_from(
+                        self.buf, self._bucket(base, index))
+                    if state == FULL and not (expires and expires <= now):
+                        entries.append(self._read(base, slot))
+            for key_bytes, value in entries:
+                found[pickle.loads(key_bytes)] = pickle.loads(value)
+        return found
+
+    def print_cache(self):
+        """Print the items of the shared segment."""
+        data = self.cache_data
+        print("Current cache:")
+        for key in sorted(data.keys()):
+            print("{}: {}".format(key, data.get(key)))
+
+    def stats(self):
+        """Counters of this process, items and bytes of the segment."""
+        items = used = 0
+        for stripe in range(self.stripes):
+            _, _, count, _, size = self.STRIPE.unpack_from(
+                self.buf, self._base(stripe))
+            items += count
+            used += size
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'inserts': self.inserts,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'tier_hits': self.tier_hits,
+            'negative_hits': self.negative_hits,
+            'items': items,
+            'bytes': used,
+        }
+
+    def reap(self, budget=None):
+        """
+        Remove expired items, holding one stripe lock at a time.
+        A sweep given a budget resumes where the previous one stopped.
+        Args:
+            budget - longest time in seconds to spend, no limit if None
+        Returns:
+            True if the budget ran out before every stripe was swept
+        """
+        now = time.time()
+        stop = None if budget is None else time.monotonic() + budget
+        stripe, index = (0, 0) if budget is None else self._reap_at
+        while stripe < self.stripes:
+            base = self._base(stripe)
+            with self._locked(stripe):
+                while index < self.buckets:
+                    state, _, _, _, expires = self.BUCKET.unpack_from(
+                        self.buf, self._bucket(base, index))
+                    if state == FULL and expires and expires <= now:
+                        # Shifting back may bring another one here
+                        self._remove(base, index)
+                        self.expirations += 1
+                        continue
+                    index += 1
+                    if stop is not None and index % 64 == 0 and \
+                            time.monotonic() >= stop:
+                        self._reap_at = (stripe, index)
+                        return True
+            stripe, index = stripe + 1, 0
+        self._reap_at = (0, 0)
+        return False
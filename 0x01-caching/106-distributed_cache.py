@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Module implements a client spreading one logical cache over cache nodes
+"""
+import contextlib
+from base_caching import BaseCaching
+from cache_node import NodeConnection
+from hash_ring import HashRing
+
+
+class DistributedCache(BaseCaching):
+    """
+    DistributedCache partitions the keys over cache nodes, such as
+    cache_node.CacheNode processes, with a consistent-hash ring.
+    Single calls go to the node owning the key. Batch calls are grouped
+    by node and pipelined: the request of every node is sent before the
+    first reply is read, so a batch costs about one round trip whatever
+    the number of nodes.
+    Nodes joining or leaving only move the keys the ring gives them or
+    takes from them, about 1 / nodes of the keys. With migrate=True
+    those items are copied to their new node, so a key never comes back
+    with a stale item from its former node.
+    The capacity and the eviction policy are those of the nodes.
+    """
+
+    def __init__(self, nodes=(), vnodes=160):
+        """
+        Connect to the nodes.
+        Args:
+            nodes - (host, port) address of every node
+            vnodes - points per node on the hash ring
+        """
+        self.ring = HashRing(vnodes=vnodes)
+        self.connections = {}  # Address -> NodeConnection
+        self._reaper = None
+        for address in nodes:
+            self.add_node(address, migrate=False)
+
+    def _connection(self, key):
+        """Connection to the node owning key."""
+        node = self.ring.node_for(key)
+        if node is None:
+            raise ValueError("no cache node")
+        return self.connections[node]
+
+    def _pipeline(self, requests):
+        """
+        Send one request per node, then read every reply.
+        Args:
+            requests - dict of node address to request tuple
+        Returns:
+            Dict of node address to reply
+        """
+        nodes = sorted(requests)
+        with contextlib.ExitStack() as stack:
+            # Locks in address order, so batches never deadlock
+            for node in nodes:
+                stack.enter_context(self.connections[node].lock)
+            for node in nodes:
+                self.connections[node].send(*requests[node])
+            return {node: self.connections[node].receive()
+                    for node in nodes}
+
+    @property
+    def cache_data(self):
+        """Snapshot of the items held by every node."""
+        replies = self._pipeline({node: ("items",)
+                                  for node in self.connections})
+        data = {}
+        for items in replies.values():
+            data.update(items)
+        return data
+
+    def stats(self):
+        """Counters summed over every node."""
+        totals = {}
+        replies = self._pipeline({node: ("stats",)
+                                  for node in self.connections})
+        for snapshot in replies.values():
+            for name, value in snapshot.items():
+                totals[name] = totals.get(name, 0) + value
+        lookups = totals.get('hits', 0) + totals.get('misses', 0)
+        totals['hit_ratio'] = totals['hits'] / lookups if lookups else 0.0
+        return totals
+
+    def put(self, key, item, ttl=None):
+        """
+        Add an item in the node that owns the key.
+        Args:
+            key - the key of the data to be added
+            item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if key is None or item is None:
+            return
+        self._connection(key).call("put", key, item, ttl)
+
+    def get(self, key):
+        """
+        Retrieve an item from the node that owns the key.
+        Args:
+            key - key to the data to be retrieved
+        Returns:
+            Value of the item if found, None if key is None or doesn't exist.
+        """
+        if key is None:
+            return None
+        return self._connection(key).call("get", key)
+
+    def delete(self, key):
+        """
+        Remove an item from the node that owns the key.
+        Returns:
+            True if the key was in the cache
+        """
+        if key is None:
+            return False
+        return self._connection(key).call("delete", key)
+
+    def get_many(self, keys):
+        """
+        Retrieve several items, one pipelined request per node.
+        Args:
+            keys - keys to the data to be retrieved
+        Returns:
+            Dict of the keys found with their items.
+        """
+        groups = self.ring.group(key for key in keys if key is not None)
+        found = {}
+        replies = self._pipeline({node: ("get_many", group)
+                                  for node, group in groups.items()})
+        for items in replies.values():
+            found.update(items)
+        return found
+
+    def put_many(self, mapping, ttl=None):
+        """
+        Add several items, one pipelined request per node.
+        Nodes evict independently, so the evictions are the same as
+        with one put per item.
+        """
+        groups = self.ring.group(key for key in mapping if key is not None)
+        self._pipeline({node: ("put_many",
+                               {key: mapping[key] for key in group}, ttl)
+                        for node, group in groups.items()})
+
+    def delete_many(self, keys):
+        """
+        Remove several items, one pipelined request per node.
+        Returns:
+            Number of keys that were in the cache
+        """
+        groups = self.ring.group(key for key in keys if key is not None)
+        replies = self._pipeline({node: ("delete_many", group)
+                                  for node, group in groups.items()})
+        return sum(replies.values())
+
+    def add_node(self, address, migrate=True):
+        """
+        Connect to a node joining the cache.
+        Args:
+            address - (host, port) of the node
+            migrate - move the items the node now owns from the other
+                      nodes, their remaining time to live is reset
+        """
+        address = tuple(address)
+        if address in self.connections:
+            return
+        others = list(self.connections)
+        self.connections[address] = NodeConnection(address)
+        self.ring.add(address)
+        if not migrate:
+            return
+        for node in others:
+            items = self.connections[node].call("items")
+            moved = {key: item for key, item in items.items()
+                     if self.ring.node_for(key) == address}
+            if moved:
+                self.connections[address].call("put_many", moved)
+                self.connections[node].call("delete_many", list(moved))
+
+    def remove_node(self, address, migrate=True):
+        """
+        Disconnect from a node leaving the cache.
+        Args:
+            address - (host, port) of the node
+            migrate - hand the items of the node to their new owners
+        """
+        address = tuple(address)
+        connection = self.connections.get(address)
+        if connection is None:
+            return
+        self.ring.remove(address)
+        if migrate and self.ring.nodes:
+            self.put_many(connection.call("items"))
+        del self.connections[address]
+        connection.close()
+
+    def close(self):
+        """Close the connections to every node."""
+        for connection in self.connections.values():
+            connection.close()
+        self.connections = {}
@@ -3,7 +3,6 @@
 Module to implement Basic Caching using LIFO (Last In First Out) Stack Logic
 """
 from base_caching import BaseCaching
-from collections import OrderedDict
 
 
 class LIFOCache(BaseCaching):
@@ -11,25 +10,23 @@ class LIFOCache(BaseCaching):
     This is a class that inherits from the BaseCaching parent class
     It implements LIFO Stack system for caching
     """
-    def __init__(self):
-        """Constructor of FIFOCache"""
-        super().__init__()
-        self.cache_data = OrderedDict()
+    PLAIN_PUT = True
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """
         This is a method that allows adding of key value pair to the cache
         Args:
             key - the key of the data to be added
             item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
         """
-        if key is not None or item is not None:
-            if key not in self.cache_data:
-                if (len(self.cache_data) + 1) > BaseCaching.MAX_ITEMS:
-                    last_data_key, _ = self.cache_data.popitem(True)
-                    print(f"DISCARD: {last_data_key}")
-        self.cache_data[key] = item
-        self.cache_data.move_to_end(key, last=True)
+        if key is not None and item is not None:
+            size = self._size_of(item)
+            if key in self.cache_data:
+                self._remove(key)
+            # Discard the last inserted items until the new one fits
+            if self._make_room(size):
+                self._store(key, item, size, ttl)
 
         return
 
@@ -39,4 +36,10 @@ class LIFOCache(BaseCaching):
         Args:
             key - key to the data to be retrieved.
         """
-        return self.cache_data.get(key, None)
+        if not self._lookup(key):
+            return None
+        return self.cache_data[key]
+
+    def _victim(self):
+        """Last inserted key, dicts keep insertion order."""
+        return next(reversed(self.cache_data))
@@ -10,34 +10,37 @@ class LRUCache(BaseCaching):
     """
     LRUCache is a caching system that uses a Least Recently Used
     (LRU) algorithm.
-    It inherits from BaseCaching and has a maximum size defined by MAX_ITEMS.
+    It inherits from BaseCaching and is bounded by max_items and,
+    optionally, max_bytes.
     """
+    PLAIN_PUT = True
 
-    def __init__(self):
+    def __init__(self, *args, **kwargs):
         """Initialize the cache using OrderedDict to maintain LRU order."""
-        super().__init__()
+        super().__init__(*args, **kwargs)
         self.cache_data = OrderedDict()  # OrderedDict to track access order
+        self._hit = self.cache_data.move_to_end  # A hit is a use
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """
         Add an item in the cache following LRU replacement policy.
         Args:
             key - the key of the data to be added
             item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
         """
         if key is not None and item is not None:
+            size = self._size_of(item)
             # If key already exists, delete it to update its position
             if key in self.cache_data:
-                del self.cache_data[key]
+                self._remove(key)
 
-            # Add the item to the cache, marking it as most recently used
-            self.cache_data[key] = item
+            # Remove least recently used items until the new one fits
+            if not self._make_room(size):
+                return
 
-            # If we exceed MAX_ITEMS, remove the least recently used item
-            if len(self.cache_data) > BaseCaching.MAX_ITEMS:
-                # Pop the first item from OrderedDict (LRU behavior)
-                lru_key, _ = self.cache_data.popitem(last=False)
-                print(f"DISCARD: {lru_key}")
+            # Add the item to the cache, marking it as most recently used
+            self._store(key, item, size, ttl)
 
     def get(self, key):
         """
@@ -47,10 +50,13 @@ class LRUCache(BaseCaching):
         Returns:
             Value of the item if found, None if key is None or doesn't exist.
         """
-        if key is None or key not in self.cache_data:
+        if not self._lookup(key):
             return None
 
         # Move accessed item to the end (mark as most recently used)
-        item = self.cache_data.pop(key)
-        self.cache_data[key] = item
-        return item
+        self._hit(key)
+        return self.cache_data[key]
+
+    def _victim(self):
+        """Least recently used key, first in the OrderedDict."""
+        return next(iter(self.cache_data))
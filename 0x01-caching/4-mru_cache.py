@@ -6,36 +6,36 @@ from base_caching import BaseCaching
 
 
 class MRUCache(BaseCaching):
-    """This class defines MRUCache inheriting from BaseCaching"""
+    """This class defines MRUCache inheriting from BaseCaching
 
-    def __init__(self):
-        """Class Constructor"""
-        super().__init__()
-        self.order = []  # List to maintain the order of keys (mru)
+    cache_data is a plain dict ordered by use, most recently used last:
+    dicts keep insertion order, so popping and re-inserting a key moves
+    it to the end, at half the memory of an OrderedDict.
+    """
+    PLAIN_PUT = True
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """
         This method allows adding a key-value pair to the cache.
         Args:
             key - the key of the data to be added
             item - the value of the data to be added
+            ttl - seconds the item stays valid, the default ttl if None
         """
         if key is None or item is None:
             return  # Do nothing if key or item is None
 
+        size = self._size_of(item)
         if key in self.cache_data:
             # If the key already exists, remove it to update its order
-            self.order.remove(key)
-        else:
-            # If the cache is full, evict the most recently used item
-            if len(self.cache_data) >= BaseCaching.MAX_ITEMS:
-                mru_key = self.order.pop()  # Remove the last item (mru)
-                self.cache_data.pop(mru_key)
-                print(f"DISCARD: {mru_key}")
-
-        # Add the new key-value pair to the cache
-        self.cache_data[key] = item
-        self.order.append(key)  # Track the order of keys
+            self._remove(key)
+
+        # If the cache is full, evict the most recently used items
+        if not self._make_room(size):
+            return
+
+        # Add the key-value pair as the most recently used one
+        self._store(key, item, size, ttl)
 
     def get(self, key):
         """
@@ -45,10 +45,16 @@ class MRUCache(BaseCaching):
         Returns:
             Value of the item if found, None if key is None or doesn't exist.
         """
-        if key is None or key not in self.cache_data:
+        if not self._lookup(key):
             return None  # Return None if key is invalid
 
-        # Update the order to reflect that this key has been accessed
-        self.order.remove(key)
-        self.order.append(key)
+        self._hit(key)
         return self.cache_data[key]  # Return the cached value
+
+    def _hit(self, key):
+        """Re-insert the key to mark it as the most recently used."""
+        self.cache_data[key] = self.cache_data.pop(key)
+
+    def _victim(self):
+        """Most recently used key, last in the dict."""
+        return next(reversed(self.cache_data))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Module implements an asyncio front for the cache policies
+"""
+import asyncio
+import inspect
+import time
+
+LRUCache = __import__('3-lru_cache').LRUCache
+
+
+class AsyncCache():
+    """
+    AsyncCache puts any BaseCaching policy in front of a slow async
+    source, with get_or_load() instead of a get returning None.
+    - Concurrent misses on one key share a single load: the first
+      caller starts it, the others await the same future.
+    - An item older than soft_ttl is stale: it is still returned at
+      once, while one background load refreshes it. Items leave the
+      policy only after its hard ttl, or when evicted.
+    - At most max_loads loader calls run at the same time, the others
+      wait for a turn, so a burst of misses cannot flood the source.
+    Loads that raise are not cached. A failed refresh keeps the stale
+    item, a failed load raises in every caller waiting for it.
+    Meant for one event loop: the policy is used without a lock.
+    """
+
+    def __init__(self, cache=None, soft_ttl=None, max_loads=None):
+        """
+        Initialize the front.
+        Args:
+            cache - BaseCaching instance holding the items, a 1024
+                    items LRUCache by default, its ttl is the hard one
+            soft_ttl - seconds an item stays fresh, None for always
+            max_loads - loader calls running at once, None for no limit
+        """
+        self.cache = cache if cache is not None else LRUCache(1024)
+        self.soft_ttl = soft_ttl
+        self.max_loads = max_loads
+        self.loads = {}  # Key -> future of the load in flight
+        self._slots = None  # Semaphore, made on first use in the loop
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0,
+                         'coalesced': 0, 'loader_calls': 0,
+                         'loader_errors': 0}
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """
+        Cached item of key, loading it on a miss.
+        Args:
+            key - key of the item
+            loader - callable without arguments returning the item or
+                     an awaitable of it, e.g. functools.partial of a
+                     coroutine function
+            ttl - hard time to live of a loaded item, the policy's if None
+        Returns:
+            The item, possibly stale
+        """
+        counters = self.counters
+        entry = self.cache.get(key)
+        if entry is not None:
+            item, fresh_until = entry
+            if fresh_until is None or time.monotonic() < fresh_until:
+                counters['hits'] += 1
+            else:
+                counters['stale_hits'] += 1
+                if key not in self.loads:
+                    self._start(key, loader, ttl)
+            return item
+
+        future = self.loads.get(key)
+        if future is None:
+            counters['misses'] += 1
+            future = self._start(key, loader, ttl)
+        else:
+            counters['coalesced'] += 1
+        # A cancelled caller must not cancel the load the others await
+        return await asyncio.shield(future)
+
+    def _start(self, key, loader, ttl):
+        """Run the load of key in a task, registered while in flight."""
+        future = asyncio.ensure_future(self._load(key, loader, ttl))
+        self.loads[key] = future
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def _finish(self, key, future):
+        """Forget a finished load, retrieving an error nobody awaited."""
+        if self.loads.get(key) is future:
+            del self.loads[key]
+        if not future.cancelled() and future.exception() is not None:
+            self.counters['loader_errors'] += 1
+
+    async def _load(self, key, loader, ttl):
+        """Call the loader, within the concurrency cap, and store."""
+        if self.max_loads is not None and self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_loads)
+        if self._slots is not None:
+            async with self._slots:
+                item = await self._call(loader)
+        else:
+            item = await self._call(loader)
+        fresh_until = None if self.soft_ttl is None else \
+            time.monotonic() + self.soft_ttl
+        self.cache.put(key, (item, fresh_until), ttl)
+        return item
+
+    async def _call(self, loader):
+        """Result of the loader, awaited if it is awaitable."""
+        self.counters['loader_calls'] += 1
+        item = loader()
+        if inspect.isawaitable(item):
+            item = await item
+        return item
+
+    def invalidate(self, key):
+        """
+        Drop the item of key, a load in flight still stores its result.
+        Returns:
+            True if the key was cached
+        """
+        return self.cache.delete(key)
+
+    def stats(self):
+        """Counters of the front, with the loads in flight."""
+        stats = dict(self.counters)
+        stats['in_flight'] = len(self.loads)
+        return stats
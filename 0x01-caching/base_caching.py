@@ -1,19 +1,88 @@
 #!/usr/bin/python3
 """ BaseCaching module
 """
+import contextlib
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+
+def print_discard(key, item):
+    """ Eviction listener printing the evicted key, as the tasks expect
+    """
+    print(f"DISCARD: {key}")
+
+
+class Tombstone():
+    """ Type of TOMBSTONE, the item cached for a key known not to exist
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        """ Name of the singleton """
+        return "TOMBSTONE"
+
+    def __reduce__(self):
+        """ Unpickle as the same singleton, e.g. from a disk tier """
+        return "TOMBSTONE"
+
+
+# put(key, TOMBSTONE) caches a miss, get(key) then returns TOMBSTONE.
+# Tombstones are evicted before any real item, and never to a tier.
+TOMBSTONE = Tombstone()
 
 
 class BaseCaching():
     """ BaseCaching defines:
       - constants of your caching system
       - where your data are stored (in a dictionary)
+      - how much an instance may hold, in items and optionally in bytes
+      - how long items stay valid, if they expire
+      - counters of what happened to the cache, see stats()
+      - an optional second tier receiving the evicted items
+      - the keys holding a TOMBSTONE, oldest first
     """
     MAX_ITEMS = 4
+    THREAD_SAFE = False  # Whether the cache does its own locking
+    PLAIN_PUT = False  # Whether put only reorders cache_data, see put_many
+    _hit = None  # Optional callable(key) updating the policy on a hit
 
-    def __init__(self):
+    def __init__(self, max_items=None, max_bytes=None, sizeof=sys.getsizeof,
+                 ttl=None, on_evict=None, tier=None):
         """ Initiliaze
+        Args:
+            max_items - maximum number of items, MAX_ITEMS by default
+            max_bytes - optional budget for the summed size of the items
+            sizeof - callable returning the approximate size of an item
+            ttl - default time to live of the items in seconds, or None
+            on_evict - optional callable(key, item) run on every eviction,
+                       print_discard gives the classic DISCARD output
+            tier - optional second tier, such as disk_tier.DiskTier,
+                   receiving evicted items and serving them back on a miss
         """
         self.cache_data = {}
+        self.max_items = self.MAX_ITEMS if max_items is None else max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.cache_bytes = 0  # Summed size of the items, if max_bytes is set
+        self.item_sizes = {}  # Size charged for each key
+        self.ttl = ttl
+        self.expiry = {}  # Deadline of each key that expires
+        self.deadlines = []  # Heap of (deadline, seq, key), may hold stale
+        self._seq = itertools.count()
+        self._reaper = None
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.tier = tier
+        self.tier_hits = 0
+        self.tombstones = {}  # Keys holding TOMBSTONE, as an ordered set
+        self.negative_hits = 0
 
     def print_cache(self):
         """ Print the cache
@@ -22,7 +91,7 @@ class BaseCaching():
         for key in sorted(self.cache_data.keys()):
             print("{}: {}".format(key, self.cache_data.get(key)))
 
-    def put(self, key, item):
+    def put(self, key, item, ttl=None):
         """ Add an item in the cache
         """
         raise NotImplementedError("put must be implemented in your \
@@ -33,3 +102,391 @@ class BaseCaching():
         """
         raise NotImplementedError("get must be implemented in your \
                 cache class")
+
+    def get_many(self, keys):
+        """ Get the items of several keys, in one pass when possible
+        Each policy brings its bookkeeping of a hit through _hit(key).
+        Returns:
+            Dict of the keys found with their items
+        """
+        if not self._plain_lookups():
+            get = self.get
+            found = {}
+            for key in keys:
+                item = get(key)
+                if item is not None:
+                    found[key] = item
+            return found
+        data = self.cache_data
+        tombstones = self.tombstones
+        hit = self._hit
+        found = {}
+        hits = misses = negative_hits = 0
+        for key in keys:
+            if key in data:
+                if hit is not None:
+                    hit(key)
+                found[key] = data[key]
+                hits += 1
+                if tombstones and key in tombstones:
+                    negative_hits += 1
+            else:
+                misses += 1
+        self.hits += hits
+        self.misses += misses
+        self.negative_hits += negative_hits
+        return found
+
+    def _plain_lookups(self):
+        """ Whether a lookup may skip expiry and promotion from the tier
+        """
+        return not self.expiry and self.tier is None
+
+    def _batch_ready(self, ttl):
+        """ Whether put_many may skip sizes, deadlines and the tier
+        """
+        return (self._plain_lookups() and self.max_bytes is None and
+                ttl is None and self.ttl is None)
+
+    def put_many(self, mapping, ttl=None):
+        """ Add several items, in the order of the mapping
+        Policies whose put only reorders cache_data (PLAIN_PUT) store
+        the whole batch in one pass, without sizes or deadlines to track.
+        The evictions are the same as with one put per item.
+        """
+        if not (self.PLAIN_PUT and self._batch_ready(ttl)):
+            put = self.put
+            for key, item in mapping.items():
+                put(key, item, ttl)
+            return
+        data = self.cache_data
+        remove, make_room = self._remove, self._make_room
+        max_items = self.max_items
+        tombstones = self.tombstones
+        inserts = 0
+        for key, item in mapping.items():
+            if key is None or item is None:
+                continue
+            if key in data:
+                remove(key)
+            elif len(data) >= max_items:
+                make_room(0)
+            data[key] = item
+            if item is TOMBSTONE:
+                tombstones[key] = None
+            inserts += 1
+        self.inserts += inserts
+
+    def delete(self, key):
+        """ Remove an item from the cache
+        Returns:
+            True if the key was in the cache
+        """
+        if self.tier is not None:
+            self.tier.delete(key)
+        if key not in self.cache_data:
+            return False
+        self._remove(key)
+        return True
+
+    def delete_many(self, keys):
+        """ Remove several items from the cache
+        Returns:
+            Number of keys that were in the cache
+        """
+        data = self.cache_data
+        remove = self._remove
+        tier = self.tier
+        removed = 0
+        for key in keys:
+            if tier is not None:
+                tier.delete(key)
+            if key in data:
+                remove(key)
+                removed += 1
+        return removed
+
+    def stats(self):
+        """ Snapshot of the cache counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'inserts': self.inserts,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'tier_hits': self.tier_hits,
+            'negative_hits': self.negative_hits,
+            'items': len(self.cache_data),
+            'bytes': self.cache_bytes,
+        }
+
+    def _size_of(self, item):
+        """ Approximate size of an item, 0 when bytes are not budgeted
+        """
+        if self.max_bytes is None:
+            return 0
+        return self.sizeof(item)
+
+    def _charge(self, key, size):
+        """ Account for an item of the given size stored under key
+        """
+        if self.max_bytes is not None:
+            self.cache_bytes += size
+            self.item_sizes[key] = size
+
+    def _release(self, key):
+        """ Stop accounting for the item stored under key
+        """
+        if self.item_sizes:
+            self.cache_bytes -= self.item_sizes.pop(key, 0)
+
+    def _make_room(self, size):
+        """ Evict items until one more item of the given size fits
+        Returns:
+            False if the item is larger than the whole byte budget
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        if self.expiry and self._full(size):
+            # Expired items never count toward capacity
+            self.reap()
+        while self.cache_data and self._full(size):
+            if self.tombstones:
+                # A cached miss is cheaper to lose than any real item
+                self._discard(next(iter(self.tombstones)))
+            else:
+                self._evict()
+        return True
+
+    def _full(self, size):
+        """ Whether the cache lacks room for one more item of that size
+        """
+        return (
+            len(self.cache_data) >= self.max_items or
+            (self.max_bytes is not None and
+             self.cache_bytes + size > self.max_bytes))
+
+    def _evict(self):
+        """ Remove the item chosen by the replacement policy
+        """
+        self._discard(self._victim())
+
+    def _discard(self, key):
+        """ Evict a key: tell on_evict, move the item to the tier, a
+        TOMBSTONE being dropped from the tier instead, and remove it
+        """
+        item = self.cache_data[key]
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, item)
+        if self.tier is not None:
+            if item is TOMBSTONE:
+                self.tier.delete(key)
+            else:
+                self.tier.put(key, item, self._wall_expiry(key))
+        self._remove(key)
+
+    def _victim(self):
+        """ Key the replacement policy would evict next
+        """
+        raise NotImplementedError("_victim must be implemented in your \
+                cache class")
+
+    def _remove(self, key):
+        """ Drop a key and its bookkeeping from the cache
+        """
+        del self.cache_data[key]
+        self._release(key)
+        if self.expiry:
+            self.expiry.pop(key, None)
+        if self.tombstones:
+            self.tombstones.pop(key, None)
+
+    def _store(self, key, item, size, ttl):
+        """ Store an item that fits, with its size and deadline
+        """
+        self.cache_data[key] = item
+        self.inserts += 1
+        if item is TOMBSTONE:
+            self.tombstones[key] = None
+        self._charge(key, size)
+        self._schedule(key, ttl)
+
+    def _schedule(self, key, ttl):
+        """ Set the deadline of a freshly stored item
+        Args:
+            key - key of the item
+            ttl - seconds the item stays valid, the default ttl if None
+        """
+        if ttl is None:
+            ttl = self.ttl
+            if ttl is None:
+                return
+        deadline = time.monotonic() + ttl
+        self.expiry[key] = deadline
+        heapq.heappush(self.deadlines, (deadline, next(self._seq), key))
+        if len(self.deadlines) > 2 * len(self.expiry) + 64:
+            # Drop the entries left behind by updated or removed keys
+            self.deadlines = [(when, next(self._seq), live)
+                              for live, when in self.expiry.items()]
+            heapq.heapify(self.deadlines)
+
+    def _lookup(self, key):
+        """ Whether key holds a live item, counting the hit or miss
+        An expired item is dropped and counted as a miss.
+        """
+        if key not in self.cache_data:
+            if self.tier is not None and self._promote(key):
+                self.tier_hits += 1
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+        if self.expiry:
+            deadline = self.expiry.get(key)
+            if deadline is not None and deadline <= time.monotonic():
+                self._expire(key)
+                self.misses += 1
+                return False
+        self.hits += 1
+        if self.tombstones and key in self.tombstones:
+            self.negative_hits += 1
+        return True
+
+    def _expire(self, key):
+        """ Drop an expired item from both tiers
+        """
+        self._remove(key)
+        self.expirations += 1
+        if self.tier is not None:
+            self.tier.delete(key)
+
+    def reap(self, budget=None):
+        """ Remove expired items, oldest deadline first
+        Args:
+            budget - longest time in seconds to spend, no limit if None
+        Returns:
+            True if the budget ran out before every expired item was removed
+        """
+        now = time.monotonic()
+        stop = None if budget is None else now + budget
+        deadlines = self.deadlines
+        reaped = 0
+        while deadlines and deadlines[0][0] <= now:
+            deadline, _, key = heapq.heappop(deadlines)
+            if self.expiry.get(key) == deadline:
+                self._expire(key)
+            reaped += 1
+            if stop is not None and reaped % 64 == 0 and \
+                    time.monotonic() >= stop:
+                return bool(deadlines) and deadlines[0][0] <= now
+        return False
+
+    def _wall_expiry(self, key):
+        """ Wall clock time the item of key expires at, or None
+        """
+        deadline = self.expiry.get(key)
+        if deadline is None:
+            return None
+        return deadline - time.monotonic() + time.time()
+
+    def _promote(self, key):
+        """ Bring an item back from the tier, True if it is now cached
+        """
+        found = self.tier.get(key)
+        if found is None:
+            return False
+        item, expires = found
+        self.put(key, item, None if expires is None
+                 else max(expires - time.time(), 0))
+        return key in self.cache_data
+
+    def _snapshot(self):
+        """ (key, policy metadata) of every item, in restore order
+        """
+        return [(key, None) for key in self.cache_data]
+
+    def _restore(self, key, item, size, ttl, meta):
+        """ Store an item of a snapshot with its policy metadata
+        """
+        self._store(key, item, size, ttl)
+
+    def checkpoint(self):
+        """ Write every item and the policy metadata to the tier
+        After a restart, warm_up() brings the same items back in the
+        same eviction order. Tombstones are left out.
+        """
+        if self.tier is None:
+            raise ValueError("checkpoint needs a tier")
+        entries = []
+        for key, meta in self._snapshot():
+            if self.cache_data[key] is TOMBSTONE:
+                continue
+            expires = self._wall_expiry(key)
+            self.tier.put(key, self.cache_data[key], expires)
+            entries.append((key, meta, expires))
+        self.tier.write_snapshot(entries)
+
+    def warm_up(self):
+        """ Reload the items of the last checkpoint from the tier
+        Only the items of the snapshot are read from the tier.
+        Returns:
+            Number of items restored
+        """
+        if self.tier is None:
+            raise ValueError("warm_up needs a tier")
+        restored = 0
+        for key, meta, expires in self.tier.read_snapshot():
+            found = self.tier.get(key)
+            if found is None:
+                continue
+            item = found[0]
+            ttl = None if expires is None else expires - time.time()
+            size = self._size_of(item)
+            if key in self.cache_data or not self._make_room(size):
+                continue
+            self._restore(key, item, size, ttl, meta)
+            restored += 1
+        return restored
+
+    def start_reaper(self, interval=1.0, budget=0.001, lock=None):
+        """ Sweep expired items from a background thread
+        Each sweep runs in slices of at most `budget` seconds, releasing
+        the lock between slices so request threads are never stalled.
+        Args:
+            interval - seconds between two sweeps
+            budget - longest time in seconds a slice may hold the cache
+            lock - lock the callers also hold around every get, put and
+                   delete, required unless the cache is THREAD_SAFE
+        Raises:
+            ValueError if lock is missing: the reaper thread would change
+            the cache under the feet of the other threads
+        """
+        if lock is None and not self.THREAD_SAFE:
+            raise ValueError("start_reaper needs the lock guarding the cache")
+        self.stop_reaper()
+        stop = threading.Event()
+        guard = lock if lock is not None else contextlib.nullcontext()
+
+        def sweep():
+            """ Reap in small slices every interval until stopped """
+            while not stop.wait(interval):
+                more = True
+                while more and not stop.is_set():
+                    with guard:
+                        more = self.reap(budget)
+                    time.sleep(0)
+
+        self._reaper = stop
+        threading.Thread(target=sweep, name="cache-reaper",
+                         daemon=True).start()
+
+    def stop_reaper(self):
+        """ Stop the background reaper, if one is running
+        """
+        if self._reaper is not None:
+            self._reaper.set()
+            self._reaper = None
@@ -0,0 +1,1081 @@
+#!/usr/bin/env python3
+"""
+Micro benchmarks for the caching policies of this package.
+
+Run from this directory, for example:
+    ./benchmark.py lfu
+    ./benchmark.py lfu --sizes 1000 10000
+    ./benchmark.py ordered
+    ./benchmark.py stress
+    ./benchmark.py threads
+    ./benchmark.py listener
+    ./benchmark.py traces
+    ./benchmark.py traces --files recorded_keys.txt
+    ./benchmark.py batch
+    ./benchmark.py warm
+    ./benchmark.py memory
+    ./benchmark.py shared --workers 16
+    ./benchmark.py ring --nodes 1 2 4 8
+    ./benchmark.py herd
+    ./benchmark.py negative --absent 0.9
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from base_caching import TOMBSTONE, BaseCaching, print_discard
+
+
+POLICIES = [
+    ("FIFO", "1-fifo_cache", "FIFOCache"),
+    ("LIFO", "2-lifo_cache", "LIFOCache"),
+    ("LRU", "3-lru_cache", "LRUCache"),
+    ("MRU", "4-mru_cache", "MRUCache"),
+    ("LFU", "100-lfu_cache", "LFUCache"),
+    ("TinyLFU", "102-tinylfu_cache", "TinyLFUCache"),
+    ("ARC", "103-arc_cache", "ARCCache"),
+    ("2Q", "104-two_queue_cache", "TwoQueueCache"),
+]
+
+# Attributes holding the resident keys of the multi-list policies
+RESIDENT_LISTS = [
+    ("window", "probation", "protected"),
+    ("t1", "t2"),
+    ("a1in", "am"),
+]
+
+
+def load(module, name):
+    """Import a class from one of the numbered task modules."""
+    return getattr(__import__(module), name)
+
+
+def policies():
+    """List (name, class) for every eviction policy of the package."""
+    return [(name, load(module, cls)) for name, module, cls in POLICIES]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Send the DISCARD lines printed on eviction to /dev/null."""
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            yield
+
+
+def fill(cache, size):
+    """Put `size` distinct keys in the cache."""
+    for key in range(size):
+        cache.put(key, key)
+
+
+def mixed_ops(cache, size, ops, hit_ratio=0.8, seed=0):
+    """
+    Time a mix of hits on resident keys and puts of new keys.
+    Args:
+        cache - a filled cache holding the keys 0 .. size - 1
+        size - number of resident keys
+        ops - number of operations to time
+        hit_ratio - share of operations that are gets on resident keys
+    Returns:
+        Average nanoseconds per operation.
+    """
+    rng = random.Random(seed)
+    plan = [rng.randrange(size) if rng.random() < hit_ratio else None
+            for _ in range(ops)]
+    get, put = cache.get, cache.put
+    new_key = size
+    start = time.perf_counter_ns()
+    for key in plan:
+        if key is None:
+            put(new_key, new_key)
+            new_key += 1
+        else:
+            get(key)
+    return (time.perf_counter_ns() - start) / ops
+
+
+class LegacyFIFOCache(BaseCaching):
+    """
+    FIFOCache as it was before moving to OrderedDict, for comparison.
+    The DISCARD print is left out, as in the current policies.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the cache and the list tracking insertion order."""
+        super().__init__(*args, **kwargs)
+        self.order = []
+
+    def put(self, key, item):
+        """Add an item, evicting with list.pop(0)."""
+        if key is not None and item is not None:
+            if key in self.cache_data:
+                self.order.remove(key)
+            self.order.append(key)
+            self.cache_data[key] = item
+            if len(self.cache_data) > self.max_items:
+                first_key = self.order.pop(0)
+                del self.cache_data[first_key]
+
+    def get(self, key):
+        """Get an item by key."""
+        return self.cache_data.get(key, None)
+
+
+class LegacyMRUCache(BaseCaching):
+    """
+    MRUCache as it was before moving to OrderedDict, for comparison.
+    The DISCARD print is left out, as in the current policies.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the cache and the list tracking use order."""
+        super().__init__(*args, **kwargs)
+        self.order = []
+
+    def put(self, key, item):
+        """Add an item, reordering with list.remove."""
+        if key is None or item is None:
+            return
+        if key in self.cache_data:
+            self.order.remove(key)
+        elif len(self.cache_data) >= self.max_items:
+            mru_key = self.order.pop()
+            self.cache_data.pop(mru_key)
+        self.cache_data[key] = item
+        self.order.append(key)
+
+    def get(self, key):
+        """Get an item by key, reordering with list.remove."""
+        if key is None or key not in self.cache_data:
+            return None
+        self.order.remove(key)
+        self.order.append(key)
+        return self.cache_data[key]
+
+
+class LegacyLFUCache(BaseCaching):
+    """
+    LFUCache as it was before moving its buckets to a Slab, for
+    comparison: a key_freq dict and an OrderedDict per frequency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the cache, the frequencies and their buckets."""
+        super().__init__(*args, **kwargs)
+        self.key_freq = {}  # Key -> frequency
+        self.freq_buckets = {}  # Frequency -> OrderedDict of keys, LRU first
+        self.min_freq = 0
+
+    def put(self, key, item, ttl=None):
+        """Add an item, an update counting as one more use."""
+        if key is None or item is None:
+            return
+        size = self._size_of(item)
+        freq = 0
+        if key in self.cache_data:
+            freq = self.key_freq[key]
+            self._remove(key)
+        if not self._make_room(size):
+            return
+        self._store(key, item, size, ttl)
+        self._link(key, freq + 1)
+
+    def get(self, key):
+        """Get an item by key, counting one more use."""
+        if not self._lookup(key):
+            return None
+        self._update_frequency(key)
+        return self.cache_data[key]
+
+    def _link(self, key, freq):
+        """Place the key at the most recent end of the freq bucket."""
+        self.key_freq[key] = freq
+        self.freq_buckets.setdefault(freq, OrderedDict())[key] = None
+        if not self.min_freq or freq < self.min_freq:
+            self.min_freq = freq
+
+    def _update_frequency(self, key):
+        """Move the key from its bucket to the next frequency."""
+        freq = self.key_freq[key]
+        self.key_freq[key] = freq + 1
+        bucket = self.freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.freq_buckets[freq]
+            if freq == self.min_freq:
+                self.min_freq += 1
+        self.freq_buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    _hit = _update_frequency
+
+    def _victim(self):
+        """Least recently used key among the least frequently used."""
+        if self.min_freq not in self.freq_buckets:
+            self.min_freq = min(self.freq_buckets)
+        return next(iter(self.freq_buckets[self.min_freq]))
+
+    def _remove(self, key):
+        """Drop a key from the cache and from its frequency bucket."""
+        super()._remove(key)
+        freq = self.key_freq.pop(key)
+        bucket = self.freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.freq_buckets[freq]
+
+
+def with_ordered_dict(policy):
+    """
+    The policy keeping its items in an OrderedDict, as LIFOCache and
+    MRUCache did before moving to a plain dict, for comparison.
+    """
+    class Ordered(policy):
+        """The policy over an OrderedDict."""
+
+        def __init__(self, *args, **kwargs):
+            """Initialize the policy, then swap in an OrderedDict."""
+            super().__init__(*args, **kwargs)
+            self.cache_data = OrderedDict()
+
+    return Ordered
+
+
+def legacy_policies():
+    """List (name, class) for the layouts replaced by the current ones."""
+    return [("LIFO old", with_ordered_dict(load("2-lifo_cache",
+                                                "LIFOCache"))),
+            ("MRU old", with_ordered_dict(load("4-mru_cache", "MRUCache"))),
+            ("LFU old", LegacyLFUCache)]
+
+
+def bench_lfu(args):
+    """
+    Per-operation latency of LFUCache as the cache grows, against its
+    OrderedDict buckets version.
+    """
+    print(f"{'policy':<8} {'entries':>10} {'ns/op':>10}")
+    for size in args.sizes:
+        for name, policy in (("LFU", load("100-lfu_cache", "LFUCache")),
+                             ("LFU old", LegacyLFUCache)):
+            cache = policy(size)
+            fill(cache, size)
+            latency = mixed_ops(cache, size, args.ops)
+            print(f"{name:<8} {size:>10} {latency:>10.0f}")
+
+
+def bench_ordered(args):
+    """Throughput of FIFOCache and MRUCache against their list versions."""
+    policies = [
+        ("FIFO list", LegacyFIFOCache),
+        ("FIFO", load("1-fifo_cache", "FIFOCache")),
+        ("MRU list", LegacyMRUCache),
+        ("MRU", load("4-mru_cache", "MRUCache")),
+    ]
+    print(f"{'policy':<10} {'entries':>10} {'ops/sec':>12}")
+    for size in args.sizes:
+        for name, policy in policies:
+            cache = policy(size)
+            fill(cache, size)
+            latency = mixed_ops(cache, size, args.ops)
+            print(f"{name:<10} {size:>10} {1e9 / latency:>12,.0f}")
+
+
+def run_threads(count, target):
+    """Run target(index) in `count` threads and return the wall time."""
+    threads = [threading.Thread(target=target, args=(index,))
+               for index in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def check_segment(cache):
+    """
+    Check the bookkeeping of one policy instance.
+    Returns:
+        A list of problems found, empty when the cache is consistent.
+    """
+    problems = []
+    if len(cache.cache_data) > cache.max_items:
+        problems.append(f"{len(cache.cache_data)} items over capacity")
+    if hasattr(cache, "buckets"):
+        slab = cache.slab
+        bucketed = {}
+        for freq, head in cache.buckets.items():
+            if slab.empty(head):
+                problems.append(f"empty bucket {freq}")
+            bucketed.update(dict.fromkeys(slab.iter(head), freq))
+        frequencies = {key: slab.tags[slot]
+                       for key, slot in cache.slots.items()}
+        if bucketed != frequencies:
+            problems.append("frequency buckets out of sync")
+        if set(cache.slots) != set(cache.cache_data):
+            problems.append("frequencies out of sync with data")
+    for names in RESIDENT_LISTS:
+        if hasattr(cache, names[0]):
+            lists = [getattr(cache, name) for name in names]
+            resident = set().union(*lists)
+            if resident != set(cache.cache_data) or \
+                    sum(map(len, lists)) != len(resident):
+                problems.append(f"{'/'.join(names)} out of sync with data")
+    return problems
+
+
+def bench_stress(args):
+    """Hammer a ShardedCache of every policy from many threads."""
+    ShardedCache = load("101-sharded_cache", "ShardedCache")
+    failed = False
+    for name, policy in policies():
+        cache = ShardedCache(policy, args.shards, args.capacity,
+                             args.capacity * 40)
+        errors = []
+
+        def worker(index):
+            """Mix gets and puts, checking every value read back."""
+            rng = random.Random(index)
+            try:
+                for _ in range(args.ops):
+                    key = rng.randrange(args.keys)
+                    if rng.random() < 0.5:
+                        cache.put(key, (key,) * rng.randint(1, 8))
+                    else:
+                        value = cache.get(key)
+                        if value is not None and value[0] != key:
+                            errors.append(f"{key} read back as {value}")
+            except Exception as error:
+                errors.append(repr(error))
+
+        run_threads(args.threads, worker)
+        for shard in cache.shards:
+            errors.extend(check_segment(shard))
+        failed = failed or bool(errors)
+        print(f"{name:<6} {'ok' if not errors else errors[0]}")
+    if failed:
+        raise SystemExit(1)
+
+
+def bench_threads(args):
+    """Throughput of one locked cache against a sharded one per thread."""
+    ShardedCache = load("101-sharded_cache", "ShardedCache")
+    LRUCache = load("3-lru_cache", "LRUCache")
+    print(f"{'threads':>8} {'shards':>8} {'ops/sec':>12}")
+    for count in args.threads:
+        for shards in (1, args.shards):
+            cache = ShardedCache(LRUCache, shards, args.capacity)
+            fill(cache, args.capacity)
+
+            def worker(index):
+                """Replay a mixed workload on the shared cache."""
+                mixed_ops(cache, args.capacity, args.ops, seed=index)
+
+            elapsed = run_threads(count, worker)
+            total = count * args.ops
+            print(f"{count:>8} {shards:>8} {total / elapsed:>12,.0f}")
+
+
+def bench_listener(args):
+    """Put latency under churn without and with the DISCARD listener."""
+    print(f"{'policy':<6} {'listener':<14} {'ns/put':>8}")
+    for name, policy in policies():
+        for label, listener in [("none", None),
+                                ("print_discard", print_discard)]:
+            cache = policy(args.capacity, on_evict=listener)
+            fill(cache, args.capacity)
+            with quiet():
+                # Every operation is a put of a new key, so each one evicts
+                latency = mixed_ops(cache, args.capacity, args.ops, 0)
+            print(f"{name:<6} {label:<14} {latency:>8.0f}")
+
+
+def zipf_trace(length, universe, alpha=1.0, seed=0):
+    """Keys drawn from a Zipf distribution over `universe` keys."""
+    rng = random.Random(seed)
+    weights = itertools.accumulate(1 / rank ** alpha
+                                   for rank in range(1, universe + 1))
+    return rng.choices(range(universe), cum_weights=list(weights), k=length)
+
+
+def scan_trace(length, universe, hot=0.04, seed=0):
+    """
+    A small hot set hit half of the time, interleaved with a one-off scan
+    walking through every other key, like a crawler paging a dataset.
+    """
+    rng = random.Random(seed)
+    hot_keys = max(1, int(universe * hot))
+    scan = itertools.count(hot_keys)
+    return [rng.randrange(hot_keys) if rng.random() < 0.5 else next(scan)
+            for _ in range(length)]
+
+
+def loop_trace(length, universe, seed=0):
+    """Keys 0 .. universe - 1 requested over and over in the same order."""
+    return [index % universe for index in range(length)]
+
+
+def file_trace(path):
+    """Keys recorded in a file, one per line."""
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f]
+
+
+TRACES = {
+    "zipf": zipf_trace,
+    "scan": scan_trace,
+    "loop": loop_trace,
+}
+
+
+def replay(cache, trace):
+    """
+    Use the cache as a lookaside cache for every key of the trace.
+    Returns:
+        (hit ratio, operations per second)
+    """
+    get, put = cache.get, cache.put
+    hits = 0
+    start = time.perf_counter()
+    for key in trace:
+        if get(key) is None:
+            put(key, key)
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    return hits / len(trace), len(trace) / elapsed
+
+
+def bench_traces(args):
+    """Hit ratio and ops/sec of every policy on synthetic key traces."""
+    print(f"{'trace':<10} {'policy':<8} {'hit ratio':>9} {'ops/sec':>12}")
+    traces = [(name, TRACES[name](args.length, args.universe))
+              for name in args.traces]
+    traces += [(os.path.basename(path), file_trace(path))
+               for path in args.files]
+    wanted = args.policies or [name for name, _, _ in POLICIES]
+    for trace_name, trace in traces:
+        for name, policy in policies() + legacy_policies():
+            if name not in wanted:
+                continue
+            ratio, speed = replay(policy(args.capacity), trace)
+            print(f"{trace_name:<10} {name:<8} {ratio:>9.2%} {speed:>12,.0f}")
+
+
+def batch_plan(batches, size, universe, seed=0):
+    """Random batches of keys to read, items to write and keys to drop."""
+    rng = random.Random(seed)
+    return [([rng.randrange(universe) for _ in range(size)],
+             {rng.randrange(universe): rng.random() for _ in range(size)},
+             [rng.randrange(universe) for _ in range(size // 4)])
+            for _ in range(batches)]
+
+
+def apply_single(cache, plan):
+    """Run the plan with one call per key."""
+    for keys, mapping, dropped in plan:
+        for key in keys:
+            cache.get(key)
+        for key, item in mapping.items():
+            cache.put(key, item)
+        for key in dropped:
+            cache.delete(key)
+
+
+def apply_batched(cache, plan):
+    """Run the plan with one batch call per step."""
+    for keys, mapping, dropped in plan:
+        cache.get_many(keys)
+        cache.put_many(mapping)
+        cache.delete_many(dropped)
+
+
+def bench_batch(args):
+    """
+    Check batch calls match single calls, and compare their speed, on
+    every policy and on a private SharedMemoryCache.
+    """
+    plan = batch_plan(args.batches, args.size, args.universe)
+    print(f"{'policy':<8} {'same':<5} {'single ops/s':>13} "
+          f"{'batch ops/s':>13}")
+    ops = args.batches * (args.size * 2 + args.size // 4)
+    failed = False
+    shared = ("Shared", load("105-shared_memory_cache", "SharedMemoryCache"))
+    for name, policy in policies() + [shared]:
+        results = []
+        for apply in (apply_single, apply_batched):
+            evicted = []
+            cache = policy(args.capacity,
+                           on_evict=lambda key, item: evicted.append(key))
+            start = time.perf_counter()
+            apply(cache, plan)
+            elapsed = time.perf_counter() - start
+            results.append((evicted, list(cache.cache_data.items()),
+                            cache.stats(), ops / elapsed))
+            if policy is shared[1]:
+                cache.close()
+                cache.unlink()
+        same = results[0][:3] == results[1][:3]
+        failed = failed or not same
+        print(f"{name:<8} {'yes' if same else 'NO':<5} "
+              f"{results[0][3]:>13,.0f} {results[1][3]:>13,.0f}")
+    if failed:
+        raise SystemExit(1)
+
+
+def bench_warm(args):
+    """
+    Hit ratio after a restart: none, cold, warmed from the disk tier
+    counting memory hits only, and with both tiers serving hits.
+    """
+    DiskTier = load("disk_tier", "DiskTier")
+    trace = zipf_trace(args.length, args.universe)
+    first, second = trace[:len(trace) // 2], trace[len(trace) // 2:]
+    print(f"{'policy':<8} {'no restart':>10} {'cold':>8} {'warm':>8} "
+          f"{'2 tiers':>8} {'warm up s':>9}")
+    for name, policy in policies():
+        if args.policies and name not in args.policies:
+            continue
+        steady = policy(args.capacity)
+        replay(steady, first)
+        ratios = [replay(steady, second)[0]]
+
+        cold = policy(args.capacity)
+        ratios.append(replay(cold, second)[0])
+
+        path = tempfile.mkdtemp()
+        try:
+            before = policy(args.capacity, tier=DiskTier(path))
+            replay(before, first)
+            before.checkpoint()
+            before.tier.close()
+            after = policy(args.capacity, tier=DiskTier(path))
+            start = time.perf_counter()
+            after.warm_up()
+            elapsed = time.perf_counter() - start
+            both = replay(after, second)[0]
+            stats = after.stats()
+            ratios.append((stats['hits'] - stats['tier_hits']) / len(second))
+            ratios.append(both)
+            after.tier.close()
+        finally:
+            shutil.rmtree(path)
+        print(f"{name:<8} {ratios[0]:>10.2%} {ratios[1]:>8.2%} "
+              f"{ratios[2]:>8.2%} {ratios[3]:>8.2%} {elapsed:>9.3f}")
+
+
+def bytes_per_entry(policy, size, **options):
+    """
+    Memory tracemalloc sees allocated by a filled cache, per entry.
+    The keys and items exist beforehand, so only the bookkeeping counts.
+    """
+    keys = list(range(size, 2 * size))
+    tracemalloc.start()
+    try:
+        cache = policy(size, **options)
+        for key in keys:
+            cache.put(key, key)
+        for key in keys[::3]:
+            cache.get(key)
+        return tracemalloc.get_traced_memory()[0] / size
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(args):
+    """
+    Bytes per entry of every policy, without and with a byte budget,
+    and of the layouts LIFO, MRU and LFU had before.
+    """
+    print(f"{'policy':<8} {'entries':>10} {'bytes/entry':>12} "
+          f"{'max_bytes':>10}")
+    for size in args.sizes:
+        for name, policy in policies() + legacy_policies():
+            plain = bytes_per_entry(policy, size)
+            budget = bytes_per_entry(policy, size, max_bytes=size * 1000)
+            print(f"{name:<8} {size:>10} {plain:>12.0f} {budget:>10.0f}")
+
+
+def proportional_memory():
+    """
+    Memory of this process in bytes, shared pages divided among the
+    processes mapping them (PSS), or the resident size if unavailable.
+    """
+    for path, field in (("/proc/self/smaps_rollup", "Pss:"),
+                        ("/proc/self/status", "VmRSS:")):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return 0
+
+
+def shared_worker(cache, capacity, trace, value_size, results):
+    """
+    Replay a slice of the requests in a worker process, caching a value
+    of value_size bytes per key, and report (hits, seconds, memory).
+    Args:
+        cache - the shared cache, or None for a private LRUCache
+        capacity - items of the private LRUCache
+    The memory reported includes the pages of the trace copied on write
+    by the replay, the same for every cache.
+    """
+    if cache is None:
+        cache = load("3-lru_cache", "LRUCache")(capacity)
+    before = proportional_memory()
+    padding = "x" * value_size
+    get, put = cache.get, cache.put
+    hits = 0
+    start = time.perf_counter()
+    for key in trace:
+        if get(key) is None:
+            put(key, f"{key}{padding}")
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - start
+    results.put((hits, elapsed, proportional_memory() - before))
+
+
+def bench_shared(args):
+    """
+    Hit ratio and memory of worker processes sharing one cache through
+    shared memory, against one private LRUCache each, as large as the
+    shared one or splitting its capacity.
+    """
+    SharedMemoryCache = load("105-shared_memory_cache", "SharedMemoryCache")
+    trace = zipf_trace(args.length, args.universe)
+    # Requests are spread over the workers like a load balancer would
+    slices = [trace[index::args.workers] for index in range(args.workers)]
+    context = multiprocessing.get_context("fork")
+    print(f"{args.workers} workers, {args.capacity:,} items per cache, "
+          f"{args.value_size} byte values")
+    print(f"{'cache':<14} {'hit ratio':>9} {'ops/sec':>10} {'memory MB':>10}")
+    split = max(args.capacity // args.workers, 1)
+    for name, capacity in (("private LRU", args.capacity),
+                           (f"private 1/{args.workers}", split),
+                           ("shared memory", args.capacity)):
+        shared = None
+        if name == "shared memory":
+            shared = SharedMemoryCache(capacity,
+                                       slot_size=args.value_size + 64)
+        results = context.Queue()
+        workers = [context.Process(target=shared_worker,
+                                   args=(shared, capacity, part,
+                                         args.value_size, results))
+                   for part in slices]
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+        hits = sum(outcome[0] for outcome in outcomes)
+        # Workers run side by side: total requests over the slowest one
+        speed = len(trace) / max(outcome[1] for outcome in outcomes)
+        memory = sum(outcome[2] for outcome in outcomes) / 2 ** 20
+        print(f"{name:<14} {hits / len(trace):>9.2%} {speed:>10,.0f} "
+              f"{memory:>10.1f}")
+
+
+def ring_client(addresses, trace, batch, results):
+    """
+    Use a DistributedCache over the nodes as a lookaside cache for the
+    keys of the trace, a batch at a time, and report (hits, seconds).
+    """
+    cache = load("106-distributed_cache", "DistributedCache")(addresses)
+    hits = 0
+    start = time.perf_counter()
+    for index in range(0, len(trace), batch):
+        keys = trace[index:index + batch]
+        found = cache.get_many(keys)
+        hits += len(found)
+        missing = {key: key for key in keys if key not in found}
+        if missing:
+            cache.put_many(missing)
+    elapsed = time.perf_counter() - start
+    cache.close()
+    results.put((hits, elapsed))
+
+
+def remapped(before, after, keys):
+    """Share of the keys whose owner differs between two mappings."""
+    return sum(before(key) != after(key) for key in keys) / len(keys)
+
+
+def bench_ring(args):
+    """
+    Keys remapped when a node joins, with the hash ring and with
+    hash modulo nodes, then throughput of client processes against 1 to N
+    local cache node processes.
+    """
+    HashRing = load("hash_ring", "HashRing")
+    key_hash = load("hash_ring", "key_hash")
+    keys = [f"key{index}" for index in range(args.keys)]
+    print(f"{'nodes':>5} {'ring moved':>10} {'ideal':>7} {'mod moved':>9}")
+    for count in args.nodes:
+        old = HashRing(range(count), args.vnodes)
+        new = HashRing(range(count + 1), args.vnodes)
+        ring = remapped(old.node_for, new.node_for, keys)
+        modulo = remapped(lambda key: key_hash(key) % count,
+                          lambda key: key_hash(key) % (count + 1), keys)
+        print(f"{count}->{count + 1:<2} {ring:>10.2%} "
+              f"{1 / (count + 1):>7.2%} {modulo:>9.2%}")
+
+    CacheNode = load("cache_node", "CacheNode")
+    LRUCache = load("3-lru_cache", "LRUCache")
+    trace = [f"key{key}" for key in zipf_trace(args.length, args.universe)]
+    slices = [trace[index::args.clients] for index in range(args.clients)]
+    print(f"{args.clients} clients, batches of {args.batch}, "
+          f"{args.capacity:,} items per node")
+    print(f"{'nodes':>5} {'hit ratio':>9} {'keys/sec':>10}")
+    for count in args.nodes:
+        nodes = [CacheNode(LRUCache, args.capacity) for _ in range(count)]
+        try:
+            addresses = [node.address for node in nodes]
+            results = multiprocessing.Queue()
+            clients = [multiprocessing.Process(
+                target=ring_client, args=(addresses, part, args.batch,
+                                          results)) for part in slices]
+            for client in clients:
+                client.start()
+            outcomes = [results.get() for _ in clients]
+            for client in clients:
+                client.join()
+        finally:
+            for node in nodes:
+                node.stop()
+        hits = sum(outcome[0] for outcome in outcomes)
+        speed = len(trace) / max(outcome[1] for outcome in outcomes)
+        print(f"{count:>5} {hits / len(trace):>9.2%} {speed:>10,.0f}")
+
+
+class Origin():
+    """
+    Slow async source of the items, slower as more calls overlap, like
+    a database under load.
+    """
+
+    def __init__(self, latency, per_call):
+        """
+        Args:
+            latency - seconds of a call running alone
+            per_call - seconds added per other call in flight
+        """
+        self.latency = latency
+        self.per_call = per_call
+        self.calls = 0
+        self.active = 0
+
+    async def fetch(self, key):
+        """The item of key, after the delay of the current load."""
+        self.calls += 1
+        self.active += 1
+        try:
+            await asyncio.sleep(self.latency + self.per_call * self.active)
+            return f"item {key}"
+        finally:
+            self.active -= 1
+
+
+async def naive_lookup(cache, origin, key):
+    """Lookaside caching as done with the synchronous policies."""
+    item = cache.get(key)
+    if item is None:
+        item = await origin.fetch(key)
+        cache.put(key, item)
+    return item
+
+
+async def run_herd(args, lookup):
+    """
+    Fire waves of concurrent requests on a few hot keys.
+    Returns:
+        Sorted latencies of the requests in seconds
+    """
+    latencies = []
+    rng = random.Random(0)
+
+    async def request(key):
+        """One timed request."""
+        start = time.perf_counter()
+        await lookup(key)
+        latencies.append(time.perf_counter() - start)
+
+    pending = []
+    for _ in range(args.waves):
+        keys = rng.choices(range(args.keys), k=args.wave_size)
+        pending += [asyncio.ensure_future(request(key)) for key in keys]
+        await asyncio.sleep(args.interval)
+    await asyncio.gather(*pending)
+    return sorted(latencies)
+
+
+def bench_herd(args):
+    """
+    Origin calls and latency of waves of concurrent requests on hot
+    keys: naive lookaside, coalesced loads, stale-while-revalidate,
+    and the same with a cap on concurrent loader calls.
+    """
+    AsyncCache = load("async_cache", "AsyncCache")
+    LRUCache = load("3-lru_cache", "LRUCache")
+    print(f"{args.waves} waves of {args.wave_size} requests every "
+          f"{args.interval * 1e3:.0f} ms on {args.keys} keys, "
+          f"ttl {args.ttl} s")
+    print(f"{'front':<16} {'origin calls':>12} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8}")
+    setups = [
+        ("naive", None),
+        ("coalesced", dict(soft_ttl=None)),
+        ("stale+refresh", dict(soft_ttl=args.ttl)),
+        (f"stale+cap {args.max_loads}",
+         dict(soft_ttl=args.ttl, max_loads=args.max_loads)),
+    ]
+    for name, options in setups:
+        origin = Origin(args.latency, args.per_call)
+        if options is None:
+            cache = LRUCache(args.keys, ttl=args.ttl)
+
+            def lookup(key, cache=cache, origin=origin):
+                return naive_lookup(cache, origin, key)
+        else:
+            # Stale items are kept 10 times longer than they are fresh
+            hard_ttl = args.ttl if options["soft_ttl"] is None \
+                else args.ttl * 10
+            front = AsyncCache(LRUCache(args.keys, ttl=hard_ttl), **options)
+
+            def lookup(key, front=front, origin=origin):
+                return front.get_or_load(key, lambda: origin.fetch(key))
+        latencies = asyncio.run(run_herd(args, lookup))
+        cut = latencies[int(len(latencies) * 0.99)]
+        print(f"{name:<16} {origin.calls:>12,} "
+              f"{latencies[len(latencies) // 2] * 1e3:>8.2f} "
+              f"{cut * 1e3:>8.2f} {latencies[-1] * 1e3:>8.2f}")
+
+
+def negative_trace(args, seed=0):
+    """
+    Requests for existing keys, Zipf distributed, mixed with a flood of
+    requests for absent ones, negative integers never stored.
+    """
+    rng = random.Random(seed)
+    existing = iter(zipf_trace(args.length, args.universe, seed=seed))
+    return [-1 - rng.randrange(args.absent_keys)
+            if rng.random() < args.absent else next(existing)
+            for _ in range(args.length)]
+
+
+def negative_memory(count):
+    """Bytes per key remembered as absent, for each way to do it."""
+    LRUCache = load("3-lru_cache", "LRUCache")
+    NegativeCache = load("negative_cache", "NegativeCache")
+    keys = list(range(-count, 0))
+    sizes = {}
+    for name, make, add in (
+            ("tombstones", lambda: LRUCache(count),
+             lambda store, key: store.put(key, TOMBSTONE)),
+            ("set", set, set.add),
+            ("bloom", lambda: NegativeCache(count),
+             lambda store, key: store.add(key))):
+        tracemalloc.start()
+        try:
+            store = make()
+            for key in keys:
+                add(store, key)
+            sizes[name] = tracemalloc.get_traced_memory()[0] / count
+        finally:
+            tracemalloc.stop()
+    return sizes
+
+
+def bench_negative(args):
+    """
+    Origin reads under a flood of absent keys: plain lookaside caching,
+    misses cached as TOMBSTONE items, and a Bloom NegativeCache.
+    """
+    LRUCache = load("3-lru_cache", "LRUCache")
+    NegativeCache = load("negative_cache", "NegativeCache")
+    load_through = load("negative_cache", "load_through")
+    trace = negative_trace(args)
+    memory = negative_memory(args.absent_keys)
+    print(f"{args.absent:.0%} of {args.length:,} requests for "
+          f"{args.absent_keys:,} absent keys, cache of {args.capacity:,}")
+    print(f"{'misses':<11} {'origin reads':>12} {'hit ratio':>9} "
+          f"{'false neg.':>10} {'bytes/key':>9}")
+    for name in ("not cached", "tombstones", "bloom"):
+        cache = LRUCache(args.capacity)
+        negatives = NegativeCache(args.absent_keys, args.error_rate) \
+            if name == "bloom" else None
+        reads = hits = wrong = 0
+
+        def origin(key):
+            """The item of a non-negative key, None for the others."""
+            nonlocal reads
+            reads += 1
+            return key if key >= 0 else None
+
+        if name == "not cached":
+            def lookup(key):
+                """Lookaside read remembering nothing of misses."""
+                item = cache.get(key)
+                if item is None:
+                    item = origin(key)
+                    if item is not None:
+                        cache.put(key, item)
+                return item
+        else:
+            def lookup(key):
+                """Lookaside read caching misses."""
+                return load_through(cache, key, origin, negatives)
+
+        for key in trace:
+            before = reads
+            item = lookup(key)
+            if key >= 0:
+                if item is None:
+                    wrong += 1
+                elif reads == before:
+                    hits += 1
+        present = sum(key >= 0 for key in trace)
+        size = memory["bloom" if negatives else "tombstones"] \
+            if name != "not cached" else 0
+        print(f"{name:<11} {reads:>12,} {hits / present:>9.2%} "
+              f"{wrong:>10,} {size:>9.1f}")
+    print(f"a set of the absent keys takes {memory['set']:.1f} bytes/key")
+
+
+def main():
+    """Parse the command line and run the selected benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    lfu = commands.add_parser("lfu", help=bench_lfu.__doc__)
+    lfu.add_argument("--sizes", type=int, nargs="+",
+                     default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    lfu.add_argument("--ops", type=int, default=200000)
+    lfu.set_defaults(run=bench_lfu)
+
+    ordered = commands.add_parser("ordered", help=bench_ordered.__doc__)
+    ordered.add_argument("--sizes", type=int, nargs="+",
+                         default=[10 ** 3, 10 ** 5, 10 ** 6])
+    ordered.add_argument("--ops", type=int, default=2000)
+    ordered.set_defaults(run=bench_ordered)
+
+    stress = commands.add_parser("stress", help=bench_stress.__doc__)
+    stress.add_argument("--threads", type=int, default=8)
+    stress.add_argument("--shards", type=int, default=4)
+    stress.add_argument("--capacity", type=int, default=64)
+    stress.add_argument("--keys", type=int, default=1000)
+    stress.add_argument("--ops", type=int, default=50000)
+    stress.set_defaults(run=bench_stress)
+
+    threads = commands.add_parser("threads", help=bench_threads.__doc__)
+    threads.add_argument("--threads", type=int, nargs="+",
+                         default=[1, 2, 4, 8, 16])
+    threads.add_argument("--shards", type=int, default=16)
+    threads.add_argument("--capacity", type=int, default=10000)
+    threads.add_argument("--ops", type=int, default=50000)
+    threads.set_defaults(run=bench_threads)
+
+    listener = commands.add_parser("listener", help=bench_listener.__doc__)
+    listener.add_argument("--capacity", type=int, default=1000)
+    listener.add_argument("--ops", type=int, default=100000)
+    listener.set_defaults(run=bench_listener)
+
+    traces = commands.add_parser("traces", help=bench_traces.__doc__)
+    traces.add_argument("--traces", nargs="+", choices=sorted(TRACES),
+                        default=["zipf", "scan", "loop"])
+    traces.add_argument("--files", nargs="+", default=[],
+                        help="recorded traces, one key per line")
+    traces.add_argument("--policies", nargs="+",
+                        help="e.g. LFU 'LFU old' to compare layouts")
+    traces.add_argument("--capacity", type=int, default=1000)
+    traces.add_argument("--universe", type=int, default=20000)
+    traces.add_argument("--length", type=int, default=200000)
+    traces.set_defaults(run=bench_traces)
+
+    batch = commands.add_parser("batch", help=bench_batch.__doc__)
+    batch.add_argument("--capacity", type=int, default=1000)
+    batch.add_argument("--universe", type=int, default=5000)
+    batch.add_argument("--batches", type=int, default=2000)
+    batch.add_argument("--size", type=int, default=32)
+    batch.set_defaults(run=bench_batch)
+
+    warm = commands.add_parser("warm", help=bench_warm.__doc__)
+    warm.add_argument("--policies", nargs="+")
+    warm.add_argument("--capacity", type=int, default=5000)
+    warm.add_argument("--universe", type=int, default=100000)
+    warm.add_argument("--length", type=int, default=200000)
+    warm.set_defaults(run=bench_warm)
+
+    memory = commands.add_parser("memory", help=bench_memory.__doc__)
+    memory.add_argument("--sizes", type=int, nargs="+",
+                        default=[10 ** 5, 10 ** 6])
+    memory.set_defaults(run=bench_memory)
+
+    shared = commands.add_parser("shared", help=bench_shared.__doc__)
+    shared.add_argument("--workers", type=int, default=8)
+    shared.add_argument("--capacity", type=int, default=10000)
+    shared.add_argument("--universe", type=int, default=200000)
+    shared.add_argument("--length", type=int, default=400000)
+    shared.add_argument("--value-size", type=int, default=512)
+    shared.set_defaults(run=bench_shared)
+
+    ring = commands.add_parser("ring", help=bench_ring.__doc__)
+    ring.add_argument("--nodes", type=int, nargs="+",
+                      default=[1, 2, 4, 8])
+    ring.add_argument("--vnodes", type=int, default=160)
+    ring.add_argument("--keys", type=int, default=100000,
+                      help="keys checked for remapping")
+    ring.add_argument("--clients", type=int, default=8)
+    ring.add_argument("--batch", type=int, default=32)
+    ring.add_argument("--capacity", type=int, default=10000)
+    ring.add_argument("--universe", type=int, default=100000)
+    ring.add_argument("--length", type=int, default=400000)
+    ring.set_defaults(run=bench_ring)
+
+    herd = commands.add_parser("herd", help=bench_herd.__doc__)
+    herd.add_argument("--waves", type=int, default=200)
+    herd.add_argument("--wave-size", type=int, default=200)
+    herd.add_argument("--interval", type=float, default=0.005,
+                      help="seconds between two waves")
+    herd.add_argument("--keys", type=int, default=20)
+    herd.add_argument("--ttl", type=float, default=0.2,
+                      help="seconds an item stays fresh")
+    herd.add_argument("--latency", type=float, default=0.02,
+                      help="seconds of an origin call running alone")
+    herd.add_argument("--per-call", type=float, default=0.0005,
+                      help="seconds added per concurrent origin call")
+    herd.add_argument("--max-loads", type=int, default=4)
+    herd.set_defaults(run=bench_herd)
+
+    negative = commands.add_parser("negative", help=bench_negative.__doc__)
+    negative.add_argument("--length", type=int, default=400000)
+    negative.add_argument("--universe", type=int, default=100000)
+    negative.add_argument("--capacity", type=int, default=10000)
+    negative.add_argument("--absent", type=float, default=0.5,
+                          help="share of requests for absent keys")
+    negative.add_argument("--absent-keys", type=int, default=50000)
+    negative.add_argument("--error-rate", type=float, default=0.01)
+    negative.set_defaults(run=bench_negative)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
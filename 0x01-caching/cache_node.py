@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Module implements a local cache server process and its connection
+"""
+import multiprocessing
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+
+FRAME = struct.Struct('<I')  # Length of the pickled message that follows
+COMMANDS = {"get", "put", "delete", "get_many", "put_many", "delete_many"}
+
+
+def send_message(sock, message):
+    """Write one length-prefixed pickled message."""
+    payload = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(FRAME.pack(len(payload)) + payload)
+
+
+def _read_exactly(stream, size):
+    """Read size bytes, raising EOFError if the stream ends first."""
+    data = stream.read(size)
+    if len(data) < size:
+        raise EOFError("connection closed")
+    return data
+
+
+def read_message(stream):
+    """
+    Read one message from a buffered binary stream.
+    Raises:
+        EOFError at the end of the stream
+    """
+    header = _read_exactly(stream, FRAME.size)
+    return pickle.loads(_read_exactly(stream, FRAME.unpack(header)[0]))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answers the requests of one client connection, in order."""
+
+    def handle(self):
+        """Run commands until the client disconnects."""
+        cache, lock = self.server.cache, self.server.lock
+        while True:
+            try:
+                request = read_message(self.rfile)
+            except EOFError:
+                return
+            command, args = request[0], request[1:]
+            with lock:
+                if command == "items":
+                    reply = dict(cache.cache_data)
+                elif command == "stats":
+                    reply = cache.stats()
+                elif command in COMMANDS:
+                    reply = getattr(cache, command)(*args)
+                else:
+                    return  # Unknown command, drop the client
+            send_message(self.connection, reply)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Threaded TCP server sharing one cache between its connections."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _serve(policy, max_items, options, address, ready):
+    """Entry point of a node process."""
+    server = _Server(address, _Handler)
+    server.cache = policy(max_items, **options)
+    server.lock = threading.Lock()
+    ready.send(server.server_address)
+    ready.close()
+    server.serve_forever()
+
+
+class CacheNode():
+    """
+    CacheNode runs one cache policy in a separate process behind a TCP
+    socket, a local stand-in for a memcached-like cache server.
+    Messages are length-prefixed pickles, so a node must only listen
+    on a trusted interface, the loopback one by default.
+    The node answers get, put, delete and their batch versions, items
+    and stats, each connection's requests in the order they were sent,
+    which lets a client pipeline them.
+    """
+
+    def __init__(self, policy, max_items=None, host='127.0.0.1', port=0,
+                 **options):
+        """
+        Start the node process.
+        Args:
+            policy - BaseCaching subclass run by the node
+            max_items - capacity of the node, MAX_ITEMS by default
+            host - interface to listen on
+            port - port to listen on, a free one if 0
+            options - other arguments of the policy, e.g. ttl
+        """
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(
+            target=_serve, args=(policy, max_items, options, (host, port),
+                                 sender),
+            daemon=True)
+        self.process.start()
+        sender.close()
+        self.address = receiver.recv()
+        receiver.close()
+
+    def stop(self):
+        """Stop the node process, dropping its items."""
+        self.process.terminate()
+        self.process.join()
+
+
+class NodeConnection():
+    """
+    Connection of a client to one node.
+    send() and receive() are separate so a client can send requests to
+    several nodes before waiting for the first reply.
+    """
+
+    def __init__(self, address):
+        """
+        Connect to a node.
+        Args:
+            address - (host, port) of the node
+        """
+        self.address = address
+        self.sock = socket.create_connection(address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        self.lock = threading.Lock()  # One request in flight per thread
+
+    def send(self, *request):
+        """Send one request, e.g. send("get_many", keys)."""
+        send_message(self.sock, request)
+
+    def receive(self):
+        """Read the reply to the oldest request not answered yet."""
+        try:
+            return read_message(self.stream)
+        except EOFError:
+            raise ConnectionError(f"node {self.address} closed") from None
+
+    def call(self, *request):
+        """Send one request and wait for its reply."""
+        with self.lock:
+            self.send(*request)
+            return self.receive()
+
+    def close(self):
+        """Close the connection."""
+        self.stream.close()
+        self.sock.close()
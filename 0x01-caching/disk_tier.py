@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Module implements a persistent, memory-mapped second cache tier
+"""
+import mmap
+import os
+import pickle
+import struct
+import time
+
+
+class DiskTier():
+    """
+    DiskTier keeps items in an append-only log read through mmap.
+    Only the record headers and keys are read when the log is opened,
+    values are unpickled on demand, so reopening a large log is cheap.
+    Overwritten and deleted records are reclaimed by compact(), which
+    runs on its own once dead records outweigh live ones.
+    The tier also stores the snapshot a cache takes of its policy order,
+    see BaseCaching.checkpoint() and BaseCaching.warm_up().
+    """
+    HEADER = struct.Struct('<BII')  # Flags, key length, value length
+    RECORD_DELETE = 1  # Flag of a record deleting its key
+    COMPACT_MIN_BYTES = 1 << 20
+
+    def __init__(self, path):
+        """
+        Open or create the tier.
+        Args:
+            path - directory holding the log and the snapshot
+        """
+        os.makedirs(path, exist_ok=True)
+        self.log_path = os.path.join(path, 'data.log')
+        self.snapshot_path = os.path.join(path, 'snapshot.pickle')
+        self.index = {}  # Key -> (value offset, value length)
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.file = open(self.log_path, 'a+b')
+        self.map = None
+        self._load_index()
+
+    def __len__(self):
+        """Number of keys stored."""
+        return len(self.index)
+
+    def __contains__(self, key):
+        """Whether key is stored."""
+        return key in self.index
+
+    def _remap(self):
+        """Map the whole log, after it grew or was rewritten."""
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.flush()
+        if os.fstat(self.file.fileno()).st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+
+    def _load_index(self):
+        """Scan the record headers and keys, skipping over the values."""
+        self.index = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self._remap()
+        view = self.map
+        size = len(view) if view is not None else 0
+        offset = 0
+        while offset + self.HEADER.size <= size:
+            flags, key_len, value_len = self.HEADER.unpack_from(view, offset)
+            start = offset + self.HEADER.size
+            end = start + key_len + value_len
+            if end > size:
+                break  # Torn write at the end of the log
+            key = pickle.loads(view[start:start + key_len])
+            previous = self.index.pop(key, None)
+            if previous is not None:
+                self.live_bytes -= previous[1]
+                self.dead_bytes += previous[1]
+            if flags & self.RECORD_DELETE:
+                self.dead_bytes += end - offset
+            else:
+                self.index[key] = (start + key_len, value_len)
+                self.live_bytes += value_len
+            offset = end
+        if offset < size:
+            self.file.truncate(offset)
+            self._remap()
+
+    def _append(self, key, payload, flags=0):
+        """Write one record at the end of the log."""
+        key_bytes = pickle.dumps(key)
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(self.HEADER.pack(flags, len(key_bytes),
+                                         len(payload)))
+        self.file.write(key_bytes)
+        self.file.write(payload)
+        return offset + self.HEADER.size + len(key_bytes)
+
+    def put(self, key, item, expires=None):
+        """
+        Store an item, replacing any previous one.
+        Args:
+            key - key of the item
+            item - picklable value
+            expires - wall clock time the item expires at, or None
+        """
+        payload = pickle.dumps((item, expires))
+        previous = self.index.get(key)
+        if previous is not None:
+            self.live_bytes -= previous[1]
+            self.dead_bytes += previous[1]
+        self.index[key] = (self._append(key, payload), len(payload))
+        self.live_bytes += len(payload)
+        self._maybe_compact()
+
+    def get(self, key):
+        """
+        Read an item.
+        Returns:
+            (item, expires) or None if key is missing or expired
+        """
+        location = self.index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        if self.map is not None and offset + length <= len(self.map):
+            payload = self.map[offset:offset + length]
+        else:
+            # Appended since the last mapping, read it from the file
+            self.file.flush()
+            payload = os.pread(self.file.fileno(), length, offset)
+        item, expires = pickle.loads(payload)
+        if expires is not None and expires <= time.time():
+            self.delete(key)
+            return None
+        return item, expires
+
+    def delete(self, key):
+        """Forget an item, returning True if it was stored."""
+        location = self.index.pop(key, None)
+        if location is None:
+            return False
+        self.live_bytes -= location[1]
+        self.dead_bytes += location[1]
+        self._append(key, b'', self.RECORD_DELETE)
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self):
+        """Compact once dead records outweigh live ones."""
+        if self.dead_bytes > max(self.live_bytes, self.COMPACT_MIN_BYTES):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with the live records only."""
+        self._remap()
+        tmp_path = self.log_path + '.tmp'
+        with open(tmp_path, 'wb') as tmp:
+            for key, (offset, length) in self.index.items():
+                key_bytes = pickle.dumps(key)
+                tmp.write(self.HEADER.pack(0, len(key_bytes), length))
+                tmp.write(key_bytes)
+                tmp.write(self.map[offset:offset + length])
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+        os.replace(tmp_path, self.log_path)
+        self.file = open(self.log_path, 'a+b')
+        self._load_index()
+
+    def write_snapshot(self, entries):
+        """
+        Atomically replace the snapshot of the cache metadata.
+        Args:
+            entries - list of (key, policy metadata, expires) tuples
+        """
+        self.flush()
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as tmp:
+            pickle.dump(entries, tmp)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def read_snapshot(self):
+        """The last snapshot written, or an empty list."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return []
+
+    def flush(self):
+        """Push appended records to disk and map them."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._remap()
+
+    def close(self):
+        """Flush and close the log."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Module implements a consistent-hash ring assigning keys to cache nodes
+"""
+import bisect
+import hashlib
+import pickle
+
+
+def stable_hash(data):
+    """64-bit hash of bytes, the same in every process and run."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          'little')
+
+
+def key_hash(key):
+    """Stable hash of a key, str and bytes keys without pickling."""
+    if isinstance(key, str):
+        return stable_hash(key.encode())
+    if isinstance(key, bytes):
+        return stable_hash(key)
+    return stable_hash(pickle.dumps(key))
+
+
+class HashRing():
+    """
+    HashRing places every node at `vnodes` points of a 64-bit circle
+    and gives a key to the node of the first point at or after the hash
+    of the key, wrapping around.
+    A node joining only takes keys from its neighbours on the circle,
+    and a node leaving only gives its own keys away, so about 1 / nodes
+    of the keys move instead of nearly all of them with hash % nodes.
+    Virtual nodes keep the share of every node close to even.
+    """
+
+    def __init__(self, nodes=(), vnodes=160):
+        """
+        Initialize the ring.
+        Args:
+            nodes - initial nodes, any hashable with a stable repr()
+            vnodes - points per node on the circle
+        """
+        self.vnodes = vnodes
+        self.points = []  # Sorted hashes of the virtual nodes
+        self.owners = []  # Node of each point
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        """Number of nodes."""
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        """Whether node is on the ring."""
+        return node in self.nodes
+
+    def _node_points(self, node):
+        """Hashes of the virtual nodes of a node."""
+        return [stable_hash(f"{node!r}#{index}".encode())
+                for index in range(self.vnodes)]
+
+    def add(self, node):
+        """Put a node on the ring, nothing if it is already there."""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for point in self._node_points(node):
+            index = bisect.bisect_left(self.points, point)
+            self.points.insert(index, point)
+            self.owners.insert(index, node)
+
+    def remove(self, node):
+        """Take a node off the ring, nothing if it is not there."""
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        kept = [(point, owner) for point, owner in
+                zip(self.points, self.owners) if owner != node]
+        self.points = [point for point, _ in kept]
+        self.owners = [owner for _, owner in kept]
+
+    def node_for(self, key):
+        """
+        Node owning a key.
+        Returns:
+            The node, or None if the ring is empty
+        """
+        if not self.points:
+            return None
+        index = bisect.bisect_left(self.points, key_hash(key))
+        return self.owners[index if index < len(self.points) else 0]
+
+    def group(self, keys):
+        """
+        Split keys by owner, keeping their order within a node.
+        Returns:
+            Dict of node to list of keys
+        """
+        points, owners = self.points, self.owners
+        if not points:
+            return {}
+        last = len(points)
+        groups = {}
+        for key in keys:
+            index = bisect.bisect_left(points, key_hash(key))
+            node = owners[index if index < last else 0]
+            groups.setdefault(node, []).append(key)
+        return groups
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Module implements a memoization decorator backed by the cache policies
+"""
+import asyncio
+import functools
+import inspect
+import threading
+
+LRUCache = __import__('3-lru_cache').LRUCache
+
+KWARGS_MARK = object()  # Separates positional from keyword arguments
+FAST_TYPES = {int, str}
+
+
+def make_key(args, kwargs, typed=False):
+    """
+    Build a hashable key from the arguments of a call.
+    A single int or str argument is used as is, like functools does.
+    Args:
+        args - positional arguments of the call
+        kwargs - keyword arguments of the call
+        typed - whether arguments of different types are kept apart
+    """
+    key = args
+    if kwargs:
+        key += (KWARGS_MARK,)
+        for item in kwargs.items():
+            key += item
+    if typed:
+        key += tuple(type(arg) for arg in args)
+        if kwargs:
+            key += tuple(type(value) for value in kwargs.values())
+    elif len(key) == 1 and type(key[0]) in FAST_TYPES:
+        return key[0]
+    return key
+
+
+class _Call():
+    """A computation in flight that other callers can wait for."""
+
+    def __init__(self):
+        """Initialize an unfinished call."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def cached(policy=LRUCache, maxsize=128, ttl=None, typed=False, **options):
+    """
+    Memoize a function with one of the cache policies.
+    Concurrent calls with the same arguments are computed only once, the
+    other callers wait for that result. Coroutine functions are memoized
+    the same way, sharing one task per key.
+    Results that raise are not cached.
+
+    Example:
+        @cached(policy=LFUCache, maxsize=1024, ttl=60)
+        def get_hyper(self, page, page_size): ...
+
+    Args:
+        policy - BaseCaching subclass holding the results, built with
+                 max_items=maxsize, e.g. ShardedCache or SharedMemoryCache
+        maxsize - maximum number of results kept
+        ttl - seconds a result stays valid, or None
+        typed - whether arguments of different types are cached apart
+        options - extra arguments of the policy, e.g. max_bytes
+    """
+    def decorator(func):
+        """Wrap func with its own cache."""
+        cache = policy(max_items=maxsize, ttl=ttl, **options)
+        lock = threading.Lock()
+        calls = {}
+        counters = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+        def lookup(key):
+            """Cached result box of key, counting the hit, or None."""
+            box = cache.get(key)
+            if box is not None:
+                counters['hits'] += 1
+            return box
+
+        def store(key, result):
+            """Keep a result, boxed so that None results are cached too."""
+            with lock:
+                cache.put(key, (result,))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                """Memoized coroutine function."""
+                key = make_key(args, kwargs, typed)
+                with lock:
+                    box = lookup(key)
+                    task = calls.get(key)
+                    if box is None and task is None:
+                        counters['misses'] += 1
+                    elif box is None:
+                        counters['coalesced'] += 1
+                if box is not None:
+                    return box[0]
+                if task is None:
+                    task = asyncio.ensure_future(func(*args, **kwargs))
+                    calls[key] = task
+                    task.add_done_callback(
+                        lambda done: finish_task(key, done))
+                return await asyncio.shield(task)
+
+            def finish_task(key, task):
+                """Cache the result of a finished task."""
+                calls.pop(key, None)
+                if not task.cancelled() and task.exception() is None:
+                    store(key, task.result())
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                """Memoized function."""
+                key = make_key(args, kwargs, typed)
+                with lock:
+                    box = lookup(key)
+                    if box is not None:
+                        return box[0]
+                    call = calls.get(key)
+                    leader = call is None
+                    if leader:
+                        counters['misses'] += 1
+                        call = calls[key] = _Call()
+                    else:
+                        counters['coalesced'] += 1
+                if not leader:
+                    call.done.wait()
+                    if call.error is not None:
+                        raise call.error
+                    return call.result
+                try:
+                    call.result = func(*args, **kwargs)
+                    store(key, call.result)
+                    return call.result
+                except BaseException as error:
+                    call.error = error
+                    raise
+                finally:
+                    with lock:
+                        del calls[key]
+                    call.done.set()
+
+        def cache_info():
+            """Hit and miss counters of the memoized function."""
+            with lock:
+                info = dict(counters)
+                info['maxsize'] = cache.max_items
+                info['currsize'] = len(cache.cache_data)
+                info['evictions'] = cache.stats()['evictions']
+            return info
+
+        def cache_clear():
+            """Forget every cached result and reset the counters."""
+            with lock:
+                cache.delete_many(list(cache.cache_data))
+                for name in counters:
+                    counters[name] = 0
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
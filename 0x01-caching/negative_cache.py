@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Module implements a compact, expiring memory of keys known not to exist
+"""
+import math
+import time
+from base_caching import TOMBSTONE
+
+MASK = (1 << 64) - 1
+
+
+def _mix(value):
+    """SplitMix64 finalizer, spreading the bits of a 64-bit value."""
+    value = (value ^ (value >> 30)) * 0xbf58476d1ce4e5b9 & MASK
+    value = (value ^ (value >> 27)) * 0x94d049bb133111eb & MASK
+    return value ^ (value >> 31)
+
+
+class BloomFilter():
+    """
+    BloomFilter answers whether a key was added, with no false negative
+    and false positives at about error_rate once capacity keys are in.
+    Each key sets `hashes` bits of a bytearray, derived from one hash by
+    double hashing.
+    """
+    __slots__ = ('capacity', 'error_rate', 'size', 'hashes', 'bits', 'count')
+
+    def __init__(self, capacity, error_rate):
+        """
+        Size the filter.
+        Args:
+            capacity - keys the filter holds at error_rate
+            error_rate - false positive rate wanted at capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) /
+                                     math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        """Bits of a key."""
+        first = _mix(hash(key) & MASK)
+        step = _mix(first) | 1
+        size = self.size
+        return [(first + index * step) % size
+                for index in range(self.hashes)]
+
+    def add(self, key):
+        """Add a key."""
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        """Whether the key was probably added."""
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & 1 << (position & 7):
+                return False
+        return True
+
+    def __len__(self):
+        """Number of keys added."""
+        return self.count
+
+
+class ScalableBloomFilter():
+    """
+    ScalableBloomFilter chains Bloom filters so that it never fills up:
+    when the last one reaches its capacity, a new one twice as large and
+    with half the error rate is added. The error rates form a series
+    summing to error_rate, whatever the number of keys.
+    """
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, capacity=1024, error_rate=0.01):
+        """
+        Args:
+            capacity - keys of the first filter
+            error_rate - false positive rate of the whole chain
+        """
+        self.filters = [BloomFilter(capacity,
+                                    error_rate * (1 - self.TIGHTENING))]
+
+    def add(self, key):
+        """Add a key."""
+        last = self.filters[-1]
+        if last.count >= last.capacity:
+            last = BloomFilter(last.capacity * self.GROWTH,
+                               last.error_rate * self.TIGHTENING)
+            self.filters.append(last)
+        last.add(key)
+
+    def __contains__(self, key):
+        """Whether the key was probably added."""
+        return any(key in bloom for bloom in reversed(self.filters))
+
+    def __len__(self):
+        """Number of keys added."""
+        return sum(map(len, self.filters))
+
+    def memory(self):
+        """Bytes of the bit arrays."""
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+
+class NegativeCache():
+    """
+    NegativeCache remembers keys the origin does not have, about one
+    byte per key at a 1% false positive rate, against a hundred for a
+    cached TOMBSTONE.
+    Keys are added to the current generation, a ScalableBloomFilter,
+    and a new generation starts every ttl seconds, the oldest one being
+    dropped, so a key is forgotten between ttl and twice ttl after it
+    was last added.
+    A key created at the origin must be discarded: Bloom filters cannot
+    delete, so the key is kept in a small set of exceptions until the
+    generations that hold it are dropped.
+    A false positive hides an existing key until it decays, so
+    error_rate bounds the share of existing keys wrongly reported absent.
+    """
+    GENERATIONS = 2
+
+    def __init__(self, capacity=10000, error_rate=0.01, ttl=60.0):
+        """
+        Args:
+            capacity - keys of the first filter of every generation
+            error_rate - false positive rate of every generation
+            ttl - seconds a key is remembered at least
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self.generations = []  # (filter, exceptions), oldest first
+        self.rotate_at = 0.0
+        self._rotate()
+
+    def _rotate(self):
+        """Start a new generation, dropping the oldest if too many."""
+        self.generations.append((ScalableBloomFilter(self.capacity,
+                                                     self.error_rate), set()))
+        del self.generations[:-self.GENERATIONS]
+        self.rotate_at = time.monotonic() + self.ttl
+
+    def _tick(self):
+        """Rotate once per ttl elapsed since the current generation."""
+        now = time.monotonic()
+        if now < self.rotate_at:
+            return
+        periods = int((now - self.rotate_at) // self.ttl) + 1
+        for _ in range(min(periods, self.GENERATIONS)):
+            self._rotate()
+
+    def add(self, key):
+        """Remember that key does not exist."""
+        self._tick()
+        bloom, exceptions = self.generations[-1]
+        exceptions.discard(key)
+        bloom.add(key)
+
+    def discard(self, key):
+        """Forget that key did not exist, e.g. once it is created."""
+        for bloom, exceptions in self.generations:
+            if key in bloom:
+                exceptions.add(key)
+
+    def __contains__(self, key):
+        """Whether key is probably known not to exist."""
+        self._tick()
+        for bloom, exceptions in reversed(self.generations):
+            if key in bloom and key not in exceptions:
+                return True
+        return False
+
+    def memory(self):
+        """Bytes of the bit arrays of every generation."""
+        return sum(bloom.memory() for bloom, _ in self.generations)
+
+
+def load_through(cache, key, load, negatives=None):
+    """
+    Lookaside read that also caches misses: in negatives if given, else
+    as a TOMBSTONE in the cache.
+    Args:
+        cache - BaseCaching instance
+        key - key of the item
+        load - callable(key) reading the origin, None if the key is absent
+        negatives - optional NegativeCache
+    Returns:
+        The item, or None if the key does not exist
+    """
+    item = cache.get(key)
+    if item is TOMBSTONE:
+        return None
+    if item is not None:
+        return item
+    if negatives is not None and key in negatives:
+        return None
+    item = load(key)
+    if item is not None:
+        cache.put(key, item)
+    elif negatives is not None:
+        negatives.add(key)
+    else:
+        cache.put(key, TOMBSTONE)
+    return item
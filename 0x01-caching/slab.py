@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Module implements compact slab storage for the key lists of the caches
+"""
+from array import array
+
+
+class Slab():
+    """
+    Slab keeps doubly linked lists of keys in parallel arrays.
+    Every key takes one slot, an index in the arrays, so a linked key
+    costs a list entry and a few machine integers instead of a node
+    object. Released slots are chained in a free list and reused first,
+    so a cache of steady size stops allocating.
+    A list is named by its sentinel slot, which links to itself while
+    the list is empty.
+    """
+    __slots__ = ('keys', 'prev', 'next', 'tags', 'free')
+
+    def __init__(self):
+        """Initialize empty arrays and free list."""
+        self.keys = []  # Key of each slot, None for sentinels and free
+        self.prev = array('i')  # Previous slot in the list
+        self.next = array('i')  # Next slot in the list, or in free list
+        self.tags = array('L')  # Small integer the cache attaches to a key
+        self.free = -1  # First free slot, -1 when all are in use
+
+    def alloc(self, key, tag=0):
+        """
+        Take a slot for a key, linked to nothing yet.
+        Args:
+            key - key stored in the slot
+            tag - integer kept with the key, e.g. its frequency
+        Returns:
+            The slot
+        """
+        slot = self.free
+        if slot < 0:
+            slot = len(self.keys)
+            self.keys.append(key)
+            self.prev.append(slot)
+            self.next.append(slot)
+            self.tags.append(tag)
+        else:
+            self.free = self.next[slot]
+            self.keys[slot] = key
+            self.prev[slot] = self.next[slot] = slot
+            self.tags[slot] = tag
+        return slot
+
+    def release(self, slot):
+        """Give an unlinked slot back to the free list."""
+        self.keys[slot] = None
+        self.next[slot] = self.free
+        self.free = slot
+
+    def new_list(self):
+        """Sentinel slot of a new, empty list."""
+        return self.alloc(None)
+
+    def append(self, head, slot):
+        """Link a slot at the end of the list of sentinel head."""
+        prev = self.prev
+        last = prev[head]
+        prev[slot] = last
+        self.next[slot] = head
+        self.next[last] = slot
+        prev[head] = slot
+
+    def unlink(self, slot):
+        """Take a slot out of its list."""
+        prev, next_ = self.prev, self.next
+        before, after = prev[slot], next_[slot]
+        next_[before] = after
+        prev[after] = before
+
+    def empty(self, head):
+        """Whether the list of sentinel head holds no key."""
+        return self.next[head] == head
+
+    def first(self, head):
+        """Key at the front of a non empty list."""
+        return self.keys[self.next[head]]
+
+    def iter(self, head):
+        """Keys of a list, front to back."""
+        keys, next_ = self.keys, self.next
+        slot = next_[head]
+        while slot != head:
+            yield keys[slot]
+            slot = next_[slot]
@@ -4,6 +4,8 @@
 
 from flask import Flask, render_template, request
 from flask_babel import Babel
+from page_variants import page_store
+from response_cache import ResponseCache
 
 
 class Config:
@@ -23,6 +25,9 @@ app.url_map.strict_slashes = False  # Allow flexible URL patterns without
 # Initialize Flask-Babel for localization
 babel = Babel(app)
 
+# Cache the rendered homepage per resolved locale
+response_cache = ResponseCache(page_store(128))
+
 
 @babel.localeselector
 def get_locale() -> str:
@@ -38,6 +43,7 @@ def get_locale() -> str:
 
 
 @app.route('/')
+@response_cache.cached(get_locale)
 def index() -> str:
     '''Renders the homepage.
 
@@ -4,6 +4,8 @@
 
 from flask import Flask, render_template, request
 from flask_babel import Babel
+from page_variants import page_store
+from response_cache import ResponseCache
 
 
 class Config:
@@ -19,6 +21,7 @@ app = Flask(__name__)
 app.config.from_object(Config)
 app.url_map.strict_slashes = False
 babel = Babel(app)
+response_cache = ResponseCache(page_store(128))
 
 
 @babel.localeselector
@@ -32,6 +35,7 @@ def get_locale() -> str:
 
 
 @app.route('/')
+@response_cache.cached(get_locale)
 def index() -> str:
     '''default route
 
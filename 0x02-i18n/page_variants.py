@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+'''Stored pages of the response cache and the choice of their variant,
+without Flask
+'''
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+# Headers set per reply, never copied from the rendered response
+OWN_HEADERS = {"content-length", "content-encoding", "etag", "vary",
+               "content-language"}
+CODINGS = ("br", "gzip", "identity")  # Preferred first on ties
+VARY = "Accept-Language, Accept-Encoding"
+
+
+class LRUPages:
+    '''Least recently used pages, a stand-in for the 0x01-caching
+    policies.
+
+    It has the part of their interface ResponseCache uses, get, put,
+    delete_many and cache_data, and serves as the store when that
+    project is not importable, see page_store(), and as a test double.
+    '''
+
+    def __init__(self, max_items: int = 128) -> None:
+        '''Initializes an empty store.
+
+        Args:
+            max_items (int): Number of pages kept.
+        '''
+        self.max_items = max_items
+        self.cache_data = OrderedDict()  # Key -> page, LRU first
+
+    def get(self, key):
+        '''Returns the page of key, None if it is not stored.'''
+        page = self.cache_data.get(key)
+        if page is not None:
+            self.cache_data.move_to_end(key)
+        return page
+
+    def put(self, key, page) -> None:
+        '''Stores a page, dropping the least recently used if full.'''
+        self.cache_data[key] = page
+        self.cache_data.move_to_end(key)
+        while len(self.cache_data) > self.max_items:
+            self.cache_data.popitem(last=False)
+
+    def delete_many(self, keys) -> int:
+        '''Drops the pages of keys, returns how many were stored.'''
+        return sum(self.cache_data.pop(key, None) is not None
+                   for key in keys)
+
+
+def page_store(max_items: int = 128):
+    '''Returns a store for the pages of a ResponseCache.
+
+    Args:
+        max_items (int): Number of pages kept.
+
+    Returns:
+        BaseCaching: A 0x01-caching LRUCache when that project is
+            importable, e.g. with PYTHONPATH=../0x01-caching, else an
+            LRUPages.
+    '''
+    try:
+        return __import__('3-lru_cache').LRUCache(max_items)
+    except ImportError:
+        return LRUPages(max_items)
+
+
+class Page:
+    '''Rendered page of one route and locale, with its encoded variants.
+
+    Attributes:
+        headers (list): headers of the rendered response, but OWN_HEADERS
+        variants (dict): content coding to (body, strong ETag), the
+            compressed ones only kept when smaller than the identity body
+    '''
+
+    __slots__ = ("headers", "variants")
+
+    def __init__(self, response, level: int = 6) -> None:
+        '''Encodes the body of a rendered response once and for all.
+
+        Args:
+            response (Response): the 200 response of the view
+            level (int): compression level of gzip and brotli
+        '''
+        body = response.get_data()
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.headers = [(name, value) for name, value in response.headers
+                        if name.lower() not in OWN_HEADERS]
+        # A strong validator differs between content codings
+        self.variants = {"identity": (body, digest)}
+        encoded = {"gzip": gzip.compress(body, level, mtime=0)}
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=level)
+        for coding, data in encoded.items():
+            if len(data) < len(body):
+                self.variants[coding] = (data, f"{digest}-{coding}")
+
+
+def negotiate(page: Page, best_match: Callable[[List[str]], str],
+              matches: Callable[[str], bool],
+              language: str = None) -> Tuple[int, bytes, List]:
+    '''Chooses the reply to a request from a cached page.
+
+    Args:
+        page (Page): the cached page
+        best_match (callable): returns the preferred of the codings it
+            is given, or None, e.g. request.accept_encodings.best_match
+        matches (callable): whether If-None-Match matches an ETag, with
+            the weak comparison of RFC 7232 section 3.2, e.g.
+            request.if_none_match.contains_weak
+        language (str): the locale of the page, None if unknown
+
+    Returns:
+        tuple: status, body and headers, 304 with an empty body when the
+            client holds the chosen variant
+    '''
+    coding = best_match([coding for coding in CODINGS
+                         if coding in page.variants]) or "identity"
+    body, etag = page.variants[coding]
+    headers = [("ETag", f'"{etag}"'), ("Vary", VARY)]
+    if language:
+        headers.append(("Content-Language", language))
+    if matches(etag):
+        return 304, b"", headers
+    if coding != "identity":
+        headers.append(("Content-Encoding", coding))
+    return 200, body, page.headers + headers
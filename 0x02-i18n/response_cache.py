@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+'''Full-page response cache for the i18n Flask apps
+'''
+
+import functools
+import threading
+
+from flask import Response, current_app, make_response, request
+
+from page_variants import Page, negotiate
+
+
+class ResponseCache:
+    '''Caches whole GET responses by route and variant, e.g. locale.
+
+    A hit is served without running the view, rendering the template or
+    compressing: every page is stored with its gzip and, when the brotli
+    package is installed, brotli variants, encoded once when stored.
+    Replies carry a strong ETag per variant and Vary: Accept-Language,
+    Accept-Encoding, and a matching If-None-Match gets 304 Not Modified.
+    Only 200 responses without cookies are stored.
+    '''
+
+    def __init__(self, cache, level: int = 6) -> None:
+        '''Initializes the response cache.
+
+        Args:
+            cache (BaseCaching): policy holding the pages, e.g. one of
+                0x01-caching whose ttl bounds a page's age, see
+                page_variants.page_store
+            level (int): compression level of the stored variants
+        '''
+        self.cache = cache
+        self.level = level
+        self.lock = threading.Lock()  # Policies are not thread safe
+
+    def cached(self, variant):
+        '''Decorates a view so its responses are cached.
+
+        Args:
+            variant (callable): returns what the page depends on besides
+                the URL, e.g. get_locale for the resolved locale
+
+        Returns:
+            callable: the decorator
+        '''
+        def decorator(view):
+            '''Wraps a view with the cache.
+
+            Args:
+                view (callable): the view function
+
+            Returns:
+                callable: the view, answering GET and HEAD from the cache
+            '''
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                '''Replies from the cached page of the request, running
+                the view on a miss and storing its response if it may
+                be cached.
+
+                Returns:
+                    Response: the reply to the current request
+                '''
+                if request.method not in ("GET", "HEAD"):
+                    return view(*args, **kwargs)
+                language = variant()
+                key = (request.path, request.query_string, language)
+                with self.lock:
+                    page = self.cache.get(key)
+                if page is None:
+                    response = make_response(view(*args, **kwargs))
+                    if (response.status_code != 200 or
+                            response.direct_passthrough or
+                            "Set-Cookie" in response.headers):
+                        return response
+                    page = Page(response, self.level)
+                    with self.lock:
+                        self.cache.put(key, page)
+                return self.reply(page, language)
+            return wrapper
+        return decorator
+
+    def reply(self, page: Page, language) -> Response:
+        '''Builds the reply to the current request from a cached page.
+
+        Args:
+            page (Page): the cached page
+            language (str): the locale of the page, None if unknown
+
+        Returns:
+            Response: the best encoded variant, or 304 Not Modified
+        '''
+        status, body, headers = negotiate(
+            page, request.accept_encodings.best_match,
+            request.if_none_match.contains_weak, language)
+        return current_app.response_class(body, status, headers)
+
+    def clear(self) -> None:
+        '''Drops every cached page, e.g. after the translations change.'''
+        with self.lock:
+            self.cache.delete_many(list(self.cache.cache_data))
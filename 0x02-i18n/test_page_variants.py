@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+'''Unit checks of the response cache logic that runs without Flask:
+    python3 -m unittest test_page_variants
+'''
+
+import gzip
+import unittest
+
+from page_variants import VARY, LRUPages, Page, negotiate, page_store
+
+
+class Rendered:
+    '''The part of a Flask response Page reads.'''
+
+    def __init__(self, body: bytes, headers=()) -> None:
+        '''Keeps a body and its headers.'''
+        self.body = body
+        self.headers = list(headers)
+
+    def get_data(self) -> bytes:
+        '''Returns the body.'''
+        return self.body
+
+
+def accepting(*codings):
+    '''Returns a best_match preferring codings, in that order.'''
+    def best_match(offered):
+        '''Returns the first accepted of the offered codings.'''
+        return next((coding for coding in codings if coding in offered),
+                    None)
+    return best_match
+
+
+def never(etag) -> bool:
+    '''An If-None-Match that matches no ETag.'''
+    return False
+
+
+class TestNegotiate(unittest.TestCase):
+    '''ETag, 304 and Vary of the replies built from a page.'''
+
+    def setUp(self):
+        '''A page compressing well, with headers to keep and to drop.'''
+        self.body = b"<p>Hello world</p>" * 100
+        self.page = Page(Rendered(self.body, [
+            ("Content-Type", "text/html"), ("Content-Length", "1800"),
+            ("ETag", '"stale"'), ("Vary", "Cookie")]))
+
+    def test_identity(self):
+        '''Without Accept-Encoding the page is sent as is.'''
+        status, body, headers = negotiate(self.page, accepting(), never,
+                                          "fr")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.body)
+        self.assertIn(("Vary", VARY), headers)
+        self.assertIn(("Content-Language", "fr"), headers)
+        self.assertIn(("Content-Type", "text/html"), headers)
+        names = [name for name, _ in headers]
+        self.assertNotIn("Content-Encoding", names)
+        self.assertNotIn("Content-Length", names)
+        self.assertEqual(names.count("ETag"), 1)
+        self.assertEqual(names.count("Vary"), 1)
+
+    def test_gzip(self):
+        '''A gzip variant has its own body and strong ETag.'''
+        _, _, plain = negotiate(self.page, accepting(), never)
+        status, body, headers = negotiate(self.page, accepting("gzip"),
+                                          never)
+        self.assertEqual(status, 200)
+        self.assertEqual(gzip.decompress(body), self.body)
+        self.assertIn(("Content-Encoding", "gzip"), headers)
+        self.assertNotEqual(dict(headers)["ETag"], dict(plain)["ETag"])
+        self.assertTrue(dict(headers)["ETag"].startswith('"'))
+
+    def test_not_modified(self):
+        '''A matching If-None-Match gets 304 without a body.'''
+        _, _, headers = negotiate(self.page, accepting("gzip"), never)
+        etag = dict(headers)["ETag"].strip('"')
+        status, body, headers = negotiate(
+            self.page, accepting("gzip"), lambda tag: tag == etag, "en")
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+        self.assertEqual(dict(headers), {"ETag": f'"{etag}"', "Vary": VARY,
+                                         "Content-Language": "en"})
+
+    def test_other_variant_modified(self):
+        '''The ETag of one coding does not validate another.'''
+        _, _, headers = negotiate(self.page, accepting(), never)
+        etag = dict(headers)["ETag"].strip('"')
+        status, _, _ = negotiate(self.page, accepting("gzip"),
+                                 lambda tag: tag == etag)
+        self.assertEqual(status, 200)
+
+    def test_small_page(self):
+        '''Variants larger than the page are not kept.'''
+        page = Page(Rendered(b"ok"))
+        self.assertEqual(list(page.variants), ["identity"])
+        status, body, headers = negotiate(page, accepting("gzip"), never)
+        self.assertEqual((status, body), (200, b"ok"))
+        self.assertNotIn("Content-Encoding", dict(headers))
+
+
+class TestStores(unittest.TestCase):
+    '''The stores of the pages.'''
+
+    def test_lru_pages(self):
+        '''The least recently used page is dropped first.'''
+        store = LRUPages(2)
+        store.put("a", 1)
+        store.put("b", 2)
+        store.get("a")
+        store.put("c", 3)
+        self.assertEqual(list(store.cache_data), ["a", "c"])
+        self.assertEqual(store.delete_many(["a", "b"]), 1)
+
+    def test_page_store(self):
+        '''The store has the interface ResponseCache uses.'''
+        store = page_store(2)
+        for name in ("get", "put", "delete_many", "cache_data"):
+            self.assertTrue(hasattr(store, name))
+        store.put("a", 1)
+        self.assertEqual(store.get("a"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()